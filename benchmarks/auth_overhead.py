@@ -0,0 +1,52 @@
+"""
+Overhead of the auth dependency (get_current_user) per request
+with and without the verified token cache. The user cache is warm in
+both cases, so only token verification is compared.
+
+    python -m benchmarks.auth_overhead --calls 20000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from src.auth.cache import get_token_cache, get_user_cache
+from src.auth.service import create_access_token, get_current_user
+from src.settings import get_settings
+
+EMAIL = "bench@example.com"
+
+
+async def measure(token: str, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await get_current_user(token)
+    return time.perf_counter() - start
+
+
+def main(args) -> dict:
+    get_user_cache().set(EMAIL, {"email": EMAIL, "is_admin": False})
+    token = create_access_token(
+        data={"sub": EMAIL},
+        expires_delta=timedelta(minutes=get_settings().access_token_expire_minutes),
+    )
+    results = {"calls": args.calls}
+
+    token_cache = get_token_cache()
+    max_size = token_cache.max_size
+    token_cache.max_size = 0
+    elapsed = asyncio.run(measure(token, args.calls))
+    results["without_cache_us"] = round(elapsed / args.calls * 1e6, 2)
+
+    token_cache.max_size = max_size
+    elapsed = asyncio.run(measure(token, args.calls))
+    results["with_cache_us"] = round(elapsed / args.calls * 1e6, 2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20000)
+    print(json.dumps(main(parser.parse_args()), indent=2))
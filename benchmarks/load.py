@@ -0,0 +1,247 @@
+"""
+Load test of the notes API: seeds users and notes through the database layer,
+then drives every scenario at the given concurrency and reports RPS and latency
+percentiles per scenario.
+
+Runs against the ASGI app in-process with the mock database (TESTING=True):
+
+    python -m benchmarks.load --users 20 --notes 1000 --concurrency 16 --requests 500
+    python -m benchmarks.load --output baseline.json
+    python -m benchmarks.load --baseline baseline.json --max-regression 0.25
+
+With --baseline the exit code is 1 if p99 latency or RPS of any scenario
+regressed more than --max-regression against the baseline report.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+
+import httpx
+
+from benchmarks.utils import disable_rate_limits, percentiles, timer
+from src.app import app
+from src.auth.database import add_user_in_db, get_user_id_by_email
+from src.auth.service import get_password_hash
+from src.database import drop_collections, ensure_indexes
+from src.notes.database import add_note_in_db
+
+PASSWORD = "password"
+ADMIN_EMAIL = "admin@bench.example.com"
+SCENARIOS = (
+    "register",
+    "token",
+    "create",
+    "list",
+    "get",
+    "update",
+    "delete",
+    "restore",
+)
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.emails = [f"user{i}@bench.example.com" for i in range(args.users)]
+        self.headers: dict[str, dict] = {}
+        self.notes: dict[str, list[str]] = {email: [] for email in self.emails}
+        self.deleted: list[str] = []
+        self.registered = itertools.count()
+
+    async def seed(self) -> None:
+        await drop_collections()
+        await ensure_indexes()
+        # Hash the password once, bcrypt would dominate the seeding otherwise
+        password_hash = get_password_hash(PASSWORD)
+        for email in [*self.emails, ADMIN_EMAIL]:
+            await add_user_in_db(
+                {
+                    "email": email,
+                    "password": password_hash,
+                    "is_admin": email == ADMIN_EMAIL,
+                }
+            )
+        owners = {email: await get_user_id_by_email(email) for email in self.emails}
+        for i in range(self.args.notes):
+            email = self.emails[i % len(self.emails)]
+            note = await add_note_in_db(
+                {"title": f"title {i}", "body": f"body {i}", "owner": owners[email]}
+            )
+            self.notes[email].append(note["_id"])
+
+        for email in [*self.emails, ADMIN_EMAIL]:
+            self.headers[email] = await self.login(email)
+
+    async def login(self, email: str) -> dict:
+        response = await self.client.post(
+            "/auth/token", json={"email": email, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def pick_note(self) -> tuple[str, str] | None:
+        email = random.choice(self.emails)
+        if not self.notes[email]:
+            return None
+        return email, random.choice(self.notes[email])
+
+    async def register(self) -> httpx.Response:
+        email = f"new{next(self.registered)}@bench.example.com"
+        return await self.client.post(
+            "/auth/register", json={"email": email, "password": PASSWORD}
+        )
+
+    async def token(self) -> httpx.Response:
+        return await self.client.post(
+            "/auth/token",
+            json={"email": random.choice(self.emails), "password": PASSWORD},
+        )
+
+    async def create(self) -> httpx.Response:
+        email = random.choice(self.emails)
+        response = await self.client.post(
+            "/notes/",
+            headers=self.headers[email],
+            json={"title": "new title", "body": "new body"},
+        )
+        if response.status_code == 201:
+            self.notes[email].append(response.json()["_id"])
+        return response
+
+    async def list(self) -> httpx.Response:
+        email = random.choice(self.emails)
+        return await self.client.get("/notes/", headers=self.headers[email])
+
+    async def get(self) -> httpx.Response | None:
+        picked = self.pick_note()
+        if picked is None:
+            return None
+        email, note_id = picked
+        return await self.client.get(f"/notes/{note_id}", headers=self.headers[email])
+
+    async def update(self) -> httpx.Response | None:
+        picked = self.pick_note()
+        if picked is None:
+            return None
+        email, note_id = picked
+        return await self.client.patch(
+            f"/notes/{note_id}",
+            headers=self.headers[email],
+            json={"body": f"updated {time.perf_counter()}"},
+        )
+
+    async def delete(self) -> httpx.Response | None:
+        picked = self.pick_note()
+        if picked is None:
+            return None
+        email, note_id = picked
+        # Remove the note first, so concurrent workers do not delete it twice
+        self.notes[email].remove(note_id)
+        self.deleted.append(note_id)
+        return await self.client.delete(
+            f"/notes/{note_id}", headers=self.headers[email]
+        )
+
+    async def restore(self) -> httpx.Response | None:
+        if not self.deleted:
+            return None
+        note_id = self.deleted.pop()
+        return await self.client.get(
+            f"/notes/restore/{note_id}", headers=self.headers[ADMIN_EMAIL]
+        )
+
+    async def run_scenario(self, name: str) -> dict:
+        operation = getattr(self, name)
+        remaining = iter(range(self.args.requests))
+        samples = []
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                with timer(samples):
+                    response = await operation()
+                if response is None:
+                    samples.pop()
+                elif response.status_code >= 400:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - start
+        return {
+            "rps": round(len(samples) / elapsed, 1) if elapsed else None,
+            "errors": errors,
+            **percentiles(samples),
+        }
+
+
+def find_regressions(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    regressions = []
+    for name, result in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before or not result.get("count") or not before.get("count"):
+            continue
+        if result["p99_ms"] > before["p99_ms"] * (1 + max_regression):
+            regressions.append(
+                f"{name}: p99 {before['p99_ms']} ms -> {result['p99_ms']} ms"
+            )
+        if result["rps"] < before["rps"] * (1 - max_regression):
+            regressions.append(f"{name}: rps {before['rps']} -> {result['rps']}")
+    return regressions
+
+
+async def main(args) -> dict:
+    disable_rate_limits()
+    random.seed(args.seed)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        load_test = LoadTest(client, args)
+        await load_test.seed()
+        scenarios = {}
+        for name in args.scenarios.split(","):
+            scenarios[name] = await load_test.run_scenario(name)
+
+    return {
+        "users": args.users,
+        "notes": args.notes,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "scenarios": scenarios,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Compare the report with this report")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
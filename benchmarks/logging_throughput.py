@@ -0,0 +1,114 @@
+"""
+Request throughput with the legacy BaseHTTPMiddleware logging (synchronous
+stdout and file handlers on the event loop) against LogMiddleware (pure ASGI,
+QueueHandler/QueueListener). Log output goes to a temporary directory and
+stdout is replaced with /dev/null for both variants.
+
+    python -m benchmarks.logging_throughput --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.logger import LogMiddleware, logger, setup_logging, stop_logging
+from src.settings import get_settings
+
+
+async def legacy_log_middleware(request: Request, call_next):
+    start_time = time.time()
+    response = await call_next(request)
+    execution_time = time.time() - start_time
+
+    log_dict = {
+        "request_method": request.method,
+        "request_url": str(request.url),
+        "execution_time": execution_time,
+        "response_status_code": response.status_code,
+        "remote_address": request.client.host,
+        "request_headers": dict(request.headers),
+    }
+
+    logger.info(log_dict, extra=log_dict)
+    return response
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return {"message": "Welcome to NotesFastAPI!"}
+
+    return app
+
+
+def use_legacy_handlers(directory: str) -> None:
+    formatter = logging.Formatter(
+        fmt="[%(asctime)s] [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    stream_handler = logging.StreamHandler(sys.stdout)
+    file_handler = logging.FileHandler(os.path.join(directory, "legacy.log"))
+    stream_handler.setFormatter(formatter)
+    file_handler.setFormatter(formatter)
+    logger.handlers = [stream_handler, file_handler]
+
+
+async def drive(app: FastAPI, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def worker(count: int):
+            for _ in range(count):
+                await client.get("/", headers={"User-Agent": "bench"})
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(worker(requests // concurrency) for _ in range(concurrency))
+        )
+        return time.perf_counter() - start
+
+
+def main(args) -> dict:
+    results = {"requests": args.requests, "concurrency": args.concurrency}
+    stdout = sys.stdout
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            use_legacy_handlers(directory)
+            app = make_app()
+            app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_log_middleware)
+            elapsed = asyncio.run(drive(app, args.requests, args.concurrency))
+            results["legacy_rps"] = round(args.requests / elapsed, 1)
+
+            settings = get_settings().model_copy(update={"log_dir": directory})
+            setup_logging(settings)
+            app = make_app()
+            app.add_middleware(LogMiddleware)
+            elapsed = asyncio.run(drive(app, args.requests, args.concurrency))
+            results["queue_rps"] = round(args.requests / elapsed, 1)
+        finally:
+            # Drain the queue while the temporary stdout and directory still exist
+            stop_logging()
+            logger.handlers = []
+            sys.stdout = stdout
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,100 @@
+"""
+p99 latency of GET /notes/ while logins run concurrently.
+
+Runs against the ASGI app in-process with the mock database (TESTING=True):
+
+    python -m benchmarks.login_storm --logins 8 --requests 200
+    python -m benchmarks.login_storm --blocking  # bcrypt on the event loop
+"""
+
+import argparse
+import asyncio
+import json
+
+import httpx
+
+import src.auth.service as auth_service
+from benchmarks.utils import disable_rate_limits, percentiles, timer
+from src.app import app
+from src.auth.database import add_user_in_db, get_user_id_by_email
+from src.auth.service import get_password_hash
+from src.database import drop_collections
+from src.notes.database import add_note_in_db
+
+EMAIL = "bench@example.com"
+PASSWORD = "password"
+
+
+async def seed(notes: int) -> None:
+    await drop_collections()
+    await add_user_in_db(
+        {"email": EMAIL, "password": get_password_hash(PASSWORD), "is_admin": False}
+    )
+    user_id = await get_user_id_by_email(EMAIL)
+    for i in range(notes):
+        await add_note_in_db({"title": f"title {i}", "body": "body", "owner": user_id})
+
+
+async def measure_notes(client: httpx.AsyncClient, headers: dict, requests: int):
+    samples = []
+    for _ in range(requests):
+        with timer(samples):
+            response = await client.get("/notes/", headers=headers)
+        response.raise_for_status()
+    return samples
+
+
+async def login_loop(client: httpx.AsyncClient, stop: asyncio.Event) -> int:
+    logins = 0
+    data = {"email": EMAIL, "password": PASSWORD}
+    while not stop.is_set():
+        await client.post("/auth/token", json=data)
+        logins += 1
+    return logins
+
+
+async def main(args) -> dict:
+    disable_rate_limits()
+    if args.blocking:
+
+        async def verify_password_blocking(plain_password, hashed_password):
+            return auth_service.verify_password(plain_password, hashed_password)
+
+        auth_service.verify_password_async = verify_password_blocking
+
+    await seed(args.notes)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        response = await client.post(
+            "/auth/token", json={"email": EMAIL, "password": PASSWORD}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        idle = await measure_notes(client, headers, args.requests)
+
+        stop = asyncio.Event()
+        logins = [
+            asyncio.create_task(login_loop(client, stop)) for _ in range(args.logins)
+        ]
+        storm = await measure_notes(client, headers, args.requests)
+        stop.set()
+        login_count = sum(await asyncio.gather(*logins))
+
+    return {
+        "mode": "blocking" if args.blocking else "pool",
+        "concurrent_logins": args.logins,
+        "logins_completed": login_count,
+        "idle": percentiles(idle),
+        "during_logins": percentiles(storm),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--notes", type=int, default=50)
+    parser.add_argument("--blocking", action="store_true")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,96 @@
+"""
+Latency of hot note reads (GET /notes/{note_id} and GET /notes/)
+with the notes response cache and without it.
+
+Runs against the ASGI app in-process with the mock database (TESTING=True):
+
+    python -m benchmarks.response_cache --requests 500 --notes 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+import httpx
+
+from benchmarks.utils import disable_rate_limits, percentiles, timer
+from src.app import app
+from src.auth.database import add_user_in_db, get_user_id_by_email
+from src.auth.service import get_password_hash
+from src.database import drop_collections
+from src.notes.cache import NullResponseCacheBackend, get_response_cache
+from src.notes.database import add_note_in_db
+
+EMAIL = "bench@example.com"
+PASSWORD = "password"
+
+
+async def seed(notes: int) -> list[str]:
+    await drop_collections()
+    await add_user_in_db(
+        {"email": EMAIL, "password": get_password_hash(PASSWORD), "is_admin": False}
+    )
+    user_id = await get_user_id_by_email(EMAIL)
+    note_ids = []
+    for i in range(notes):
+        note = await add_note_in_db(
+            {"title": f"title {i}", "body": "body " * 20, "owner": user_id}
+        )
+        note_ids.append(note["_id"])
+    return note_ids
+
+
+async def measure(
+    client: httpx.AsyncClient, headers: dict, urls: list[str], requests: int
+) -> dict:
+    samples = {url: [] for url in ("/notes/{note_id}", "/notes/")}
+    for _ in range(requests):
+        with timer(samples["/notes/{note_id}"]):
+            response = await client.get(random.choice(urls), headers=headers)
+        response.raise_for_status()
+        with timer(samples["/notes/"]):
+            response = await client.get("/notes/", headers=headers)
+        response.raise_for_status()
+    return {url: percentiles(url_samples) for url, url_samples in samples.items()}
+
+
+async def main(args) -> dict:
+    disable_rate_limits()
+    note_ids = await seed(args.notes)
+    # Reads go to a small hot set of notes
+    urls = [f"/notes/{note_id}" for note_id in note_ids[: args.hot]]
+    response_cache = get_response_cache()
+    backend = response_cache.backend
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        response = await client.post(
+            "/auth/token", json={"email": EMAIL, "password": PASSWORD}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        response_cache.backend = NullResponseCacheBackend()
+        uncached = await measure(client, headers, urls, args.requests)
+
+        response_cache.backend = backend
+        await response_cache.clear()
+        cached = await measure(client, headers, urls, args.requests)
+
+    return {
+        "notes": args.notes,
+        "hot_notes": len(urls),
+        "uncached": uncached,
+        "cached": cached,
+        "cache": response_cache.stats(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--hot", type=int, default=20)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
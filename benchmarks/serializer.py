@@ -0,0 +1,78 @@
+"""
+Serialization of a list of notes: legacy converters + JSONResponse
+against serialize_document + FastJSONResponse.
+
+    python -m benchmarks.serializer --notes 10000 --repeat 20
+"""
+
+import argparse
+import json
+import time
+
+from bson import ObjectId
+from starlette.responses import JSONResponse
+
+from benchmarks.utils import percentiles
+from src.serializers import FastJSONResponse, orjson, serialize_document
+
+
+def legacy_dict_fields_to_str_converter(d) -> dict:
+    result = {}
+    for key, value in d.items():
+        if isinstance(value, dict):
+            result[key] = legacy_dict_fields_to_str_converter(value)
+        elif (
+            isinstance(value, bool)
+            or isinstance(value, int)
+            or isinstance(value, float)
+        ):
+            result[key] = value
+        else:
+            result[key] = str(value)
+    return result
+
+
+def legacy_path(documents: list[dict]) -> bytes:
+    # retrieve_notes converted every note, then get_notes converted the list again
+    notes = [legacy_dict_fields_to_str_converter(note) for note in documents]
+    notes = [legacy_dict_fields_to_str_converter(note) for note in notes]
+    return JSONResponse(notes).body
+
+
+def new_path(documents: list[dict]) -> bytes:
+    return FastJSONResponse([serialize_document(note) for note in documents]).body
+
+
+def make_documents(count: int) -> list[dict]:
+    owner = str(ObjectId())
+    return [
+        {"_id": ObjectId(), "title": f"title {i}", "body": "body " * 50, "owner": owner}
+        for i in range(count)
+    ]
+
+
+def run(path, documents: list[dict], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        path(documents)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(args) -> dict:
+    documents = make_documents(args.notes)
+    assert json.loads(legacy_path(documents)) == json.loads(new_path(documents))
+    return {
+        "notes": args.notes,
+        "encoder": "orjson" if orjson is not None else "json",
+        "legacy": percentiles(run(legacy_path, documents, args.repeat)),
+        "serializer": percentiles(run(new_path, documents, args.repeat)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,88 @@
+"""
+Startup cost of the application: import time of src.app measured with
+"python -X importtime" in fresh processes, the packages which take most of it,
+and the time of create_app().
+
+    python -m benchmarks.startup --runs 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+from benchmarks.utils import percentiles, timer
+from src.app import create_app
+from src.settings import get_settings
+
+MODULE = "src.app"
+
+
+def measure_import(module: str, log_dir: str) -> dict[str, tuple[int, int]]:
+    """
+    Import the module in a fresh process, return self and cumulative import time
+    in microseconds by module name.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "LOG_DIR": log_dir},
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_time), int(cumulative))
+    return times
+
+
+def main(args) -> dict:
+    totals = []
+    packages = defaultdict(list)
+    with tempfile.TemporaryDirectory() as directory:
+        log_dir = os.path.join(directory, "logs")
+        for _ in range(args.runs):
+            times = measure_import(args.module, log_dir)
+            totals.append(times[args.module][1])
+            by_package = defaultdict(int)
+            for name, (self_time, _) in times.items():
+                by_package[name.split(".")[0]] += self_time
+            for package, self_time in by_package.items():
+                packages[package].append(self_time)
+        # Importing the application must not create the log directory
+        side_effects = os.path.exists(log_dir)
+
+    top = sorted(
+        ((statistics.median(t), package) for package, t in packages.items()),
+        reverse=True,
+    )[: args.top]
+
+    settings = get_settings().model_copy(update={"log_dir": log_dir})
+    samples = []
+    for _ in range(args.runs):
+        with timer(samples):
+            create_app(settings)
+
+    return {
+        "module": args.module,
+        "runs": args.runs,
+        "import_ms": round(statistics.median(totals) / 1000, 1),
+        "import_side_effects": side_effects,
+        "top_packages_ms": {package: round(t / 1000, 1) for t, package in top},
+        "create_app": percentiles(samples),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default=MODULE)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,49 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from src.settings import get_settings
+
+
+def percentiles(samples: list[float]) -> dict:
+    """
+    Summarize latency samples (in seconds) as milliseconds percentiles.
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(p: float) -> float:
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pick(50),
+        "p90_ms": pick(90),
+        "p99_ms": pick(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+@contextmanager
+def timer(samples: list[float]):
+    """
+    Append the elapsed time of the block to samples.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples.append(time.perf_counter() - start)
+
+
+def disable_rate_limits() -> None:
+    """
+    Turn off rate limits of the app, which would answer most benchmark requests with 429.
+    Call it before the first request, the middlewares read settings when they are built.
+    """
+    settings = get_settings()
+    settings.rate_limits = {}
+    settings.rate_limit_default = ""
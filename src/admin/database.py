@@ -0,0 +1,134 @@
+from datetime import datetime
+
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.database import AUDIT_PENDING, get_audit_collection, get_note_collection
+from src.metrics.service import track_db_operation
+from src.notes.database import DELETED, NOT_DELETED
+from src.serializers import serialize_document
+
+DUPLICATE_KEY = 11000
+
+
+@track_db_operation
+async def aggregate_notes_by_owner(limit: int = 100) -> list[dict]:
+    """
+    Count live notes and their total body size per owner, the largest owners first.
+    Sorting by owner before grouping lets the database walk the owner index.
+    """
+    pipeline = [
+        {"$match": NOT_DELETED},
+        {"$sort": {"owner": 1}},
+        {
+            "$group": {
+                "_id": "$owner",
+                "notes": {"$sum": 1},
+                "body_bytes": {"$sum": {"$ifNull": ["$body_size", 0]}},
+            }
+        },
+        {"$sort": {"body_bytes": -1, "_id": 1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "owner": "$_id", "notes": 1, "body_bytes": 1}},
+    ]
+    return await get_note_collection().aggregate(pipeline).to_list(None)
+
+
+@track_db_operation
+async def aggregate_active_owners(since: datetime, limit: int = 100) -> list[dict]:
+    """
+    Find owners whose notes changed since the given time, the most recently active first.
+    """
+    pipeline = [
+        {"$match": {"updated_at": {"$gte": since}}},
+        {
+            "$group": {
+                "_id": "$owner",
+                "changed_notes": {"$sum": 1},
+                "last_active_at": {"$max": "$updated_at"},
+            }
+        },
+        {"$sort": {"last_active_at": -1, "_id": 1}},
+        {"$limit": limit},
+        {
+            "$project": {
+                "_id": 0,
+                "owner": "$_id",
+                "changed_notes": 1,
+                "last_active_at": 1,
+            }
+        },
+    ]
+    return await get_note_collection().aggregate(pipeline).to_list(None)
+
+
+@track_db_operation
+async def aggregate_deleted_notes(limit: int = 100) -> list[dict]:
+    """
+    Count deleted notes per owner, the owners with most deleted notes first.
+    """
+    pipeline = [
+        {"$match": DELETED},
+        {"$sort": {"owner": 1}},
+        {"$group": {"_id": "$owner", "deleted_notes": {"$sum": 1}}},
+        {"$sort": {"deleted_notes": -1, "_id": 1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "owner": "$_id", "deleted_notes": 1}},
+    ]
+    return await get_note_collection().aggregate(pipeline).to_list(None)
+
+
+@track_db_operation
+async def move_pending_audit_records(collection, limit: int = 1000) -> int:
+    """
+    Move audit records stored along with documents of the collection
+    into the audit collection and return the number of moved records.
+    A record is inserted with its own "_id", so a record pushed into several
+    documents or moved by two workers at once is stored only once.
+    """
+    cursor = collection.find(
+        {f"{AUDIT_PENDING}._id": {"$exists": True}}, {AUDIT_PENDING: 1}
+    ).limit(limit)
+    documents = await cursor.to_list(None)
+    records = {
+        record["_id"]: record
+        for document in documents
+        for record in document[AUDIT_PENDING]
+    }
+    if not records:
+        return 0
+    try:
+        await get_audit_collection().insert_many(list(records.values()), ordered=False)
+    except BulkWriteError as e:
+        if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+    await collection.bulk_write(
+        [
+            UpdateOne(
+                {"_id": document["_id"]},
+                {
+                    "$pull": {
+                        AUDIT_PENDING: {
+                            "_id": {
+                                "$in": [
+                                    record["_id"] for record in document[AUDIT_PENDING]
+                                ]
+                            }
+                        }
+                    }
+                },
+            )
+            for document in documents
+        ],
+        ordered=False,
+    )
+    return len(records)
+
+
+@track_db_operation
+async def retrieve_audit_records(limit: int = 100) -> list[dict]:
+    """
+    Retrieve audit records, the newest first.
+    """
+    cursor = get_audit_collection().find().sort("at", DESCENDING).limit(limit)
+    return [serialize_document(record) async for record in cursor]
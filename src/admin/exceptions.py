@@ -0,0 +1,10 @@
+from fastapi import HTTPException
+from starlette import status
+
+
+class HTTPProfileNoExists(HTTPException):
+    def __init__(self, name: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {name} no exists",
+        )
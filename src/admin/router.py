@@ -0,0 +1,185 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+
+from bson import ObjectId
+from fastapi import APIRouter, Query
+from starlette.responses import FileResponse
+
+from src.admin.database import (
+    aggregate_active_owners,
+    aggregate_deleted_notes,
+    aggregate_notes_by_owner,
+    retrieve_audit_records,
+)
+from src.admin.exceptions import HTTPProfileNoExists
+from src.admin.service import get_stats
+from src.auth.dependencies import CurrentAdminUser
+from src.database import get_pool_stats
+from src.jobs.database import (
+    count_jobs_by_status,
+    restart_failed_job,
+    retrieve_failed_jobs,
+)
+from src.jobs.exceptions import HTTPJobNoExists
+from src.jobs.service import get_job_queue
+from src.metrics.profiler import get_profile_dir, list_profiles
+from src.notes.cache import get_response_cache
+from src.settings import get_settings
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+)
+
+
+@router.get("/db/pool", response_description="Database connection pool stats")
+async def db_pool_stats(current_user: CurrentAdminUser):
+    """
+    Get connection pool settings and usage of this worker process.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    return get_pool_stats()
+
+
+@router.get("/cache/notes", response_description="Notes response cache stats")
+async def notes_cache_stats(current_user: CurrentAdminUser):
+    """
+    Get hits, misses and hit ratio of the notes response cache of this worker process.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    return get_response_cache().stats()
+
+
+@router.delete("/cache/notes", response_description="Notes response cache cleared")
+async def clear_notes_cache(current_user: CurrentAdminUser):
+    """
+    Clear the notes response cache and its stats.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    await get_response_cache().clear()
+    return get_response_cache().stats()
+
+
+@router.get("/profiles", response_description="Stored request profiles")
+async def profiles(current_user: CurrentAdminUser):
+    """
+    Get names of stored request profiles, the newest first.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    return list_profiles()
+
+
+@router.get("/profiles/{name}", response_description="Request profile")
+async def profile(name: str, current_user: CurrentAdminUser):
+    """
+    Download a stored request profile by name.
+    If profile not exists, then raise HTTPProfileNoExists.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    if name not in list_profiles():
+        raise HTTPProfileNoExists(name)
+    return FileResponse(os.path.join(get_profile_dir(), name), media_type="text/plain")
+
+
+StatsLimit = Annotated[int | None, Query(ge=1, le=1000)]
+
+
+@router.get("/stats/owners", response_description="Notes count and size by owner")
+async def owners_stats(
+    current_user: CurrentAdminUser, limit: StatsLimit = None, fresh: bool = False
+):
+    """
+    Get the owners with the most notes, with notes count and total body size in bytes.
+    Without parameters the background snapshot is returned if it exists, fresh=true
+    computes the stats now.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    default_limit = get_settings().admin_stats_limit
+    return await get_stats(
+        "owners",
+        lambda: aggregate_notes_by_owner(limit or default_limit),
+        snapshot_allowed=limit is None and not fresh,
+    )
+
+
+@router.get("/stats/active", response_description="Owners active recently")
+async def active_stats(
+    current_user: CurrentAdminUser,
+    hours: Annotated[float | None, Query(gt=0)] = None,
+    limit: StatsLimit = None,
+    fresh: bool = False,
+):
+    """
+    Get the owners who changed notes in the last hours, with count of changed notes
+    and time of the last change.
+    Without parameters the background snapshot is returned if it exists, fresh=true
+    computes the stats now.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    settings = get_settings()
+    since = datetime.now(timezone.utc) - timedelta(
+        hours=hours or settings.admin_stats_active_hours
+    )
+    return await get_stats(
+        "active",
+        lambda: aggregate_active_owners(since, limit or settings.admin_stats_limit),
+        snapshot_allowed=hours is None and limit is None and not fresh,
+    )
+
+
+@router.get("/stats/deleted", response_description="Deleted notes by owner")
+async def deleted_stats(
+    current_user: CurrentAdminUser, limit: StatsLimit = None, fresh: bool = False
+):
+    """
+    Get the owners with the most deleted notes waiting in the trash.
+    Without parameters the background snapshot is returned if it exists, fresh=true
+    computes the stats now.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    default_limit = get_settings().admin_stats_limit
+    return await get_stats(
+        "deleted",
+        lambda: aggregate_deleted_notes(limit or default_limit),
+        snapshot_allowed=limit is None and not fresh,
+    )
+
+
+@router.get("/jobs", response_description="Background jobs status")
+async def jobs_status(current_user: CurrentAdminUser, limit: StatsLimit = 100):
+    """
+    Get the job queue of this worker process, counts of jobs in the outbox by status
+    and the latest jobs which ran out of attempts.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    return {
+        "queue": get_job_queue().stats(),
+        "outbox": await count_jobs_by_status(),
+        "failed": await retrieve_failed_jobs(limit),
+    }
+
+
+@router.post("/jobs/{job_id}/retry", response_description="Failed job restarted")
+async def retry_failed_job(job_id: str, current_user: CurrentAdminUser):
+    """
+    Run a job which ran out of attempts again.
+    If there is no such failed job, then raise HTTPJobNoExists.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    if not ObjectId.is_valid(job_id):
+        raise HTTPJobNoExists(job_id)
+    job = await restart_failed_job(job_id)
+    if not job:
+        raise HTTPJobNoExists(job_id)
+    get_job_queue().offer(job["_id"])
+    return job
+
+
+@router.get("/audit", response_description="Audit records")
+async def audit_records(current_user: CurrentAdminUser, limit: StatsLimit = 100):
+    """
+    Get the latest audit records, the newest first.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    return await retrieve_audit_records(limit)
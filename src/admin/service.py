@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from bson import ObjectId
+
+from src.admin.database import (
+    aggregate_active_owners,
+    aggregate_deleted_notes,
+    aggregate_notes_by_owner,
+    move_pending_audit_records,
+)
+from src.database import get_auth_collection, get_note_collection
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_default_stats() -> dict[str, Callable[[], Awaitable[list[dict]]]]:
+    """
+    Return stats computed with the default parameters by name.
+    """
+    settings = get_settings()
+    since = timedelta(hours=settings.admin_stats_active_hours)
+    return {
+        "owners": lambda: aggregate_notes_by_owner(settings.admin_stats_limit),
+        "active": lambda: aggregate_active_owners(
+            datetime.now(timezone.utc) - since, settings.admin_stats_limit
+        ),
+        "deleted": lambda: aggregate_deleted_notes(settings.admin_stats_limit),
+    }
+
+
+class StatsSnapshots:
+    """
+    Snapshots of the stats with the default parameters, refreshed in the background,
+    so admin requests do not run the aggregations every time.
+    """
+
+    def __init__(self):
+        self.snapshots: dict[str, dict] = {}
+
+    def get(self, name: str) -> dict | None:
+        return self.snapshots.get(name)
+
+    async def refresh(self) -> None:
+        for name, compute in get_default_stats().items():
+            self.snapshots[name] = await compute_stats(compute)
+
+    def clear(self) -> None:
+        self.snapshots.clear()
+
+
+stats_snapshots = StatsSnapshots()
+
+
+async def compute_stats(compute: Callable[[], Awaitable[list[dict]]]) -> dict:
+    return {"computed_at": datetime.now(timezone.utc), "items": await compute()}
+
+
+async def get_stats(
+    name: str, compute: Callable[[], Awaitable[list[dict]]], snapshot_allowed: bool
+) -> dict:
+    """
+    Return the snapshot of the stats if it is allowed and exists, otherwise compute them.
+    """
+    snapshot = stats_snapshots.get(name) if snapshot_allowed else None
+    if snapshot is None:
+        snapshot = await compute_stats(compute)
+    return snapshot
+
+
+async def refresh_stats_periodically() -> None:
+    """
+    Refresh stats snapshots every admin_stats_refresh_seconds.
+    """
+    interval = get_settings().admin_stats_refresh_seconds
+    while True:
+        try:
+            await stats_snapshots.refresh()
+        except Exception:
+            logger.exception("Failed to refresh admin stats")
+        await asyncio.sleep(interval)
+
+
+def get_audit_record(action: str, actor: str, **details) -> dict:
+    """
+    Return a record of who did what. It is passed to the database function
+    doing the action, which stores it along with the changed document by the same
+    write, so the action and its record are never separated and the request
+    makes no extra round-trip. relay_audit_records moves it into the audit collection.
+    """
+    return {
+        "_id": ObjectId(),
+        "action": action,
+        "actor": actor,
+        "at": datetime.now(timezone.utc),
+        **details,
+    }
+
+
+async def relay_audit_records() -> int:
+    """
+    Move audit records stored along with users and notes into the audit collection
+    and return their number.
+    """
+    moved = 0
+    for collection in (get_auth_collection(), get_note_collection()):
+        moved += await move_pending_audit_records(collection)
+    return moved
+
+
+async def relay_audit_records_periodically() -> None:
+    """
+    Relay audit records every audit_relay_interval_seconds.
+    """
+    interval = get_settings().audit_relay_interval_seconds
+    while True:
+        try:
+            await relay_audit_records()
+        except Exception:
+            logger.exception("Failed to relay audit records")
+        await asyncio.sleep(interval)
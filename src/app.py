@@ -1,10 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.cors import CORSMiddleware
 
+from src.admin.router import router as admin_router
+from src.admin.service import (
+    refresh_stats_periodically,
+    relay_audit_records_periodically,
+)
 from src.auth.router import router as auth_router
-from src.logger import logger, log_middleware
+from src.compression import CompressionMiddleware
+from src.database import check_query_plans, close_client, ensure_indexes, get_client
+from src.jobs.service import get_job_queue
+from src.logger import LogMiddleware, logger, setup_logging
+from src.metrics.profiler import ProfilerMiddleware
+from src.metrics.router import router as metrics_router
+from src.metrics.service import (
+    MetricsMiddleware,
+    flush_metrics_periodically,
+    remove_metrics_snapshot,
+    remove_stale_metrics_snapshots,
+)
+from src.notes.database import (
+    backfill_body_sizes,
+    backfill_updated_at,
+    migrate_removed_notes,
+)
+from src.notes.events import get_note_event_bus
 from src.notes.router import router as notes_router
+from src.notes.search import get_search_backend
+from src.ratelimit.service import RateLimitMiddleware
+from src.settings import Settings, get_settings
 
 description = """
 NoteFastAPI will help you not to forget anything!
@@ -32,42 +59,103 @@ You can:
 * Login with registered user.
 """
 
-app = FastAPI(
-    title="NotesFastApi",
-    description=description,
-    docs_url="/api/docs",
-    openapi_url="/api",
-    contact={"name": "Churilov Evgeny", "email": "i@churilovevgeny.ru"},
-)
-app.include_router(notes_router)
-app.include_router(auth_router)
-
-origins = [
-    "http://localhost",
-    "http://localhost:8080",
-]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.add_middleware(BaseHTTPMiddleware, dispatch=log_middleware)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Set up logging and create the Mongo client at startup, close it at shutdown.
+    If metrics_dir is set, share metrics of this worker process with the others
+    and remove snapshots of stopped worker processes.
+    Note events are fed by the change stream of the notes collection if it is used.
+    Background jobs are run by jobs_workers tasks until the application stops.
+    Audit records stored along with users and notes are moved into the audit collection.
+    If admin_stats_refresh_seconds is set, refresh admin stats snapshots in the background.
+    """
+    settings = app.state.settings or get_settings()
+    setup_logging(settings)
+    logger.info("Starting application...")
+    get_client()
+    await ensure_indexes()
+    await migrate_removed_notes()
+    await backfill_body_sizes()
+    await backfill_updated_at()
+    await get_search_backend().rebuild()
+    await check_query_plans()
+    metrics_task = None
+    if settings.metrics_dir:
+        remove_stale_metrics_snapshots()
+        metrics_task = asyncio.create_task(flush_metrics_periodically())
+    events_task = asyncio.create_task(get_note_event_bus().run())
+    job_queue = get_job_queue()
+    job_queue.start()
+    audit_task = asyncio.create_task(relay_audit_records_periodically())
+    stats_task = None
+    if settings.admin_stats_refresh_seconds > 0:
+        stats_task = asyncio.create_task(refresh_stats_periodically())
+    yield
+    logger.info("Stopping application...")
+    await job_queue.stop()
+    for task in (events_task, audit_task):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if stats_task:
+        stats_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await stats_task
+    if metrics_task:
+        metrics_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await metrics_task
+        remove_metrics_snapshot()
+    close_client()
 
 
-@app.get("/")
 async def root():
     return {"message": f"Welcome to NotesFastAPI!"}
 
 
-@app.on_event("startup")
-def on_startup():
-    logger.info("Starting application...")
-
-
-@app.on_event("shutdown")
-def on_shutdown():
-    logger.info("Stopping application...")
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """
+    Create the application. The lifespan and the middlewares use the given settings,
+    get_settings() if they are None. Settings, logging, the Mongo client and
+    the password hashing context are read and set up lazily, so creating
+    the application has no side effects. Middlewares are built on the first request.
+    """
+    app = FastAPI(
+        title="NotesFastApi",
+        description=description,
+        docs_url="/api/docs",
+        openapi_url="/api",
+        contact={"name": "Churilov Evgeny", "email": "i@churilovevgeny.ru"},
+        lifespan=lifespan,
+    )
+    app.state.settings = settings
+    app.include_router(notes_router)
+    app.include_router(auth_router)
+    app.include_router(admin_router)
+    app.include_router(metrics_router)
+    app.add_api_route("/", root, methods=["GET"])
+
+    origins = [
+        "http://localhost",
+        "http://localhost:8080",
+    ]
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.add_middleware(CompressionMiddleware, settings=settings)
+    app.add_middleware(ProfilerMiddleware, settings=settings)
+    app.add_middleware(RateLimitMiddleware, settings=settings)
+    app.add_middleware(LogMiddleware, settings=settings)
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+app = create_app()
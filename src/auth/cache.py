@@ -0,0 +1,199 @@
+import hashlib
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from src.settings import get_settings
+
+
+class UserCache:
+    """
+    In-process LRU cache of users keyed by email with a TTL for every entry.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._users: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, email: str) -> dict | None:
+        """
+        Return the cached user or None if it is missing or expired.
+        """
+        entry = self._users.get(email)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._users[email]
+            self.misses += 1
+            return None
+        self._users.move_to_end(email)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, email: str, user: dict) -> None:
+        """
+        Put the user into the cache, evicting the least recently used one if full.
+        """
+        if self.max_size < 1:
+            return
+        self._users[email] = (time.monotonic() + self.ttl, user)
+        self._users.move_to_end(email)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    def invalidate(self, email: str) -> None:
+        """
+        Remove the user from the cache.
+        """
+        self._users.pop(email, None)
+
+    def clear(self) -> None:
+        """
+        Remove all users from the cache and reset the counters.
+        """
+        self._users.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Return the cache size and hit/miss counters.
+        """
+        return {
+            "size": len(self._users),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def token_digest(token: str) -> bytes:
+    """
+    Return the key of a token in TokenCache, raw tokens are never kept in memory.
+    """
+    return hashlib.sha256(token.encode()).digest()
+
+
+class TokenCache:
+    """
+    In-process LRU cache of verified access tokens mapped to their claims.
+    Entries expire together with the token ("exp" claim).
+    Revoked tokens and users are kept until the tokens they cover expire.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._claims: OrderedDict[bytes, dict] = OrderedDict()
+        # token digest -> token expiration time
+        self._revoked_tokens: dict[bytes, float] = {}
+        # email -> time before which all tokens of the user are revoked
+        self._revoked_users: dict[str, float] = {}
+
+    def get(self, digest: bytes) -> dict | None:
+        """
+        Return the cached claims or None if the token is missing or expired.
+        """
+        claims = self._claims.get(digest)
+        if claims is None or claims["exp"] <= time.time():
+            if claims is not None:
+                del self._claims[digest]
+            self.misses += 1
+            return None
+        self._claims.move_to_end(digest)
+        self.hits += 1
+        return claims
+
+    def set(self, digest: bytes, claims: dict) -> None:
+        """
+        Put verified claims of the token into the cache, evicting the least recently used one if full.
+        """
+        if self.max_size < 1:
+            return
+        self._claims[digest] = claims
+        self._claims.move_to_end(digest)
+        while len(self._claims) > self.max_size:
+            self._claims.popitem(last=False)
+
+    def is_revoked(self, digest: bytes, claims: dict) -> bool:
+        """
+        Check if the token itself or all tokens of its user were revoked.
+        """
+        if digest in self._revoked_tokens:
+            return True
+        revoked_before = self._revoked_users.get(claims["sub"])
+        return revoked_before is not None and claims.get("iat", 0) < revoked_before
+
+    def revoke_token(self, digest: bytes, claims: dict) -> None:
+        """
+        Revoke a single token, e.g. on logout.
+        """
+        self._purge_revoked()
+        self._claims.pop(digest, None)
+        self._revoked_tokens[digest] = claims["exp"]
+
+    def revoke_user(self, email: str) -> None:
+        """
+        Revoke all tokens of the user issued before now.
+        Tokens have a sub-second "iat", so a new login right after is not revoked.
+        """
+        self._purge_revoked()
+        self._revoked_users[email] = time.time()
+        for digest in [d for d, c in self._claims.items() if c["sub"] == email]:
+            del self._claims[digest]
+
+    def _purge_revoked(self) -> None:
+        now = time.time()
+        for digest in [d for d, exp in self._revoked_tokens.items() if exp <= now]:
+            del self._revoked_tokens[digest]
+        # Every token of the user issued before the revocation is already expired
+        oldest = now - get_settings().access_token_expire_minutes * 60
+        for email in [e for e, t in self._revoked_users.items() if t <= oldest]:
+            del self._revoked_users[email]
+
+    def clear(self) -> None:
+        """
+        Remove all tokens and revocations from the cache and reset the counters.
+        """
+        self._claims.clear()
+        self._revoked_tokens.clear()
+        self._revoked_users.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Return the cache size, revocations and hit/miss counters.
+        """
+        return {
+            "size": len(self._claims),
+            "max_size": self.max_size,
+            "revoked_tokens": len(self._revoked_tokens),
+            "revoked_users": len(self._revoked_users),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+@lru_cache
+def get_user_cache() -> UserCache:
+    """
+    Return the user cache of this process, sized from settings.
+    """
+    settings = get_settings()
+    return UserCache(
+        max_size=settings.user_cache_max_size,
+        ttl=settings.user_cache_ttl_seconds,
+    )
+
+
+@lru_cache
+def get_token_cache() -> TokenCache:
+    """
+    Return the verified token cache of this process, sized from settings.
+    """
+    return TokenCache(max_size=get_settings().token_cache_max_size)
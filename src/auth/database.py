@@ -1,26 +1,39 @@
-from src.database import db_auth_collection
+from src.auth.cache import get_user_cache
+from src.database import AUDIT_PENDING, get_auth_collection
+from src.metrics.service import track_db_operation
 
 
-async def add_user_in_db(user_data: dict) -> dict:
+@track_db_operation
+async def add_user_in_db(user_data: dict, audit: dict | None = None) -> dict:
     """
     Add a new user to the database.
+    If audit is not None, store the audit record along with the user.
+    If a user with the same email exists, then pymongo DuplicateKeyError is raised
+    by the unique index on "email".
     """
-    user = await db_auth_collection.insert_one(user_data)
-    return await retrieve_user_by_id(user.inserted_id)
+    if audit:
+        user_data[AUDIT_PENDING] = [audit]
+    await get_auth_collection().insert_one(user_data)
+    user_data.pop(AUDIT_PENDING, None)
+    get_user_cache().invalidate(user_data["email"])
+    # insert_one sets "_id" of the document, so there is no need to re-read it
+    return user_data
 
 
+@track_db_operation
 async def retrieve_user_by_email(user_email: str) -> dict:
     """
     Retrieve a user by their email.
     """
-    return await db_auth_collection.find_one({"email": user_email})
+    return await get_auth_collection().find_one({"email": user_email})
 
 
+@track_db_operation
 async def retrieve_user_by_id(user_id: str) -> dict:
     """
     Retrieve a user by their ID.
     """
-    return await db_auth_collection.find_one({"_id": user_id})
+    return await get_auth_collection().find_one({"_id": user_id})
 
 
 async def get_user_id_by_email(email: str) -> str:
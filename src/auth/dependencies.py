@@ -2,6 +2,7 @@ from typing import Annotated
 
 from fastapi import Depends
 
+from src.auth.exceptions import HTTPAdminAccessDenied
 from src.auth.schemas import UserSchema
 from src.auth.service import get_current_user
 
@@ -13,3 +14,15 @@ async def get_current_active_user(
 
 
 CurrentActiveUser = Annotated[UserSchema, Depends(get_current_active_user)]
+
+
+async def get_current_admin_user(current_user: CurrentActiveUser):
+    """
+    Return the current user if it is an administrator, otherwise raise HTTPAdminAccessDenied.
+    """
+    if not current_user["is_admin"]:
+        raise HTTPAdminAccessDenied()
+    return current_user
+
+
+CurrentAdminUser = Annotated[UserSchema, Depends(get_current_admin_user)]
@@ -1,17 +1,26 @@
 import logging
 from datetime import timedelta
+from typing import Annotated
 
 from fastapi import APIRouter, Body, Depends, HTTPException
 from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
 from starlette import status
-from starlette.responses import JSONResponse
 
+from src.admin.service import get_audit_record
+from src.auth.cache import get_token_cache, get_user_cache
 from src.auth.database import add_user_in_db, retrieve_user_by_email
-from src.auth.dependencies import CurrentActiveUser
+from src.auth.dependencies import CurrentActiveUser, CurrentAdminUser
 from src.auth.exceptions import HTTPIncorrectUsernameOrPassword, HTTPUserAlreadyExists
 from src.auth.schemas import Token, UserAuthSchema, UserSchema
-from src.auth.service import authenticate_user, create_access_token, get_password_hash
-from src.service import dict_fields_to_str_converter
+from src.auth.service import (
+    authenticate_user,
+    create_access_token,
+    get_password_hash_async,
+    oauth2_scheme,
+    revoke_access_token,
+)
+from src.serializers import FastJSONResponse, serialize_document
 from src.settings import get_settings
 
 logger = logging.getLogger(__name__)
@@ -30,11 +39,18 @@ async def register(user_data: UserSchema = Body(...)):
     logger.info("Registering user: %s", user_data.email)
 
     if not await retrieve_user_by_email(user_data.email):
-        user_data.password = get_password_hash(user_data.password)
-        new_user = await add_user_in_db(jsonable_encoder(user_data))
+        user_data.password = await get_password_hash_async(user_data.password)
+        try:
+            new_user = await add_user_in_db(
+                jsonable_encoder(user_data),
+                get_audit_record("auth.register", user_data.email),
+            )
+        except DuplicateKeyError:
+            # Concurrent registration with the same email won the race
+            raise HTTPUserAlreadyExists(user_data.email)
         if new_user:
-            return JSONResponse(
-                dict_fields_to_str_converter(new_user),
+            return FastJSONResponse(
+                serialize_document(new_user),
                 status_code=status.HTTP_201_CREATED,
             )
         else:
@@ -64,3 +80,55 @@ async def user_info(current_user: CurrentActiveUser):
     Get current user info.
     """
     return {"email": current_user["email"]}
+
+
+@router.get("/cache", response_description="User cache stats")
+async def user_cache_stats(current_user: CurrentAdminUser):
+    """
+    Get user cache size and hit/miss counters.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    return get_user_cache().stats()
+
+
+@router.delete("/cache", response_description="User cache cleared")
+async def clear_user_cache(current_user: CurrentAdminUser, email: str | None = None):
+    """
+    Invalidate the cached user with the given email or the whole user cache.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    if email:
+        get_user_cache().invalidate(email)
+    else:
+        get_user_cache().clear()
+    return get_user_cache().stats()
+
+
+@router.post("/logout", response_description="Access token revoked")
+async def logout(
+    current_user: CurrentActiveUser, token: Annotated[str, Depends(oauth2_scheme)]
+):
+    """
+    Revoke the access token of the current request.
+    """
+    revoke_access_token(token)
+    return {"message": "Logged out"}
+
+
+@router.get("/tokens/cache", response_description="Token cache stats")
+async def token_cache_stats(current_user: CurrentAdminUser):
+    """
+    Get verified token cache size, revocations and hit/miss counters.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    return get_token_cache().stats()
+
+
+@router.delete("/tokens", response_description="User tokens revoked")
+async def revoke_user_tokens(current_user: CurrentAdminUser, email: str):
+    """
+    Revoke all access tokens of the user with the given email issued before now.
+    If current user is not administrator, then raise HTTPAdminAccessDenied.
+    """
+    get_token_cache().revoke_user(email)
+    return get_token_cache().stats()
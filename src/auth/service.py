@@ -1,20 +1,48 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Annotated
+from functools import lru_cache
+from typing import Annotated, Callable, TypeVar
 
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from jwt import InvalidTokenError
-from passlib.context import CryptContext
 from pydantic import EmailStr
 
+from src.auth.cache import get_token_cache, get_user_cache, token_digest
 from src.auth.database import retrieve_user_by_email
-from src.auth.exceptions import HTTPCredentialsException
+from src.auth.exceptions import HTTPCredentialsException, HTTPServiceBusy
 from src.auth.schemas import TokenData
 from src.settings import get_settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+password_tasks_pending = 0
+
+T = TypeVar("T")
+
+
+@lru_cache
+def get_password_context():
+    """
+    Return the password hashing context, passlib is imported on first use.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+@lru_cache
+def get_password_executor() -> ThreadPoolExecutor:
+    """
+    Return the worker pool for password hashing.
+    bcrypt blocks for hundreds of milliseconds, so it runs outside the event loop.
+    """
+    return ThreadPoolExecutor(
+        max_workers=get_settings().password_hash_workers,
+        thread_name_prefix="password-hash",
+    )
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -26,7 +54,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # Sub-second "iat", so a token issued right after its user was revoked stays valid
+    to_encode.update({"exp": expire, "iat": time.time()})
     encode_jwt = jwt.encode(
         to_encode, get_settings().secret_key, get_settings().algorithm
     )
@@ -37,35 +66,96 @@ def get_password_hash(password: str) -> str:
     """
     Hash a plain password.
     """
-    return pwd_context.hash(password)
+    return get_password_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed password.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+async def run_password_task(func: Callable[..., T], *args) -> T:
     """
-    Extract and return the user from the access token.
+    Run a password hashing function in the worker pool.
+    If too many tasks are already pending, then raise HTTPServiceBusy.
     """
+    global password_tasks_pending
+    if password_tasks_pending >= get_settings().password_hash_queue_limit:
+        raise HTTPServiceBusy()
+
+    password_tasks_pending += 1
     try:
-        payload = jwt.decode(
-            token, get_settings().secret_key, algorithms=[get_settings().algorithm]
-        )
-        email: str = payload.get("sub")
-        if email is None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_password_executor(), func, *args)
+    finally:
+        password_tasks_pending -= 1
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hash a plain password in the worker pool.
+    """
+    return await run_password_task(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a plain password against a hashed password in the worker pool.
+    """
+    return await run_password_task(verify_password, plain_password, hashed_password)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verify the access token and return its claims.
+    Verified claims are cached until the token expires, so the signature
+    of a token is checked once per process.
+    """
+    digest = token_digest(token)
+    claims = get_token_cache().get(digest)
+    if claims is None:
+        try:
+            payload = jwt.decode(
+                token, get_settings().secret_key, algorithms=[get_settings().algorithm]
+            )
+        except InvalidTokenError:
             raise HTTPCredentialsException()
-        token_data = TokenData(email=email)
-    except InvalidTokenError:
-        raise HTTPCredentialsException()
-    except JWTError:
+        except JWTError:
+            raise HTTPCredentialsException()
+        if payload.get("sub") is None or payload.get("exp") is None:
+            raise HTTPCredentialsException()
+        claims = {
+            "sub": payload["sub"],
+            "exp": payload["exp"],
+            "iat": payload.get("iat", 0),
+        }
+        get_token_cache().set(digest, claims)
+
+    if get_token_cache().is_revoked(digest, claims):
         raise HTTPCredentialsException()
-    user = await retrieve_user_by_email(token_data.email)
+    return claims
+
+
+def revoke_access_token(token: str) -> None:
+    """
+    Revoke the access token, it will not be accepted until it expires.
+    """
+    get_token_cache().revoke_token(token_digest(token), decode_access_token(token))
+
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+    """
+    Extract and return the user from the access token.
+    """
+    token_data = TokenData(email=decode_access_token(token)["sub"])
+    user = get_user_cache().get(token_data.email)
     if user is None:
-        raise HTTPCredentialsException()
+        user = await retrieve_user_by_email(token_data.email)
+        if user is None:
+            raise HTTPCredentialsException()
+        get_user_cache().set(token_data.email, user)
     return user
 
 
@@ -74,7 +164,7 @@ async def authenticate_user(email: EmailStr, password: str):
     Authenticate a user and return the user object if the credentials are valid.
     """
     user = await retrieve_user_by_email(email)
-    if user and verify_password(
+    if user and await verify_password_async(
         plain_password=password, hashed_password=user["password"]
     ):
         return user
@@ -0,0 +1,228 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.settings import Settings, get_settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Event streams are flushed per event, compressing them only adds latency
+SKIP_CONTENT_TYPES = ("text/event-stream",)
+ENCODINGS = ("gzip", "br")
+CONDITIONAL_HEADERS = (b"if-match", b"if-none-match")
+
+
+class GzipCompressor:
+    encoding = "gzip"
+
+    def __init__(self, level: int):
+        # wbits 31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliCompressor:
+    encoding = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+def parse_accept_encoding(value: str) -> dict[str, float]:
+    """
+    Return the quality of every encoding of the Accept-Encoding header.
+    """
+    qualities = {}
+    for item in value.split(","):
+        encoding, *params = item.strip().lower().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, param_value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        if encoding:
+            qualities[encoding] = quality
+    return qualities
+
+
+def add_etag_encoding(etag: str, encoding: str) -> str:
+    """
+    Return the ETag of the representation compressed with the encoding,
+    so it does not share a strong validator with the uncompressed one.
+    """
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def remove_etag_encodings(value: str) -> tuple[str, str | None]:
+    """
+    Replace ETags of compressed representations in an If-Match or If-None-Match header
+    with ETags of the uncompressed ones. Return the header and the removed encoding.
+    """
+    tags = []
+    removed = None
+    for tag in value.split(","):
+        tag = tag.strip()
+        for encoding in ENCODINGS:
+            suffix = f'-{encoding}"'
+            if tag.endswith(suffix):
+                tag = tag[: -len(suffix)] + '"'
+                removed = encoding
+                break
+        tags.append(tag)
+    return ", ".join(tags), removed
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware which compresses responses with brotli or gzip,
+    as negotiated by the Accept-Encoding header. brotli is used if installed.
+    Responses smaller than compression_min_size are sent as is, streaming
+    responses are compressed chunk by chunk.
+    The ETag of a compressed response gets the encoding as a suffix, which is removed
+    from If-Match and If-None-Match, so the application compares its own ETags.
+    """
+
+    def __init__(self, app: ASGIApp, settings: Settings | None = None):
+        settings = settings or get_settings()
+        self.app = app
+        self.min_size = settings.compression_min_size
+        self.gzip_level = settings.compression_gzip_level
+        self.brotli_quality = settings.compression_brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_encoding = self.remove_request_etag_encodings(scope)
+        if request_encoding is not None:
+            send = self.add_not_modified_etag_encoding(send, request_encoding)
+
+        compressor_factory = self.get_compressor_factory(Headers(scope=scope))
+        if compressor_factory is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        compressor = None
+        skip = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, compressor, skip
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                skip = "content-encoding" in headers or headers.get(
+                    "content-type", ""
+                ).startswith(SKIP_CONTENT_TYPES)
+                if skip:
+                    await send(message)
+                else:
+                    # Wait for the first body chunk to decide whether to compress
+                    start_message = message
+                return
+
+            if skip or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not more_body and len(body) < self.min_size:
+                    await send(start_message)
+                    await send(message)
+                    start_message = None
+                    skip = True
+                    return
+
+                compressor = compressor_factory()
+                headers["Content-Encoding"] = compressor.encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["ETag"] = add_etag_encoding(
+                        headers["etag"], compressor.encoding
+                    )
+                if more_body:
+                    del headers["Content-Length"]
+                    body = compressor.compress(body)
+                else:
+                    body = compressor.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+            elif more_body:
+                body = compressor.compress(body)
+            else:
+                body = compressor.finish(body)
+
+            await send(
+                {"type": "http.response.body", "body": body, "more_body": more_body}
+            )
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def remove_request_etag_encodings(scope: Scope) -> str | None:
+        """
+        Remove encodings from ETags of the conditional request headers.
+        Return the removed encoding or None.
+        """
+        if not any(name in CONDITIONAL_HEADERS for name, _ in scope["headers"]):
+            return None
+        headers = []
+        removed = None
+        for name, value in scope["headers"]:
+            if name in CONDITIONAL_HEADERS:
+                value, encoding = remove_etag_encodings(value.decode("latin-1"))
+                value = value.encode("latin-1")
+                removed = removed or encoding
+            headers.append((name, value))
+        scope["headers"] = headers
+        return removed
+
+    @staticmethod
+    def add_not_modified_etag_encoding(send: Send, encoding: str) -> Send:
+        """
+        Send the ETag of 304 Not Modified with the encoding the client validated,
+        the response has no body, so it is not compressed itself.
+        """
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 304:
+                headers = MutableHeaders(raw=message["headers"])
+                if "etag" in headers:
+                    headers["ETag"] = add_etag_encoding(headers["etag"], encoding)
+            await send(message)
+
+        return send_wrapper
+
+    def get_compressor_factory(self, headers: Headers):
+        qualities = parse_accept_encoding(headers.get("accept-encoding", ""))
+        if brotli is not None and qualities.get("br", 0) > 0:
+            return lambda: BrotliCompressor(self.brotli_quality)
+        if qualities.get("gzip", 0) > 0:
+            return lambda: GzipCompressor(self.gzip_level)
+        return None
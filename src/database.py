@@ -1,54 +1,334 @@
-import motor.motor_asyncio
-from mongomock_motor import AsyncMongoMockClient
+import logging
+from datetime import datetime, timezone
 
-from src.settings import get_settings
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, monitoring
 
-is_mock = False
+from src.settings import Settings, get_settings
 
-if get_settings().testing:
-    client = AsyncMongoMockClient()
-    is_mock = True
-else:
-    client = motor.motor_asyncio.AsyncIOMotorClient(get_settings().get_mongo_detail())
-    is_mock = False
-db_note_collection = client.dbNotes.get_collection(
-    f"{get_settings().mongo_db_note_coll}_collection"
-)
+logger = logging.getLogger(__name__)
+
+
+def is_mock() -> bool:
+    """
+    Check if the in-memory mock database is used instead of MongoDB.
+    """
+    return get_settings().testing
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Track connection pool usage of the Mongo client in this process.
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.checked_out = 0
+        self.wait_queue = 0
+        self.check_out_failures = 0
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "checked_out": self.checked_out,
+            "wait_queue": self.wait_queue,
+            "check_out_failures": self.check_out_failures,
+        }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.connections -= 1
+
+    def connection_check_out_started(self, event):
+        self.wait_queue += 1
+
+    def connection_check_out_failed(self, event):
+        self.wait_queue -= 1
+        self.check_out_failures += 1
+
+    def connection_checked_out(self, event):
+        self.wait_queue -= 1
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+
+pool_stats = PoolStatsListener()
+
+_client = None
+
+
+def create_client(settings: Settings):
+    """
+    Create a Mongo client configured from settings.
+    Client libraries are imported here, so importing this module does not pay for them.
+    """
+    if settings.testing:
+        from mongomock_motor import AsyncMongoMockClient
+
+        return AsyncMongoMockClient()
+
+    import motor.motor_asyncio
+
+    options = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "readPreference": settings.mongo_read_preference,
+        "event_listeners": [pool_stats],
+    }
+    if settings.mongo_wait_queue_timeout_ms:
+        options["waitQueueTimeoutMS"] = settings.mongo_wait_queue_timeout_ms
+    if settings.mongo_compressors:
+        options["compressors"] = settings.mongo_compressors
+    return motor.motor_asyncio.AsyncIOMotorClient(
+        settings.get_mongo_detail(), **options
+    )
+
+
+def get_client():
+    """
+    Return the Mongo client of this process, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        _client = create_client(get_settings())
+    return _client
+
+
+def close_client() -> None:
+    """
+    Close the Mongo client of this process.
+    The mock client keeps its in-memory data, so it is never closed.
+    """
+    global _client
+    if _client is not None and not is_mock():
+        _client.close()
+        _client = None
 
-db_removed_note_collection = client.dbNotes.get_collection(
-    f"{get_settings().mongo_db_removed_note_coll}_collection"
-)
 
-db_auth_collection = client.dbNotes.get_collection(
-    f"{get_settings().mongo_db_auth_coll}_collection"
+def get_pool_stats() -> dict:
+    """
+    Return connection pool settings and usage of this process.
+    """
+    settings = get_settings()
+    return {
+        "mock": is_mock(),
+        "max_pool_size": settings.mongo_max_pool_size,
+        "min_pool_size": settings.mongo_min_pool_size,
+        **pool_stats.stats(),
+    }
+
+
+def get_note_collection():
+    return get_client().dbNotes.get_collection(
+        f"{get_settings().mongo_db_note_coll}_collection"
+    )
+
+
+def get_removed_note_collection():
+    return get_client().dbNotes.get_collection(
+        f"{get_settings().mongo_db_removed_note_coll}_collection"
+    )
+
+
+def get_auth_collection():
+    return get_client().dbNotes.get_collection(
+        f"{get_settings().mongo_db_auth_coll}_collection"
+    )
+
+
+def get_job_collection():
+    return get_client().dbNotes.get_collection(
+        f"{get_settings().mongo_db_job_coll}_collection"
+    )
+
+
+def get_audit_collection():
+    return get_client().dbNotes.get_collection(
+        f"{get_settings().mongo_db_audit_coll}_collection"
+    )
+
+
+# Audit records are pushed into this field of the audited document by the same write,
+# then moved into the audit collection in the background
+AUDIT_PENDING = "audit_pending"
+
+# Covers only documents with audit records not moved yet
+AUDIT_PENDING_INDEX = IndexModel(
+    [(f"{AUDIT_PENDING}._id", ASCENDING)],
+    partialFilterExpression={f"{AUDIT_PENDING}._id": {"$exists": True}},
 )
 
 
+AUTH_INDEXES = [
+    IndexModel([("email", ASCENDING)], unique=True),
+    AUDIT_PENDING_INDEX,
+]
+
+
+def get_note_indexes() -> list[IndexModel]:
+    """
+    Return the indexes of the notes collection, the TTL comes from settings.
+    """
+    return [
+        IndexModel([("owner", ASCENDING)]),
+        IndexModel([("owner", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("title", ASCENDING)]),
+        IndexModel([("updated_at", DESCENDING)]),
+        IndexModel(
+            [("owner", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)]
+        ),
+        IndexModel(
+            [("title", TEXT), ("body", TEXT)],
+            weights={"title": 5, "body": 1},
+            name="notes_text",
+        ),
+        # Covers only deleted notes and purges them after the TTL
+        IndexModel(
+            [("deleted_at", ASCENDING)],
+            partialFilterExpression={"deleted_at": {"$exists": True}},
+            expireAfterSeconds=get_settings().notes_deleted_ttl_seconds,
+        ),
+        AUDIT_PENDING_INDEX,
+    ]
+
+
+JOB_INDEXES = [
+    IndexModel([("status", ASCENDING), ("run_at", ASCENDING)]),
+]
+
+AUDIT_INDEXES = [
+    IndexModel([("at", DESCENDING)]),
+]
+
+
 async def drop_collections():
-    await db_note_collection.drop()
-    await db_removed_note_collection.drop()
-    await db_auth_collection.drop()
-
-
-# def init_db(app: FastAPI):
-#     """
-#     Initialise db connection at startup
-#     Shutdown the db at shutdown
-#     :param app: FastAPI to initialise
-#     :return: None
-#     """
-#
-#     @app.on_event("startup")
-#     async def startup_db_client():
-#         if TESTING:
-#             client = AsyncMongoMockClient()
-#         else:
-#             client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_DETAILS)
-#
-#         app.mongodb_client = client
-#         app.db_note_collection = client.dbNotes.get_collection(f"{MONGO_DB_NOTE_COLLECTION}_collection")
-#         app.db_auth_collection = client.dbNotes.get_collection(f"{MONGO_DB_AUTH_COLLECTION}_collection")
-#
-#     @app.on_event("shutdown")
-#     async def shutdown_db_client():
-#         app.mongodb_client.close()
+    await get_note_collection().drop()
+    await get_removed_note_collection().drop()
+    await get_auth_collection().drop()
+    await get_job_collection().drop()
+    await get_audit_collection().drop()
+
+
+async def ensure_collection_indexes(collection, indexes: list[IndexModel]) -> list[str]:
+    """
+    Create the missing indexes of a collection and return their names.
+    Already existing indexes are left untouched.
+    """
+    existing = await collection.index_information()
+    if not is_mock():
+        await sync_ttl_indexes(collection, indexes, existing)
+    missing = [index for index in indexes if index.document["name"] not in existing]
+    if not missing:
+        return []
+    created = await collection.create_indexes(missing)
+    logger.info("Created indexes on %s: %s", collection.name, ", ".join(created))
+    return created
+
+
+async def sync_ttl_indexes(
+    collection, indexes: list[IndexModel], existing: dict
+) -> None:
+    """
+    Update expireAfterSeconds of existing TTL indexes if it was changed in settings.
+    """
+    for index in indexes:
+        name = index.document["name"]
+        ttl = index.document.get("expireAfterSeconds")
+        if ttl is None or name not in existing:
+            continue
+        if existing[name].get("expireAfterSeconds") != ttl:
+            await collection.database.command(
+                "collMod",
+                collection.name,
+                index={"name": name, "expireAfterSeconds": ttl},
+            )
+            logger.info(
+                "Updated TTL of index %s on %s to %ds", name, collection.name, ttl
+            )
+
+
+async def ensure_indexes() -> list[str]:
+    """
+    Create indexes backing the hot queries. Safe to call on every startup.
+    """
+    created = await ensure_collection_indexes(get_auth_collection(), AUTH_INDEXES)
+    created += await ensure_collection_indexes(
+        get_note_collection(), get_note_indexes()
+    )
+    created += await ensure_collection_indexes(get_job_collection(), JOB_INDEXES)
+    created += await ensure_collection_indexes(get_audit_collection(), AUDIT_INDEXES)
+    return created
+
+
+def _plan_stages(plan) -> list[str]:
+    """
+    Collect all stage names of a query plan.
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages += _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages += _plan_stages(value)
+    return stages
+
+
+async def check_query_plans() -> list[str]:
+    """
+    Explain the hot queries and warn about those which scan the whole collection.
+    Return the names of such queries. The mock DB has no query planner, so it is skipped.
+    """
+    if is_mock():
+        return []
+
+    auth_collection = get_auth_collection()
+    note_collection = get_note_collection()
+    queries = {
+        "user by email": auth_collection.find({"email": ""}),
+        "notes by owner": note_collection.find({"owner": ""}),
+        "notes page by owner": note_collection.find(
+            {"owner": "", "_id": {"$gt": ObjectId()}}
+        ).sort("_id", ASCENDING),
+        "note by title": note_collection.find({"title": ""}),
+        "notes updated since": note_collection.find(
+            {"updated_at": {"$gte": datetime.now(timezone.utc)}}
+        ),
+        "note changes by owner": note_collection.find(
+            {"owner": "", "updated_at": {"$gt": datetime.now(timezone.utc)}}
+        ).sort([("updated_at", ASCENDING), ("_id", ASCENDING)]),
+        "notes with pending audit records": note_collection.find(
+            {f"{AUDIT_PENDING}._id": {"$exists": True}}
+        ),
+        "due jobs": get_job_collection().find(
+            {"status": "pending", "run_at": {"$lte": datetime.now(timezone.utc)}}
+        ),
+    }
+    collscans = []
+    for name, cursor in queries.items():
+        explain = await cursor.explain()
+        if "COLLSCAN" in _plan_stages(explain.get("queryPlanner", {})):
+            logger.warning("Query '%s' is not backed by an index (COLLSCAN)", name)
+            collscans.append(name)
+    return collscans
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+from src.database import get_job_collection
+from src.metrics.service import track_db_operation
+from src.serializers import serialize_document
+
+PENDING = "pending"
+RUNNING = "running"
+FAILED = "failed"
+
+
+def get_due_query(now: datetime) -> dict:
+    """
+    Match jobs which are due to run: pending ones whose time has come
+    and running ones whose worker did not finish them within the lease.
+    """
+    return {
+        "$or": [
+            {"status": PENDING, "run_at": {"$lte": now}},
+            {"status": RUNNING, "locked_until": {"$lt": now}},
+        ]
+    }
+
+
+@track_db_operation
+async def add_job_in_db(name: str, payload: dict) -> dict:
+    """
+    Store a new pending job in the outbox and return it.
+    """
+    now = datetime.now(timezone.utc)
+    job = {
+        "name": name,
+        "payload": payload,
+        "status": PENDING,
+        "attempts": 0,
+        "run_at": now,
+        "created_at": now,
+    }
+    await get_job_collection().insert_one(job)
+    return serialize_document(job)
+
+
+@track_db_operation
+async def claim_job(job_id: str, lease_seconds: float) -> dict | None:
+    """
+    Mark a due job as running for the lease time and count the attempt.
+    Return None if the job is not due, e.g. another worker has claimed it.
+    The payload is returned as stored, so handlers get BSON values such as datetime.
+    """
+    now = datetime.now(timezone.utc)
+    job = await get_job_collection().find_one_and_update(
+        {"_id": ObjectId(job_id), **get_due_query(now)},
+        {
+            "$set": {
+                "status": RUNNING,
+                "locked_until": now + timedelta(seconds=lease_seconds),
+            },
+            "$inc": {"attempts": 1},
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+    if job:
+        job["_id"] = str(job["_id"])
+    return job
+
+
+@track_db_operation
+async def complete_job(job_id: str) -> None:
+    """
+    Remove a finished job from the outbox.
+    """
+    await get_job_collection().delete_one({"_id": ObjectId(job_id)})
+
+
+@track_db_operation
+async def retry_job(job_id: str, run_at: datetime, error: str) -> None:
+    """
+    Return a failed attempt of a job to the outbox to be run again at run_at.
+    """
+    await get_job_collection().update_one(
+        {"_id": ObjectId(job_id)},
+        {
+            "$set": {"status": PENDING, "run_at": run_at, "last_error": error},
+            "$unset": {"locked_until": ""},
+        },
+    )
+
+
+@track_db_operation
+async def fail_job(job_id: str, error: str) -> None:
+    """
+    Keep a job which ran out of attempts in the outbox for inspection.
+    """
+    await get_job_collection().update_one(
+        {"_id": ObjectId(job_id)},
+        {
+            "$set": {
+                "status": FAILED,
+                "last_error": error,
+                "failed_at": datetime.now(timezone.utc),
+            },
+            "$unset": {"locked_until": ""},
+        },
+    )
+
+
+@track_db_operation
+async def restart_failed_job(job_id: str) -> dict | None:
+    """
+    Make a failed job pending again with a fresh count of attempts and return it.
+    Return None if there is no such failed job.
+    """
+    job = await get_job_collection().find_one_and_update(
+        {"_id": ObjectId(job_id), "status": FAILED},
+        {
+            "$set": {
+                "status": PENDING,
+                "attempts": 0,
+                "run_at": datetime.now(timezone.utc),
+            },
+            "$unset": {"failed_at": ""},
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+    if job:
+        return serialize_document(job)
+
+
+@track_db_operation
+async def retrieve_due_job_ids(limit: int) -> list[str]:
+    """
+    Retrieve IDs of due jobs, the oldest first.
+    """
+    cursor = (
+        get_job_collection()
+        .find(get_due_query(datetime.now(timezone.utc)), {"_id": 1})
+        .sort("run_at", ASCENDING)
+        .limit(limit)
+    )
+    return [str(job["_id"]) async for job in cursor]
+
+
+@track_db_operation
+async def count_jobs_by_status() -> dict[str, int]:
+    """
+    Count jobs in the outbox by status.
+    """
+    pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+    counts = {PENDING: 0, RUNNING: 0, FAILED: 0}
+    async for row in get_job_collection().aggregate(pipeline):
+        counts[row["_id"]] = row["count"]
+    return counts
+
+
+@track_db_operation
+async def retrieve_failed_jobs(limit: int = 100) -> list[dict]:
+    """
+    Retrieve jobs which ran out of attempts, the most recently failed first.
+    """
+    cursor = (
+        get_job_collection()
+        .find({"status": FAILED})
+        .sort("failed_at", DESCENDING)
+        .limit(limit)
+    )
+    return [serialize_document(job) async for job in cursor]
@@ -0,0 +1,10 @@
+from fastapi import HTTPException
+from starlette import status
+
+
+class HTTPJobNoExists(HTTPException):
+    def __init__(self, id: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Failed job with id {id} no exists",
+        )
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Awaitable, Callable
+
+from src.jobs.database import (
+    add_job_in_db,
+    claim_job,
+    complete_job,
+    fail_job,
+    retrieve_due_job_ids,
+    retry_job,
+)
+from src.metrics.registry import Counter, Gauge, Histogram
+from src.metrics.service import registry
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+jobs_total = registry.register(
+    Counter(
+        "jobs_total",
+        "Number of job attempts by job name and result.",
+        ("name", "result"),
+    )
+)
+job_duration_seconds = registry.register(
+    Histogram(
+        "job_duration_seconds",
+        "Latency of job attempts in seconds.",
+        ("name",),
+    )
+)
+jobs_queued = registry.register(
+    Gauge("jobs_queued", "Number of jobs waiting in the in-process queue.")
+)
+jobs_running = registry.register(Gauge("jobs_running", "Number of jobs being run."))
+jobs_deferred_total = registry.register(
+    Counter(
+        "jobs_deferred_total",
+        "Number of jobs left in the outbox because the in-process queue was full.",
+    )
+)
+
+JobHandler = Callable[..., Awaitable[None]]
+
+handlers: dict[str, JobHandler] = {}
+
+
+def job(name: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    Register a coroutine function as the handler of jobs with the given name.
+    The handler is called with the job payload as keyword arguments.
+    """
+
+    def decorator(handler: JobHandler) -> JobHandler:
+        handlers[name] = handler
+        return handler
+
+    return decorator
+
+
+class JobQueue:
+    """
+    In-process queue of jobs backed by the outbox collection.
+    A job is stored in the outbox before it is queued, so it survives a restart,
+    and is removed from there once its handler succeeds. Failed attempts are
+    retried with exponential backoff until max_attempts.
+    When the queue is full, new jobs wait in the outbox and are picked up by the poller.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_size: int,
+        max_attempts: int,
+        retry_delay: float,
+        lease_seconds: float,
+        poll_interval: float,
+    ):
+        self.workers = workers
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.queue: asyncio.Queue[str] = asyncio.Queue(max_size)
+        self.tasks: list[asyncio.Task] = []
+        self.running = 0
+
+    async def enqueue(self, name: str, **payload) -> str:
+        """
+        Store a job in the outbox, queue it and return its ID.
+        """
+        job_data = await add_job_in_db(name, payload)
+        self.offer(job_data["_id"])
+        return job_data["_id"]
+
+    def offer(self, job_id: str) -> bool:
+        """
+        Queue a job without waiting. Return False if the queue is full,
+        the job stays in the outbox then.
+        """
+        try:
+            self.queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            jobs_deferred_total.inc()
+            return False
+        jobs_queued.set(value=self.queue.qsize())
+        return True
+
+    def get_retry_delay(self, attempts: int) -> float:
+        return self.retry_delay * 2 ** (attempts - 1)
+
+    async def run_job(self, job_id: str) -> None:
+        """
+        Claim a job and run its handler once, then complete, retry or fail it.
+        """
+        job_data = await claim_job(job_id, self.lease_seconds)
+        if job_data is None:
+            return
+
+        name = job_data["name"]
+        start_time = time.perf_counter()
+        self.running += 1
+        jobs_running.inc()
+        try:
+            handler = handlers.get(name)
+            if handler is None:
+                raise LookupError(f"No handler of job {name}")
+            await handler(**job_data["payload"])
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if job_data["attempts"] >= self.max_attempts:
+                logger.exception("Job %s (%s) failed", name, job_id)
+                await fail_job(job_id, error)
+                jobs_total.inc(name, "failed")
+            else:
+                logger.warning("Job %s (%s) will be retried: %s", name, job_id, error)
+                delay = self.get_retry_delay(job_data["attempts"])
+                run_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                await retry_job(job_id, run_at, error)
+                jobs_total.inc(name, "retried")
+        else:
+            await complete_job(job_id)
+            jobs_total.inc(name, "completed")
+        finally:
+            self.running -= 1
+            jobs_running.dec()
+            job_duration_seconds.observe(name, value=time.perf_counter() - start_time)
+
+    async def work(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            jobs_queued.set(value=self.queue.qsize())
+            try:
+                await self.run_job(job_id)
+            except Exception:
+                logger.exception("Failed to run job %s", job_id)
+            finally:
+                self.queue.task_done()
+
+    async def poll(self) -> int:
+        """
+        Queue due jobs from the outbox while there is room in the queue.
+        These are jobs deferred by a full queue, retries and jobs of stopped workers.
+        Return the number of queued jobs.
+        """
+        free = self.max_size - self.queue.qsize()
+        if free <= 0:
+            return 0
+        job_ids = await retrieve_due_job_ids(free)
+        return sum(self.offer(job_id) for job_id in job_ids)
+
+    async def poll_periodically(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Failed to poll jobs")
+            await asyncio.sleep(self.poll_interval)
+
+    async def run_pending(self) -> int:
+        """
+        Run the queued jobs in the calling task and return their number.
+        """
+        count = 0
+        while not self.queue.empty():
+            job_id = self.queue.get_nowait()
+            await self.run_job(job_id)
+            count += 1
+        jobs_queued.set(value=0)
+        return count
+
+    def start(self) -> None:
+        """
+        Start the workers and the poller in the running event loop.
+        Jobs queued before are still in the outbox, so the poller queues them again.
+        """
+        self.clear()
+        self.tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self.poll_periodically()))
+
+    async def stop(self) -> None:
+        """
+        Stop the workers. Unfinished jobs stay in the outbox and are run
+        by another worker process or after the restart.
+        """
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def clear(self) -> None:
+        self.queue = asyncio.Queue(self.max_size)
+        jobs_queued.set(value=0)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers if self.tasks else 0,
+            "queued": self.queue.qsize(),
+            "max_size": self.max_size,
+            "running": self.running,
+        }
+
+
+@lru_cache
+def get_job_queue() -> JobQueue:
+    """
+    Return the job queue of this process configured from settings.
+    """
+    settings = get_settings()
+    return JobQueue(
+        workers=settings.jobs_workers,
+        max_size=settings.jobs_queue_max_size,
+        max_attempts=settings.jobs_max_attempts,
+        retry_delay=settings.jobs_retry_delay_seconds,
+        lease_seconds=settings.jobs_lease_seconds,
+        poll_interval=settings.jobs_poll_interval_seconds,
+    )
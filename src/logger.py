@@ -1,46 +1,158 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import random
 import sys
 import time
-from datetime import datetime
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.settings import Settings, get_settings
 
 logger = logging.getLogger()
 
-formatter = logging.Formatter(
-    fmt="[%(asctime)s] [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+# Attributes of every LogRecord, the rest of them are passed with "extra"
+RECORD_ATTRS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+# Values of credential headers are never logged, even if the headers are allow-listed
+SECRET_HEADERS = {b"authorization", b"proxy-authorization", b"cookie"}
+REDACTED = "[redacted]"
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format log records as JSON lines, "extra" fields are added as keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+_listener: QueueListener | None = None
+
+
+def setup_logging(settings: Settings) -> QueueListener:
+    """
+    Send records of the root logger through a queue to stdout and a rotating file.
+    The handlers run in the listener thread, so logging never blocks the event loop.
+    Calling it again replaces the handlers of the previous call.
+    Rotation is not safe across processes, so every worker may write its own file.
+    """
+    global _listener
+    stop_logging()
+    os.makedirs(settings.log_dir, exist_ok=True)
+    formatter = JSONFormatter()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    file_name = f"app.{os.getpid()}.log" if settings.log_file_per_process else "app.log"
+    file_handler = RotatingFileHandler(
+        os.path.join(settings.log_dir, file_name),
+        maxBytes=settings.log_file_max_bytes,
+        backupCount=settings.log_file_backup_count,
+        encoding="utf-8",
+    )
+    stream_handler.setFormatter(formatter)
+    file_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, stream_handler, file_handler)
+    logger.handlers = [QueueHandler(log_queue)]
+    logger.setLevel(logging.INFO)
+
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def stop_logging() -> None:
+    """
+    Flush the log queue and close the handlers, also called when the process exits.
+    """
+    global _listener
+    if _listener is not None:
+        logger.handlers = []
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
-directory = 'logs/'
-if not os.path.exists(directory):
-    os.makedirs(directory)
 
-stream_handler = logging.StreamHandler(sys.stdout)
-file_handler = logging.FileHandler(f'{directory}{datetime.now():%Y-%m-%d %H.%M.%S}.log')
+class LogMiddleware:
+    """
+    Pure ASGI middleware which logs every HTTP request.
+    Only allow-listed request headers are logged and credentials among them
+    are redacted, successful (2xx) requests are logged with probability log_sample_rate_2xx.
+    """
 
-stream_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
+    def __init__(self, app: ASGIApp, settings: Settings | None = None):
+        settings = settings or get_settings()
+        self.app = app
+        self.headers = {
+            header.strip().lower().encode("latin-1")
+            for header in settings.log_headers.split(",")
+            if header.strip()
+        }
+        self.sample_rate_2xx = settings.log_sample_rate_2xx
 
-logger.handlers = [stream_handler, file_handler]
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-logger.setLevel(logging.INFO)
+        start_time = time.perf_counter()
+        status_code = 500
 
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
-async def log_middleware(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    execution_time = time.time() - start_time
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            execution_time = time.perf_counter() - start_time
+            if self.should_log(status_code):
+                self.log(scope, status_code, execution_time)
 
-    log_dict = {
-        "request_method": request.method,
-        "request_url": str(request.url),
-        "execution_time": execution_time,
-        "response_status_code": response.status_code,
-        "remote_address": request.client.host,
-        "request_headers": dict(request.headers),
-    }
+    def should_log(self, status_code: int) -> bool:
+        if 200 <= status_code < 300 and self.sample_rate_2xx < 1:
+            return random.random() < self.sample_rate_2xx
+        return True
 
-    logger.info(log_dict, extra=log_dict)
-    return response
+    def log(self, scope: Scope, status_code: int, execution_time: float) -> None:
+        url = scope["path"]
+        if scope["query_string"]:
+            url += "?" + scope["query_string"].decode("latin-1")
+        client = scope.get("client")
+        log_dict = {
+            "request_method": scope["method"],
+            "request_url": url,
+            "execution_time": execution_time,
+            "response_status_code": status_code,
+            "remote_address": client[0] if client else None,
+            "request_headers": {
+                name.decode("latin-1"): (
+                    REDACTED if name in SECRET_HEADERS else value.decode("latin-1")
+                )
+                for name, value in scope["headers"]
+                if name in self.headers
+            },
+        }
+        logger.info("%s %s %d", scope["method"], url, status_code, extra=log_dict)
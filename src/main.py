@@ -1,4 +1,71 @@
+import os
+from importlib.util import find_spec
+
 import uvicorn
 
+from src.settings import Settings, get_settings
+
+
+def get_process_local_settings(settings: Settings) -> list[str]:
+    """
+    Return the settings which keep state in a single process,
+    so several worker processes would not see each other's state.
+    """
+    local = []
+    if settings.notes_cache_backend == "memory":
+        local.append("NOTES_CACHE_BACKEND=memory")
+    if settings.notes_search_backend == "memory":
+        local.append("NOTES_SEARCH_BACKEND=memory")
+    if settings.rate_limit_backend == "memory" and (
+        settings.rate_limits or settings.rate_limit_default
+    ):
+        local.append("RATE_LIMIT_BACKEND=memory")
+    if not settings.log_file_per_process:
+        local.append("LOG_FILE_PER_PROCESS=False")
+    return local
+
+
+def get_worker_count(settings: Settings) -> int:
+    """
+    Return the number of worker processes, 0 in settings means one per available CPU.
+    If several workers would keep state in a single process, then raise ValueError.
+    """
+    if settings.server_reload:
+        return 1
+    if settings.server_workers:
+        workers = settings.server_workers
+    elif hasattr(os, "sched_getaffinity"):
+        workers = len(os.sched_getaffinity(0))
+    else:
+        workers = os.cpu_count() or 1
+    local = get_process_local_settings(settings)
+    if workers > 1 and local:
+        raise ValueError(
+            f"{workers} workers need shared state, set: {', '.join(local)}"
+        )
+    return workers
+
+
+def get_uvicorn_config(settings: Settings) -> dict:
+    """
+    Return uvicorn options from settings.
+    uvloop and httptools are used when they are installed.
+    """
+    return {
+        "host": settings.server_host,
+        "port": settings.server_port,
+        "reload": settings.server_reload,
+        "workers": get_worker_count(settings),
+        "loop": "uvloop" if find_spec("uvloop") else "asyncio",
+        "http": "httptools" if find_spec("httptools") else "h11",
+        "timeout_keep_alive": settings.server_keep_alive_seconds,
+        "backlog": settings.server_backlog,
+        "limit_concurrency": settings.server_limit_concurrency,
+        # On SIGTERM stop accepting connections and wait for in-flight requests,
+        # then every worker runs the lifespan shutdown which closes its Mongo client
+        "timeout_graceful_shutdown": settings.server_graceful_shutdown_seconds,
+    }
+
+
 if __name__ == "__main__":
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("src.app:app", **get_uvicorn_config(get_settings()))
@@ -0,0 +1,234 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.auth.service import get_current_user
+from src.notes.service import is_user_admin
+from src.settings import Settings, get_settings
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = re.compile(rb"(^|&)profile=(1|true)(&|$)")
+# Deepest frames kept in a sample, the outermost frames are dropped
+MAX_STACK_DEPTH = 128
+
+
+def get_profile_dir() -> str:
+    return os.path.join(get_settings().log_dir, "profiles")
+
+
+def list_profiles() -> list[str]:
+    """
+    Return names of stored profiles, the newest first.
+    """
+    profile_dir = get_profile_dir()
+    if not os.path.isdir(profile_dir):
+        return []
+    return sorted(os.listdir(profile_dir), reverse=True)
+
+
+def get_profile_name(scope: Scope, kind: str) -> str:
+    path = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+    now = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    return f"{now}-{scope['method']}-{path}-{kind}"
+
+
+def write_profile(name: str, content: bytes | str) -> None:
+    """
+    Store a profile under the profiles directory and remove the oldest ones
+    above profile_max_files.
+    """
+    profile_dir = get_profile_dir()
+    os.makedirs(profile_dir, exist_ok=True)
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(os.path.join(profile_dir, name), mode) as f:
+        f.write(content)
+    for old_name in list_profiles()[get_settings().profile_max_files :]:
+        os.remove(os.path.join(profile_dir, old_name))
+
+
+def format_cprofile(profiler: cProfile.Profile) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(50)
+    return stream.getvalue()
+
+
+class StackSampler:
+    """
+    Sample stacks of event loop threads from a background thread
+    while they have requests in flight. Samples are kept in a bounded ring buffer.
+    """
+
+    def __init__(self, interval: float, max_samples: int = 100_000):
+        self.interval = interval
+        self.samples: deque[tuple[float, int, str]] = deque(maxlen=max_samples)
+        # Requests in flight by thread ID
+        self.active: dict[int, int] = {}
+        self._thread = threading.Thread(
+            target=self.run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            if not self.active:
+                continue
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            for thread_id in list(self.active):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.samples.append((now, thread_id, self.fold(frame)))
+
+    @staticmethod
+    def fold(frame) -> str:
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append(f"{code.co_filename}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def start_request(self, thread_id: int) -> None:
+        self.active[thread_id] = self.active.get(thread_id, 0) + 1
+
+    def finish_request(self, thread_id: int) -> None:
+        self.active[thread_id] -= 1
+        if not self.active[thread_id]:
+            del self.active[thread_id]
+
+    def collect(self, thread_id: int, start: float, end: float) -> str:
+        """
+        Return samples of the thread taken between start and end in the folded stacks format
+        (one "frame;frame;frame count" line per stack), which flame graph tools read.
+        """
+        # list() copies the deque without releasing the GIL
+        stacks = Counter(
+            stack
+            for taken, sample_thread_id, stack in list(self.samples)
+            if sample_thread_id == thread_id and start <= taken <= end
+        )
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def is_event_stream(message: Message) -> bool:
+    """
+    Check if the response started by the message is a stream of Server-Sent Events.
+    """
+    for name, value in message.get("headers", []):
+        if name.lower() == b"content-type":
+            return value.startswith(b"text/event-stream")
+    return False
+
+
+class ProfilerMiddleware:
+    """
+    Pure ASGI middleware which profiles requests and stores profiles under log_dir/profiles.
+    An administrator can profile a request with cProfile by the "X-Profile: 1" header
+    or the "profile=1" query parameter, the profile name is returned in the X-Profile header.
+    If profile_slow_request_seconds is set, the event loop stack is sampled while requests
+    are in flight and the samples of requests slower than that are stored.
+    Server-Sent Events and WebSocket connections are long-lived by design and not sampled.
+    The event loop runs other requests concurrently, so their frames can be in the profile too.
+    """
+
+    def __init__(self, app: ASGIApp, settings: Settings | None = None):
+        settings = settings or get_settings()
+        self.app = app
+        self.slow_request_seconds = settings.profile_slow_request_seconds
+        self.sample_interval = settings.profile_sample_interval_seconds
+        self.sampler: StackSampler | None = None
+        # Only one cProfile profiler can be active in a thread
+        self.profiling = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # The flag is checked after the user lookup, which may let another request
+        # start profiling, and set before the next await in profile_request
+        if await self.is_profile_requested(scope) and not self.profiling:
+            await self.profile_request(scope, receive, send)
+        elif self.slow_request_seconds:
+            await self.sample_request(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def is_profile_requested(self, scope: Scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER) not in (b"1", b"true") and not (
+            PROFILE_QUERY.search(scope["query_string"])
+        ):
+            return False
+
+        scheme, _, token = headers.get(b"authorization", b"").decode().partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        try:
+            current_user = await get_current_user(token)
+        except HTTPException:
+            return False
+        return await is_user_admin(current_user)
+
+    async def profile_request(self, scope: Scope, receive: Receive, send: Send) -> None:
+        name = get_profile_name(scope, "cprofile.txt")
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_HEADER, name.encode()),
+                ]
+            await send(message)
+
+        self.profiling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self.profiling = False
+            await asyncio.to_thread(write_profile, name, format_cprofile(profiler))
+
+    async def sample_request(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.sampler is None:
+            self.sampler = StackSampler(self.sample_interval)
+
+        thread_id = threading.get_ident()
+        self.sampler.start_request(thread_id)
+        start_time = time.perf_counter()
+        streaming = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal streaming
+            if message["type"] == "http.response.start" and is_event_stream(message):
+                # Event feeds stay open as long as the client wants, they are not slow
+                streaming = True
+                self.sampler.finish_request(thread_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_time = time.perf_counter()
+            if not streaming:
+                self.sampler.finish_request(thread_id)
+            if not streaming and end_time - start_time >= self.slow_request_seconds:
+                samples = self.sampler.collect(thread_id, start_time, end_time)
+                if samples:
+                    name = get_profile_name(scope, "samples.folded")
+                    await asyncio.to_thread(write_profile, name, samples)
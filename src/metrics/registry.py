@@ -0,0 +1,193 @@
+import math
+from bisect import bisect_left
+
+# Default buckets of Prometheus client libraries, in seconds
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1,
+    2.5,
+    5,
+    7.5,
+    10,
+)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """
+    Base class of metrics. Values are kept in a plain dict by label values.
+    Metrics are updated only from the event loop thread, so there are no locks.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple[str, ...], object] = {}
+
+    def snapshot(self) -> list[list]:
+        """
+        Return values as JSON-serializable [label values, value] pairs.
+        """
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+    @staticmethod
+    def merge_value(value, other):
+        return value + other
+
+    def merge(self, snapshots: list[list[list]]) -> dict[tuple[str, ...], object]:
+        """
+        Sum snapshots of this metric from several processes.
+        """
+        merged = {}
+        for snapshot in snapshots:
+            for labels, value in snapshot:
+                labels = tuple(labels)
+                if labels in merged:
+                    merged[labels] = self.merge_value(merged[labels], value)
+                else:
+                    merged[labels] = value
+        return merged
+
+    def render(self, values: dict[tuple[str, ...], object]) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for labels, value in sorted(values.items()):
+            lines.extend(self.render_samples(labels, value))
+        return lines
+
+    def render_samples(self, labels: tuple[str, ...], value) -> list[str]:
+        return [
+            f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}"
+        ]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, *labels: str, value: float) -> None:
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Histogram with fixed buckets. A value is a list of per-bucket counts
+    (the last one is +Inf) followed by the sum of observations.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, *labels: str, value: float) -> None:
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def snapshot(self) -> list[list]:
+        return [[list(labels), list(value)] for labels, value in self.values.items()]
+
+    @staticmethod
+    def merge_value(value, other):
+        return [a + b for a, b in zip(value, other)]
+
+    def render_samples(self, labels: tuple[str, ...], value) -> list[str]:
+        names = self.labelnames + ("le",)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, value):
+            cumulative += count
+            lines.append(
+                f"{self.name}_bucket{format_labels(names, labels + (format_value(bound),))}"
+                f" {format_value(cumulative)}"
+            )
+        label_text = format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{label_text} {format_value(value[-1])}")
+        lines.append(f"{self.name}_count{label_text} {format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    """
+    Collection of metrics rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict[str, list[list]]:
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def render(self, snapshots: list[dict[str, list[list]]] | None = None) -> str:
+        """
+        Render metrics of this process, or the sum of snapshots of several processes.
+        """
+        lines = []
+        for name, metric in self.metrics.items():
+            if snapshots is None:
+                values = metric.values
+            else:
+                values = metric.merge(
+                    [snapshot[name] for snapshot in snapshots if name in snapshot]
+                )
+            lines.extend(metric.render(values))
+        return "\n".join(lines) + "\n"
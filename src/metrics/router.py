@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from starlette.responses import PlainTextResponse
+
+from src.metrics.service import render_metrics
+
+router = APIRouter(
+    tags=["Metrics"],
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Get metrics in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(
+        await render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,229 @@
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from contextlib import suppress
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics.registry import Counter, Gauge, Histogram, Registry
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+registry = Registry()
+
+http_requests_total = registry.register(
+    Counter(
+        "http_requests_total",
+        "Number of HTTP requests.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration_seconds = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Latency of HTTP requests in seconds.",
+        ("method", "route"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "Number of HTTP requests being processed.")
+)
+db_operation_duration_seconds = registry.register(
+    Histogram(
+        "db_operation_duration_seconds",
+        "Latency of database layer operations in seconds.",
+        ("module", "operation"),
+    )
+)
+db_operation_errors_total = registry.register(
+    Counter(
+        "db_operation_errors_total",
+        "Number of database layer operations which raised an exception.",
+        ("module", "operation"),
+    )
+)
+
+# Requests which matched no route share one label to keep the number of series bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware which counts HTTP requests by route template and measures their latency.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            # The router puts the matched route into the scope
+            route = scope.get("route")
+            route = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            http_requests_total.inc(method, route, str(status_code))
+            http_request_duration_seconds.observe(
+                method, route, value=time.perf_counter() - start_time
+            )
+
+
+def track_db_operation(func):
+    """
+    Decorator which measures the latency of a database layer coroutine or async generator.
+    Decorate only functions which talk to the database themselves, not the ones
+    calling other decorated functions, so every round-trip is measured once.
+    """
+    labels = (func.__module__.split(".")[-2], func.__name__)
+
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                async for item in func(*args, **kwargs):
+                    yield item
+            except Exception:
+                db_operation_errors_total.inc(*labels)
+                raise
+            finally:
+                db_operation_duration_seconds.observe(
+                    *labels, value=time.perf_counter() - start_time
+                )
+
+        return wrapper
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            db_operation_errors_total.inc(*labels)
+            raise
+        finally:
+            db_operation_duration_seconds.observe(
+                *labels, value=time.perf_counter() - start_time
+            )
+
+    return wrapper
+
+
+def get_metrics_path(metrics_dir: str, pid: int | None = None) -> str:
+    return os.path.join(metrics_dir, f"{pid or os.getpid()}.json")
+
+
+def write_metrics_snapshot(snapshot: dict | None = None) -> None:
+    """
+    Write metrics of this worker process into the shared metrics directory.
+    """
+    if snapshot is None:
+        snapshot = registry.snapshot()
+    metrics_dir = get_settings().metrics_dir
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = get_metrics_path(metrics_dir)
+    # Replace the file atomically, so readers never see a partial snapshot
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def read_metrics_snapshots() -> list[dict]:
+    """
+    Read metrics snapshots of all worker processes from the shared metrics directory.
+    """
+    metrics_dir = get_settings().metrics_dir
+    snapshots = []
+    for name in os.listdir(metrics_dir):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(metrics_dir, name), encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            logger.warning("Skip unreadable metrics snapshot %s", name)
+    return snapshots
+
+
+def is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+
+def remove_stale_metrics_snapshots() -> list[str]:
+    """
+    Remove snapshots of worker processes which are not running anymore,
+    so their gauges (e.g. requests in flight) are not summed forever.
+    Return names of removed snapshots.
+    """
+    metrics_dir = get_settings().metrics_dir
+    if not os.path.isdir(metrics_dir):
+        return []
+    removed = []
+    for name in os.listdir(metrics_dir):
+        pid, _, extension = name.partition(".")
+        if extension != "json" or not pid.isdigit() or is_process_alive(int(pid)):
+            continue
+        with suppress(FileNotFoundError):
+            os.remove(os.path.join(metrics_dir, name))
+        removed.append(name)
+    return removed
+
+
+def remove_metrics_snapshot() -> None:
+    """
+    Remove the snapshot of this worker process when it stops.
+    """
+    with suppress(FileNotFoundError):
+        os.remove(get_metrics_path(get_settings().metrics_dir))
+
+
+async def render_metrics() -> str:
+    """
+    Render metrics in the text exposition format.
+    If metrics_dir is set, the metrics are summed over all worker processes.
+    """
+    if not get_settings().metrics_dir:
+        return registry.render()
+    # Take the snapshot in the event loop thread, files are written and read in a thread
+    await asyncio.to_thread(write_metrics_snapshot, registry.snapshot())
+    return registry.render(await asyncio.to_thread(read_metrics_snapshots))
+
+
+async def flush_metrics_periodically() -> None:
+    """
+    Write metrics snapshots of this worker process every metrics_flush_interval_seconds.
+    """
+    interval = get_settings().metrics_flush_interval_seconds
+    while True:
+        await asyncio.sleep(interval)
+        # Take the snapshot in the event loop thread, which is the only one updating metrics
+        await asyncio.to_thread(write_metrics_snapshot, registry.snapshot())
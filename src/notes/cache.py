@@ -0,0 +1,204 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+
+from src.settings import get_settings
+
+try:
+    from redis import asyncio as redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+class CachedResponse(NamedTuple):
+    owner: str
+    etag: str
+    body: bytes
+
+    def to_bytes(self) -> bytes:
+        return f"{self.owner}\n{self.etag}\n".encode() + self.body
+
+    @classmethod
+    def from_bytes(cls, value: bytes) -> "CachedResponse":
+        owner, etag, body = value.split(b"\n", 2)
+        return cls(owner.decode(), etag.decode(), body)
+
+
+class ResponseCacheBackend:
+    """
+    Storage of cached responses. Values are bytes, so they can be shared between processes.
+    """
+
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes) -> None:
+        raise NotImplementedError
+
+    async def delete(self, keys: list[str]) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class NullResponseCacheBackend(ResponseCacheBackend):
+    """
+    Backend which caches nothing.
+    """
+
+    async def get(self, key: str) -> bytes | None:
+        return None
+
+    async def set(self, key: str, value: bytes) -> None:
+        pass
+
+    async def delete(self, keys: list[str]) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+
+class MemoryResponseCacheBackend(ResponseCacheBackend):
+    """
+    In-process LRU backend with a TTL for every entry.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._values: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._values[key]
+            return None
+        self._values.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._values[key] = (time.monotonic() + self.ttl, value)
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+
+    async def delete(self, keys: list[str]) -> None:
+        for key in keys:
+            self._values.pop(key, None)
+
+    async def clear(self) -> None:
+        self._values.clear()
+
+
+class RedisResponseCacheBackend(ResponseCacheBackend):
+    """
+    Backend shared by all worker processes, requires the redis package.
+    """
+
+    def __init__(self, url: str, ttl: float):
+        if redis is None:
+            raise RuntimeError("Install redis package to use the redis response cache")
+        self.ttl = ttl
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._client.set(key, value, px=int(self.ttl * 1000))
+
+    async def delete(self, keys: list[str]) -> None:
+        if keys:
+            await self._client.delete(*keys)
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter(match="notes:*"):
+            await self._client.delete(key)
+
+
+class ResponseCache:
+    """
+    Read-through cache of serialized note responses.
+    Single notes are cached by note ID, lists of notes by owner ("*" for all owners).
+    The notes database layer invalidates the affected keys after every write.
+    A response read before an invalidation of this process is not stored,
+    so only writes of other processes may leave a stale entry until it expires.
+    """
+
+    def __init__(self, backend: ResponseCacheBackend):
+        self.backend = backend
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def note_key(note_id: str) -> str:
+        return f"notes:note:{note_id}"
+
+    @staticmethod
+    def notes_key(owner_id: str | None) -> str:
+        return f"notes:list:{owner_id or '*'}"
+
+    async def get(self, key: str) -> CachedResponse | None:
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedResponse.from_bytes(value)
+
+    async def set(self, key: str, response: CachedResponse, generation: int) -> None:
+        """
+        Store a response read at the given generation, if nothing was invalidated since.
+        """
+        if generation == self.generation:
+            await self.backend.set(key, response.to_bytes())
+
+    async def invalidate_notes(self, owner_id: str | None, note_ids: list[str]) -> None:
+        """
+        Invalidate cached notes and the lists of notes which include them.
+        """
+        self.generation += 1
+        keys = [self.note_key(note_id) for note_id in note_ids]
+        keys.append(self.notes_key(None))
+        if owner_id:
+            keys.append(self.notes_key(owner_id))
+        await self.backend.delete(keys)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / requests, 4) if requests else None,
+        }
+
+
+@lru_cache
+def get_response_cache() -> ResponseCache:
+    """
+    Return the response cache with the backend from settings.
+    """
+    settings = get_settings()
+    if settings.notes_cache_backend == "redis":
+        backend = RedisResponseCacheBackend(
+            settings.notes_cache_redis_url, settings.notes_cache_ttl_seconds
+        )
+    elif settings.notes_cache_backend == "memory":
+        backend = MemoryResponseCacheBackend(
+            settings.notes_cache_max_size, settings.notes_cache_ttl_seconds
+        )
+    else:
+        backend = NullResponseCacheBackend()
+    return ResponseCache(backend)
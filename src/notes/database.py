@@ -1,24 +1,145 @@
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
 from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.database import (
+    AUDIT_PENDING,
+    get_note_collection,
+    get_removed_note_collection,
+    is_mock,
+)
+from src.metrics.service import track_db_operation
+from src.notes.cache import get_response_cache
+from src.notes.events import CREATE, DELETE, RESTORE, UPDATE, get_note_event_bus
+from src.notes.schemas import serialize_note
+from src.notes.search import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+# Deleted notes stay in the notes collection with the "deleted_at" field set.
+# {"deleted_at": None} matches notes without the field.
+NOT_DELETED = {"deleted_at": None}
+DELETED = {"deleted_at": {"$ne": None}}
+
+
+def get_body_size(body: str | None) -> int:
+    """
+    Return the size of a note body in UTF-8 bytes.
+    """
+    return len(body.encode()) if body else 0
+
+
+def get_note_changes(data: dict | None = None, audit: dict | None = None) -> dict:
+    """
+    Return update operators which set data and mark the note as changed:
+    "version" is incremented and "updated_at" is set to now.
+    "body_size" is kept up to date with the body for the stats aggregations.
+    If audit is not None, the audit record is pushed into the note by the same write.
+    """
+    changes = {**(data or {}), "updated_at": datetime.now(timezone.utc)}
+    if "body" in changes:
+        changes["body_size"] = get_body_size(changes["body"])
+    operators = {"$set": changes, "$inc": {"version": 1}}
+    if audit:
+        operators["$push"] = {AUDIT_PENDING: audit}
+    return operators
+
+
+@track_db_operation
+async def iterate_notes(
+    owner_id: str | None = None,
+    after: str | None = None,
+    limit: int | None = None,
+    fields: list[str] | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Iterate over notes straight from the database cursor in "_id" order.
+    If owner_id is not None, iterate only over notes of a specific owner.
+    If after is not None, start right after the note with this ID (keyset pagination).
+    If fields is not None, read only these fields, "_id" and "version" from the database.
+    """
+    query = {**NOT_DELETED}
+    if owner_id:
+        query["owner"] = owner_id
+    if after:
+        query["_id"] = {"$gt": ObjectId(after)}
 
-from src.database import db_note_collection, db_removed_note_collection
-from src.service import dict_fields_to_str_converter
+    projection = {field: 1 for field in [*fields, "version"]} if fields else None
+    cursor = get_note_collection().find(query, projection).sort("_id", ASCENDING)
+    if limit:
+        cursor = cursor.limit(limit)
+    async for note in cursor:
+        yield serialize_note(note)
 
 
-async def retrieve_notes(owner_id: str | None = None) -> list[dict]:
+async def retrieve_notes(
+    owner_id: str | None = None,
+    after: str | None = None,
+    limit: int | None = None,
+    fields: list[str] | None = None,
+) -> list[dict]:
     """
     Retrieve all notes present in the database, if owner_id is None.
     In otherwise, retrieve all notes for a specific owner.
+    If after and limit are given, retrieve only one page of notes.
+    If fields is not None, retrieve only these fields, "_id" and "version".
     """
-    notes = []
+    return [note async for note in iterate_notes(owner_id, after, limit, fields)]
+
+
+async def retrieve_notes_page(
+    owner_id: str | None = None,
+    after: str | None = None,
+    limit: int = 100,
+    fields: list[str] | None = None,
+) -> tuple[list[dict], str | None]:
+    """
+    Retrieve one page of notes and the cursor for the next page.
+    The next cursor is None if there are no more notes.
+    """
+    # Request one extra note to find out if the next page exists
+    notes = await retrieve_notes(owner_id, after, limit + 1, fields)
+    if len(notes) > limit:
+        notes = notes[:limit]
+        return notes, notes[-1]["_id"]
+    return notes, None
+
+
+@track_db_operation
+async def retrieve_note_changes(
+    owner_id: str | None,
+    since: tuple[datetime, str] | None,
+    until: datetime,
+    limit: int = 100,
+) -> list[dict]:
+    """
+    Retrieve notes changed after the position "since" and not later than "until",
+    in the order of their changes. Deleted notes are included as well.
+    since is a pair of "updated_at" and "_id" of the last note already seen.
+    """
+    query = {"updated_at": {"$lte": until}}
     if owner_id:
-        async for note in db_note_collection.find({"owner": owner_id}):
-            notes.append(dict_fields_to_str_converter(note))
-    else:
-        async for note in db_note_collection.find():
-            notes.append(dict_fields_to_str_converter(note))
-    return notes
+        query["owner"] = owner_id
+    if since:
+        updated_at, note_id = since
+        query["$or"] = [
+            {"updated_at": {"$gt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$gt": ObjectId(note_id)}},
+        ]
+    cursor = (
+        get_note_collection()
+        .find(query)
+        .sort([("updated_at", ASCENDING), ("_id", ASCENDING)])
+        .limit(limit)
+    )
+    return [serialize_note(note) async for note in cursor]
 
 
+@track_db_operation
 async def add_note_in_db(note_data: dict) -> dict:
     """
     Add a new note into the database
@@ -27,81 +148,309 @@ async def add_note_in_db(note_data: dict) -> dict:
     # so that in the future there will be no problems with searching for folders by "_id"
     if "_id" in note_data:
         note_data["_id"] = ObjectId(note_data["_id"])
+    note_data.setdefault("version", 1)
+    note_data["updated_at"] = datetime.now(timezone.utc)
+    note_data["body_size"] = get_body_size(note_data.get("body"))
 
-    note = await db_note_collection.insert_one(note_data)
-    new_note = await retrieve_note(note.inserted_id)
-    return dict_fields_to_str_converter(new_note)
+    await get_note_collection().insert_one(note_data)
+    # insert_one sets "_id" of the document, so there is no need to re-read it
+    note = serialize_note(note_data)
+    get_search_backend().index_note(note["_id"], note["owner"], note)
+    await get_response_cache().invalidate_notes(note["owner"], [note["_id"]])
+    get_note_event_bus().notify(CREATE, note["owner"], [note["_id"]])
+    return note
 
 
+@track_db_operation
 async def retrieve_note(note_id: str) -> dict | None:
     """
     Retrieve a note with a matching ID
     """
-    note = await db_note_collection.find_one({"_id": ObjectId(note_id)})
+    note = await get_note_collection().find_one(
+        {"_id": ObjectId(note_id), **NOT_DELETED}
+    )
+    if note:
+        return serialize_note(note)
+
+
+@track_db_operation
+async def update_note(
+    note_id: str,
+    data: dict,
+    owner_id: str | None = None,
+    versions: list[int] | None = None,
+) -> dict | None:
+    """
+    Update a note with a matching ID and return the updated note.
+    If owner_id is not None, update the note only if it belongs to this owner.
+    If versions is not None, update the note only if it has one of these versions.
+    Return None if no note matched.
+    """
+    query = {"_id": ObjectId(note_id), **NOT_DELETED}
+    if owner_id:
+        query["owner"] = owner_id
+    if versions is not None:
+        # Notes written before versioning have no "version", their ETag has version 0
+        # and null in $in matches the missing field
+        query["version"] = {"$in": versions + [None] if 0 in versions else versions}
+    note = await get_note_collection().find_one_and_update(
+        query, get_note_changes(data), return_document=ReturnDocument.AFTER
+    )
     if note:
-        return dict_fields_to_str_converter(note)
+        note = serialize_note(note)
+        get_search_backend().index_note(note["_id"], note["owner"], note)
+        await get_response_cache().invalidate_notes(note["owner"], [note_id])
+        get_note_event_bus().notify(UPDATE, note["owner"], [note_id])
+        return note
 
 
-async def update_note(note_id: str, data: dict) -> dict | None:
+@track_db_operation
+async def delete_note(
+    note_id: str, owner_id: str | None = None, audit: dict | None = None
+) -> dict | None:
     """
-    Update a note with a matching ID.
-    Before calling, make sure the object exists!
+    Mark a note with a matching ID as deleted and return it.
+    If owner_id is not None, delete the note only if it belongs to this owner.
+    If audit is not None, store the audit record along with the note.
+    Return None if no note matched.
     """
-    updated_note = await db_note_collection.update_one(
-        {"_id": ObjectId(note_id)}, {"$set": data}
+    query = {"_id": ObjectId(note_id), **NOT_DELETED}
+    if owner_id:
+        query["owner"] = owner_id
+    note = await get_note_collection().find_one_and_update(
+        query,
+        get_note_changes({"deleted_at": datetime.now(timezone.utc)}, audit),
+        return_document=ReturnDocument.AFTER,
     )
-    if updated_note:
-        return await retrieve_note(note_id)
+    if note:
+        get_search_backend().remove_note(note_id)
+        await get_response_cache().invalidate_notes(note["owner"], [note_id])
+        get_note_event_bus().notify(DELETE, note["owner"], [note_id])
+        return serialize_note(note)
 
 
-async def delete_note(note_id: str) -> None:
+@track_db_operation
+async def restore_note(note_id: str, audit: dict | None = None) -> dict | None:
     """
-    Delete a note with a matching ID.
-    Before calling, make sure the object exists!
+    Restore a deleted note with a matching ID and return it.
+    If audit is not None, store the audit record along with the note.
+    Return None if there is no such deleted note.
     """
-    await db_note_collection.delete_one({"_id": ObjectId(note_id)})
+    note = await get_note_collection().find_one_and_update(
+        {"_id": ObjectId(note_id), **DELETED},
+        {"$unset": {"deleted_at": ""}, **get_note_changes(audit=audit)},
+        return_document=ReturnDocument.AFTER,
+    )
+    if note:
+        note = serialize_note(note)
+        get_search_backend().index_note(note["_id"], note["owner"], note)
+        await get_response_cache().invalidate_notes(note["owner"], [note_id])
+        get_note_event_bus().notify(RESTORE, note["owner"], [note_id])
+        return note
+
 
+@track_db_operation
+async def search_notes(
+    query: str, owner_id: str | None = None, offset: int = 0, limit: int = 100
+) -> tuple[list[dict], int | None]:
+    """
+    Search notes by words of their title and body, ordered by relevance.
+    Return one page of notes and the offset of the next page.
+    The next offset is None if there are no more notes.
+    """
+    # Request one extra note to find out if the next page exists
+    notes = await get_search_backend().search(query, owner_id, offset, limit + 1)
+    if len(notes) > limit:
+        return notes[:limit], offset + limit
+    return notes, None
 
+
+@track_db_operation
 async def get_note_id_by_title(title: str) -> str:
     """
     Retrieve the note ID from the database by its title.
     """
-    note = await db_note_collection.find_one({"title": title})
+    note = await get_note_collection().find_one({"title": title, **NOT_DELETED})
     if note:
         return str(note["_id"])
 
 
-async def add_note_in_removed_db(note_data: dict) -> None:
+@track_db_operation
+async def add_notes_in_db(notes_data: list[dict]) -> list[dict | None]:
     """
-    Add a note into the database of removed notes
+    Add new notes into the database with a single insert_many.
+    Return the added notes in the same order, None for notes which failed to insert.
     """
-    # Should convert the ObjectId type
-    # so that in the future there will be no problems with searching for folders by "_id"
-    note_data["_id"] = ObjectId(note_data["_id"])
-    await db_removed_note_collection.insert_one(note_data)
+    updated_at = datetime.now(timezone.utc)
+    for note_data in notes_data:
+        note_data["version"] = 1
+        note_data["updated_at"] = updated_at
+        note_data["body_size"] = get_body_size(note_data.get("body"))
+
+    failed = set()
+    try:
+        await get_note_collection().insert_many(notes_data, ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"] for error in e.details["writeErrors"]}
+    # insert_many sets "_id" of every inserted document, so there is no need to re-read them
+    notes = [
+        None if index in failed else serialize_note(note_data)
+        for index, note_data in enumerate(notes_data)
+    ]
+    search_backend = get_search_backend()
+    response_cache = get_response_cache()
+    event_bus = get_note_event_bus()
+    for note in notes:
+        if note:
+            search_backend.index_note(note["_id"], note["owner"], note)
+            await response_cache.invalidate_notes(note["owner"], [note["_id"]])
+            event_bus.notify(CREATE, note["owner"], [note["_id"]])
+    return notes
 
 
-async def pop_note_from_removed_db(note_id: str) -> dict | None:
+@track_db_operation
+async def retrieve_notes_by_ids(
+    note_ids: list[str], fields: list[str] | None = None
+) -> dict[str, dict]:
     """
-    Remove and retrieve a note from the database  of removed notes by its ID.
+    Retrieve notes with matching IDs with a single query.
+    Return a dict of notes by their ID, notes which do not exist are missing.
     """
-    note = await retrieve_note_from_removed_db(note_id)
-    if note:
-        await delete_note_from_removed_db(note_id)
-        return dict_fields_to_str_converter(note)
+    projection = {field: 1 for field in fields} if fields else None
+    cursor = get_note_collection().find(
+        {"_id": {"$in": [ObjectId(note_id) for note_id in note_ids]}, **NOT_DELETED},
+        projection,
+    )
+    return {str(note["_id"]): note async for note in cursor}
 
 
-async def retrieve_note_from_removed_db(note_id: str) -> dict | None:
+@track_db_operation
+async def update_notes(owner_id: str, updates: dict[str, dict]) -> list[str]:
     """
-    Retrieve a note from the database of removed notes by its ID.
+    Update notes of the owner with a single bulk_write and return IDs of updated notes.
+    updates is a dict of update data by note ID.
     """
-    note = await db_removed_note_collection.find_one({"_id": ObjectId(note_id)})
-    if note:
-        return dict_fields_to_str_converter(note)
+    collection = get_note_collection()
+    result = await collection.bulk_write(
+        [
+            UpdateOne(
+                {"_id": ObjectId(note_id), "owner": owner_id, **NOT_DELETED},
+                get_note_changes(data),
+            )
+            for note_id, data in updates.items()
+        ],
+        ordered=False,
+    )
+    updated = list(updates)
+    if result.matched_count < len(updates):
+        # Some notes were deleted after they were checked, find out which ones are left
+        cursor = collection.find(
+            {
+                "_id": {"$in": [ObjectId(note_id) for note_id in updates]},
+                "owner": owner_id,
+                **NOT_DELETED,
+            },
+            {"_id": 1},
+        )
+        existing = {str(note["_id"]) async for note in cursor}
+        updated = [note_id for note_id in updated if note_id in existing]
+    if not updated:
+        return updated
+    search_backend = get_search_backend()
+    for note_id in updated:
+        search_backend.index_note(note_id, owner_id, updates[note_id])
+    await get_response_cache().invalidate_notes(owner_id, updated)
+    get_note_event_bus().notify(UPDATE, owner_id, updated)
+    return updated
 
 
-async def delete_note_from_removed_db(note_id: str) -> None:
+@track_db_operation
+async def delete_notes(
+    owner_id: str, note_ids: list[str], audit: dict | None = None
+) -> None:
     """
-    Delete a note from the database of removed notes by its ID.
+    Mark notes of the owner as deleted with a single update_many.
+    If audit is not None, store the audit record along with every note.
     """
-    await db_removed_note_collection.delete_one({"_id": ObjectId(note_id)})
+    await get_note_collection().update_many(
+        {
+            "_id": {"$in": [ObjectId(note_id) for note_id in note_ids]},
+            "owner": owner_id,
+            **NOT_DELETED,
+        },
+        get_note_changes({"deleted_at": datetime.now(timezone.utc)}, audit),
+    )
+    search_backend = get_search_backend()
+    for note_id in note_ids:
+        search_backend.remove_note(note_id)
+    await get_response_cache().invalidate_notes(owner_id, note_ids)
+    get_note_event_bus().notify(DELETE, owner_id, note_ids)
+
+
+@track_db_operation
+async def migrate_removed_notes() -> int:
+    """
+    Move notes from the legacy collection of removed notes into the notes collection
+    as deleted notes. Safe to call on every startup, return the number of moved notes.
+    """
+    removed_collection = get_removed_note_collection()
+    deleted_at = datetime.now(timezone.utc)
+    operations = []
+    note_ids = []
+    async for note in removed_collection.find():
+        # Keep a live note with the same ID if it was restored meanwhile
+        operations.append(
+            UpdateOne(
+                {"_id": note["_id"]},
+                {
+                    "$setOnInsert": {
+                        **note,
+                        "deleted_at": deleted_at,
+                        "updated_at": deleted_at,
+                    }
+                },
+                upsert=True,
+            )
+        )
+        note_ids.append(note["_id"])
+
+    if not operations:
+        return 0
+    await get_note_collection().bulk_write(operations, ordered=False)
+    await removed_collection.delete_many({"_id": {"$in": note_ids}})
+    logger.info("Moved %d notes from the removed notes collection", len(note_ids))
+    return len(note_ids)
+
+
+@track_db_operation
+async def backfill_updated_at() -> int:
+    """
+    Set "updated_at" of notes written before it was introduced to the current time,
+    so the next sync of every client returns them, also after a sync token past them.
+    Safe to call on every startup, return the number of updated notes.
+    """
+    result = await get_note_collection().update_many(
+        {"updated_at": {"$exists": False}},
+        {"$set": {"updated_at": datetime.now(timezone.utc)}},
+    )
+    if result.modified_count:
+        logger.info("Set update time of %d notes", result.modified_count)
+    return result.modified_count
+
+
+@track_db_operation
+async def backfill_body_sizes() -> int:
+    """
+    Set "body_size" of notes written before it was introduced.
+    Safe to call on every startup, return the number of updated notes.
+    The mock DB does not support update pipelines, and its notes always have the field.
+    """
+    if is_mock():
+        return 0
+    result = await get_note_collection().update_many(
+        {"body_size": {"$exists": False}},
+        [{"$set": {"body_size": {"$strLenBytes": {"$ifNull": ["$body", ""]}}}}],
+    )
+    if result.modified_count:
+        logger.info("Set body size of %d notes", result.modified_count)
+    return result.modified_count
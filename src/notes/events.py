@@ -0,0 +1,254 @@
+import asyncio
+import logging
+from functools import lru_cache
+
+from pymongo.errors import PyMongoError
+
+from src.database import get_client, get_note_collection, is_mock
+from src.notes.schemas import INTERNAL_NOTE_FIELDS
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+RESTORE = "restore"
+# Sent instead of the events a slow client missed, the client should resync then
+OVERFLOW = "overflow"
+
+
+def get_note_event(event_type: str, note_id: str, owner_id: str) -> dict:
+    return {"type": event_type, "_id": note_id, "owner": owner_id}
+
+
+class NoteEventSubscription:
+    """
+    Bounded queue of note events of one client.
+    If the client does not keep up, its queued events are replaced by a single
+    overflow event and the following events are dropped.
+    """
+
+    def __init__(self, owner_id: str | None, max_size: int):
+        self.owner_id = owner_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(max_size + 1)
+        self.max_size = max_size
+        self.loop = asyncio.get_running_loop()
+        self.overflowed = False
+
+    def put(self, event: dict) -> None:
+        """
+        Queue an event, may be called from any thread.
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            self.put_nowait(event)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.put_nowait, event)
+        except RuntimeError:
+            # The loop of the client is closed, it will unsubscribe itself
+            pass
+
+    def put_nowait(self, event: dict) -> None:
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.max_size:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": OVERFLOW}
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class NoteEventBus:
+    """
+    Fan-out of note events to subscribed clients of this process.
+    Subscriptions of an owner get the events of their notes, subscriptions
+    without an owner (administrators) get the events of all notes.
+    This bus is fed by notify, which the database layer calls after every write,
+    so it only sees the writes of this process.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscriptions: dict[str | None, set[NoteEventSubscription]] = {}
+
+    def subscribe(self, owner_id: str | None) -> NoteEventSubscription:
+        subscription = NoteEventSubscription(owner_id, self.queue_size)
+        self.subscriptions.setdefault(owner_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: NoteEventSubscription) -> None:
+        subscriptions = self.subscriptions.get(subscription.owner_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.owner_id]
+
+    def publish(self, event: dict) -> None:
+        for owner_id in (event["owner"], None):
+            for subscription in list(self.subscriptions.get(owner_id, ())):
+                subscription.put(event)
+
+    def notify(self, event_type: str, owner_id: str, note_ids: list[str]) -> None:
+        """
+        Publish events of notes written by the database layer.
+        """
+        if not self.subscriptions:
+            return
+        for note_id in note_ids:
+            self.publish(get_note_event(event_type, note_id, owner_id))
+
+    async def run(self) -> None:
+        """
+        Feed the bus from an external source until cancelled.
+        """
+
+    def clear(self) -> None:
+        self.subscriptions.clear()
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "subscriptions": sum(map(len, self.subscriptions.values())),
+        }
+
+
+async def is_replica_set() -> bool:
+    """
+    Check if MongoDB runs as a replica set, which change streams need.
+    """
+    hello = await get_client().admin.command("hello")
+    return "setName" in hello
+
+
+class ChangeStreamNoteEventBus(NoteEventBus):
+    """
+    Bus fed by one change stream of the notes collection per process,
+    so it sees the writes of all processes. The write hook does nothing.
+    Change streams need MongoDB running as a replica set. If fallback is set,
+    the bus is fed by the write hook of this process instead until a replica set
+    is detected, and keeps doing so without one.
+    """
+
+    # Only the fields needed to build events are sent by the server
+    PIPELINE = [
+        {"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}},
+        {
+            "$project": {
+                "operationType": 1,
+                "documentKey": 1,
+                "fullDocument.owner": 1,
+                "fullDocument.deleted_at": 1,
+                "updateDescription.updatedFields.deleted_at": 1,
+                "updateDescription.removedFields": 1,
+            }
+        },
+    ]
+
+    def __init__(self, queue_size: int, retry_delay: float = 5, fallback: bool = False):
+        super().__init__(queue_size)
+        self.retry_delay = retry_delay
+        self.resume_token = None
+        self.fallback = fallback
+        self.in_process = fallback
+
+    def notify(self, event_type: str, owner_id: str, note_ids: list[str]) -> None:
+        if self.in_process:
+            super().notify(event_type, owner_id, note_ids)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "in_process": self.in_process}
+
+    @staticmethod
+    def get_event_type(change: dict) -> str | None:
+        """
+        Map a change of the notes collection to a note event type.
+        Return None for changes clients are not interested in.
+        """
+        note = change.get("fullDocument")
+        if not note:
+            # The note was purged before the update was looked up
+            return None
+        if change["operationType"] == "insert":
+            # Deleted notes are inserted only when moved from the legacy collection
+            return None if note.get("deleted_at") else CREATE
+        description = change.get("updateDescription", {})
+        changed = {
+            *description.get("updatedFields", {}),
+            *description.get("removedFields", ()),
+        }
+        if changed and all(
+            field.split(".")[0] in INTERNAL_NOTE_FIELDS for field in changed
+        ):
+            # E.g. audit records moved out of the note
+            return None
+        if description.get("updatedFields", {}).get("deleted_at"):
+            return DELETE
+        if "deleted_at" in description.get("removedFields", ()):
+            return RESTORE
+        return None if note.get("deleted_at") else UPDATE
+
+    async def watch(self) -> None:
+        async with get_note_collection().watch(
+            self.PIPELINE,
+            full_document="updateLookup",
+            resume_after=self.resume_token,
+        ) as stream:
+            async for change in stream:
+                self.resume_token = stream.resume_token
+                event_type = self.get_event_type(change)
+                if event_type:
+                    self.publish(
+                        get_note_event(
+                            event_type,
+                            str(change["documentKey"]["_id"]),
+                            change["fullDocument"]["owner"],
+                        )
+                    )
+
+    async def run(self) -> None:
+        """
+        Watch the notes collection, resuming after errors from the last seen change.
+        """
+        if self.fallback:
+            try:
+                replica_set = await is_replica_set()
+            except PyMongoError:
+                logger.exception("Failed to detect a MongoDB replica set")
+                replica_set = False
+            if not replica_set:
+                logger.warning(
+                    "MongoDB is not a replica set, note events are published "
+                    "only for the writes of this process"
+                )
+                return
+            self.in_process = False
+        while True:
+            try:
+                await self.watch()
+            except PyMongoError:
+                logger.exception("Notes change stream failed")
+            await asyncio.sleep(self.retry_delay)
+
+
+@lru_cache
+def get_note_event_bus() -> NoteEventBus:
+    """
+    Return the note event bus from settings, by default fed by the database layer
+    for the mock database and by a change stream if MongoDB is a replica set.
+    """
+    settings = get_settings()
+    backend = settings.notes_events_backend
+    if backend == "memory" or (not backend and is_mock()):
+        return NoteEventBus(settings.notes_events_queue_size)
+    return ChangeStreamNoteEventBus(
+        settings.notes_events_queue_size, fallback=not backend
+    )
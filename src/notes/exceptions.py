@@ -32,3 +32,59 @@ class HTTPNoteAccessDenied(HTTPException):
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Note access denied",
         )
+
+
+class HTTPInvalidCursor(HTTPException):
+    def __init__(self, cursor: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor {cursor}",
+        )
+
+
+class HTTPInvalidSyncToken(HTTPException):
+    def __init__(self, token: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid sync token {token}",
+        )
+
+
+class HTTPSyncTokenExpired(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Sync token expired, fetch all notes again",
+        )
+
+
+class HTTPInvalidNoteId(HTTPException):
+    def __init__(self, id: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid note id {id}",
+        )
+
+
+class HTTPNoteDataEmpty(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No note data to update",
+        )
+
+
+class HTTPNotePreconditionFailed(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"Note was modified",
+        )
+
+
+class HTTPInvalidNoteFields(HTTPException):
+    def __init__(self, field: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid note field {field}",
+        )
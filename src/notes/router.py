@@ -1,31 +1,84 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+
+from bson import ObjectId
+from fastapi import (
+    APIRouter,
+    Header,
+    HTTPException,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.encoders import jsonable_encoder
+from fastapi.security.utils import get_authorization_scheme_param
 from starlette import status
-from starlette.responses import JSONResponse
+from starlette.responses import Response, StreamingResponse
 
+from src.admin.service import get_audit_record
 from src.auth.dependencies import CurrentActiveUser
+from src.auth.exceptions import HTTPCredentialsException
+from src.auth.service import get_current_user
+from src.notes.cache import CachedResponse, ResponseCache, get_response_cache
 from src.notes.database import (
     add_note_in_db,
-    add_note_in_removed_db,
+    add_notes_in_db,
     delete_note,
-    pop_note_from_removed_db,
+    delete_notes,
+    iterate_notes,
+    restore_note,
     retrieve_note,
+    retrieve_note_changes,
     retrieve_notes,
+    retrieve_notes_by_ids,
+    retrieve_notes_page,
+    search_notes,
     update_note,
+    update_notes,
 )
+from src.notes.events import OVERFLOW, get_note_event_bus
 from src.notes.exceptions import (
+    HTTPInvalidCursor,
+    HTTPInvalidNoteId,
     HTTPNoteAccessDenied,
+    HTTPNoteDataEmpty,
     HTTPNoteDeleted,
     HTTPNoteNoExists,
+    HTTPNotePreconditionFailed,
     HTTPNotesListEmpty,
+    HTTPSyncTokenExpired,
+)
+from src.notes.schemas import (
+    NoteBaseSchema,
+    NotesBulkCreateSchema,
+    NotesBulkDeleteSchema,
+    NotesBulkUpdateSchema,
+    NotesStreamFormat,
+    NoteUpdateSchema,
 )
-from src.notes.schemas import NoteBaseSchema, NoteUpdateSchema
 from src.notes.service import (
+    MIN_NOTE_ID,
+    bulk_item_error,
+    bulk_item_ok,
+    check_note_id,
+    decode_sync_token,
+    encode_sync_token,
+    get_if_match_versions,
     get_note_db_schema_object,
+    get_note_etag,
+    get_note_fields,
+    get_notes_etag,
     get_user_id_from_current_user,
+    is_etag_matched,
     is_user_admin,
+    iterate_note_events,
+    stream_note_events_sse,
+    stream_notes_json_array,
+    stream_notes_ndjson,
 )
-from src.service import dict_fields_to_str_converter, list_fields_to_str_converter
+from src.serializers import FastJSONResponse
+from src.settings import get_settings
 
 router = APIRouter(
     prefix="/notes",
@@ -48,63 +101,432 @@ async def create_note(
     db_note = await get_note_db_schema_object(current_user, note)
     new_note = await add_note_in_db(jsonable_encoder(db_note))
     if new_note:
-        return JSONResponse(
-            dict_fields_to_str_converter(new_note),
+        return FastJSONResponse(
+            new_note,
             status_code=status.HTTP_201_CREATED,
         )
     else:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+async def get_notes_owner_id(current_user, notes_user_id: str | None) -> str | None:
+    """
+    Return the owner whose notes are listed, None means notes of all owners.
+    If notes_user_id is None, then it is the current user if simple user authenticated or
+    all users if admin authenticated.
+    If notes_user_id is not None, then it is notes_user_id user if admin authenticated or
+    if user with notes_user_id now authenticated, otherwise raise HTTPNoteAccessDenied.
+    """
+    if await is_user_admin(current_user):
+        return notes_user_id
+
+    owner_id = await get_user_id_from_current_user(current_user)
+    if notes_user_id and notes_user_id != owner_id:
+        raise HTTPNoteAccessDenied()
+    return owner_id
+
+
 @router.get("/", response_description="Notes retrieved")
-async def get_notes(current_user: CurrentActiveUser, notes_user_id: str | None = None):
+async def get_notes(
+    current_user: CurrentActiveUser,
+    notes_user_id: str | None = None,
+    after: str | None = None,
+    limit: Annotated[int | None, Query(ge=1, le=1000)] = None,
+    stream: NotesStreamFormat | None = None,
+    fields: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
     """
     Retrieves a list of notes.
     If notes_user_id is None, then return notes for current user if simple user authenticated or
     for all users if admin authenticated.
     If notes_user_id is not None, then return notes for notes_user_id user if admin authenticated or
     if user with notes_user_id now authenticated.
+    If limit is not None, then return one page of notes after the note with ID "after"
+    together with "next_cursor" for the next page.
+    If stream is not None, then stream notes as NDJSON or as a chunked JSON array.
+    If fields is not None (e.g. "title,owner"), then return only these fields, "_id" and "version".
+    If If-None-Match header matches ETag of the notes, then return 304 Not Modified.
+    The full list of notes is served from the response cache when possible.
     """
-    owner_id = None
-    is_admin = await is_user_admin(current_user)
+    owner_id = await get_notes_owner_id(current_user, notes_user_id)
+
+    if after and not ObjectId.is_valid(after):
+        raise HTTPInvalidCursor(after)
+    note_fields = get_note_fields(fields)
+
+    if stream:
+        notes = iterate_notes(owner_id, after, limit, note_fields)
+        first_note = await anext(notes, None)
+        if first_note is None:
+            raise HTTPNotesListEmpty()
+
+        if stream == NotesStreamFormat.ndjson:
+            return StreamingResponse(
+                stream_notes_ndjson(first_note, notes),
+                media_type="application/x-ndjson",
+            )
+        return StreamingResponse(
+            stream_notes_json_array(first_note, notes),
+            media_type="application/json",
+        )
 
-    if is_admin:
-        owner_id = notes_user_id
+    if limit:
+        notes, next_cursor = await retrieve_notes_page(
+            owner_id, after, limit, note_fields
+        )
+        if notes:
+            etag = get_notes_etag(notes, next_cursor, *(note_fields or []))
+            if is_etag_matched(if_none_match, etag):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+                )
+            return FastJSONResponse(
+                {"notes": notes, "next_cursor": next_cursor},
+                status_code=status.HTTP_200_OK,
+                headers={"ETag": etag},
+            )
+        raise HTTPNotesListEmpty()
+
+    if after or note_fields:
+        notes = await retrieve_notes(owner_id, after, fields=note_fields)
+        if notes:
+            etag = get_notes_etag(notes, *(note_fields or []))
+            if is_etag_matched(if_none_match, etag):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+                )
+            return FastJSONResponse(
+                notes, status_code=status.HTTP_200_OK, headers={"ETag": etag}
+            )
+        raise HTTPNotesListEmpty()
+
+    response_cache = get_response_cache()
+    cache_key = ResponseCache.notes_key(owner_id)
+    cached = await response_cache.get(cache_key)
+    if cached is None:
+        generation = response_cache.generation
+        notes = await retrieve_notes(owner_id)
+        if not notes:
+            raise HTTPNotesListEmpty()
+        response = FastJSONResponse(notes, status_code=status.HTTP_200_OK)
+        cached = CachedResponse(owner_id or "", get_notes_etag(notes), response.body)
+        await response_cache.set(cache_key, cached, generation)
+    return get_cached_response(cached, if_none_match)
+
+
+def get_cached_response(cached: CachedResponse, if_none_match: str | None) -> Response:
+    """
+    Return a cached response body, or 304 Not Modified if If-None-Match header matches its ETag.
+    """
+    if is_etag_matched(if_none_match, cached.etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": cached.etag}
+        )
+    return Response(
+        cached.body,
+        status_code=status.HTTP_200_OK,
+        headers={"ETag": cached.etag},
+        media_type="application/json",
+    )
 
-    if not is_admin:
-        owner_id = await get_user_id_from_current_user(current_user)
 
-    if not is_admin and notes_user_id and notes_user_id != owner_id:
-        raise HTTPNoteAccessDenied()
+@router.get("/sync", response_description="Notes changed since the sync token")
+async def sync_notes(
+    current_user: CurrentActiveUser,
+    since: str | None = None,
+    notes_user_id: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    """
+    Return notes changed since the sync token "since" in the order of changes:
+    "notes" are changed notes, "deleted" are IDs of deleted notes, "next_token"
+    is the token for the next sync and "has_more" tells to sync again right away.
+    Without "since" all notes are returned page by page.
+    Notes are scoped like GET /notes.
+    If the token is older than deleted notes are kept, then raise HTTPSyncTokenExpired,
+    the client should fetch all notes again.
+    If the token is malformed, then raise HTTPInvalidSyncToken.
+    """
+    owner_id = await get_notes_owner_id(current_user, notes_user_id)
+    position = decode_sync_token(since) if since else None
+
+    settings = get_settings()
+    now = datetime.now(timezone.utc)
+    if position and position[0] < now - timedelta(
+        seconds=settings.notes_deleted_ttl_seconds
+    ):
+        raise HTTPSyncTokenExpired()
+    # Mongo keeps milliseconds, so a later change is never stored before the token
+    until = now - timedelta(seconds=settings.notes_sync_settle_seconds)
+    until = until.replace(microsecond=until.microsecond // 1000 * 1000)
+
+    changes = await retrieve_note_changes(owner_id, position, until, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        next_token = encode_sync_token(changes[-1]["updated_at"], changes[-1]["_id"])
+    elif position and position[0] >= until:
+        next_token = since
+    else:
+        # Nothing changed up to "until", so the next sync starts from there
+        next_token = encode_sync_token(until, MIN_NOTE_ID)
+    return FastJSONResponse(
+        {
+            "notes": [note for note in changes if not note.get("deleted_at")],
+            "deleted": [note["_id"] for note in changes if note.get("deleted_at")],
+            "next_token": next_token,
+            "has_more": has_more,
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/events", response_description="Stream of note events")
+async def note_events(
+    current_user: CurrentActiveUser, notes_user_id: str | None = None
+):
+    """
+    Stream create, update, delete and restore events of notes as Server-Sent Events.
+    Events are scoped like GET /notes: notes of the current user, of notes_user_id
+    or of all users if admin authenticated. Every event has the note "_id" and "owner".
+    If the client does not keep up, the "overflow" event is sent and the stream ends,
+    the client should fetch its notes again then.
+    """
+    owner_id = await get_notes_owner_id(current_user, notes_user_id)
+    bus = get_note_event_bus()
+    events = iterate_note_events(
+        bus, bus.subscribe(owner_id), get_settings().notes_events_keepalive_seconds
+    )
+    return StreamingResponse(
+        stream_note_events_sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/events/ws")
+async def note_events_ws(
+    websocket: WebSocket, token: str | None = None, notes_user_id: str | None = None
+):
+    """
+    Send the events of GET /notes/events as JSON messages over a WebSocket.
+    Browsers cannot set headers of WebSocket requests, so the access token
+    may be passed in the "token" query parameter instead of Authorization header.
+    """
+    if token is None:
+        _, token = get_authorization_scheme_param(
+            websocket.headers.get("Authorization")
+        )
+    try:
+        if not token:
+            raise HTTPCredentialsException()
+        current_user = await get_current_user(token)
+        owner_id = await get_notes_owner_id(current_user, notes_user_id)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    bus = get_note_event_bus()
+    events = iterate_note_events(
+        bus, bus.subscribe(owner_id), get_settings().notes_events_keepalive_seconds
+    )
+
+    async def send_events():
+        async for event in events:
+            if event is None:
+                continue
+            await websocket.send_json(event)
+            if event["type"] == OVERFLOW:
+                await websocket.close()
+
+    sender = asyncio.create_task(send_events())
+    try:
+        # Messages of the client are ignored, receiving detects the disconnect
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Cancelling the sender ends the events and cancels the subscription
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+
+
+@router.get("/search", response_description="Notes found")
+async def search_notes_data(
+    current_user: CurrentActiveUser,
+    q: Annotated[str, Query(min_length=1, max_length=256)],
+    notes_user_id: str | None = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    """
+    Search notes by words of their title and body, ordered by relevance.
+    Notes are scoped the same way as in get_notes.
+    Return one page of notes together with "next_offset" for the next page.
+    """
+    owner_id = await get_notes_owner_id(current_user, notes_user_id)
 
-    notes = await retrieve_notes(owner_id)
+    notes, next_offset = await search_notes(q, owner_id, offset, limit)
     if notes:
-        return JSONResponse(
-            list_fields_to_str_converter(notes),
+        return FastJSONResponse(
+            {"notes": notes, "next_offset": next_offset},
             status_code=status.HTTP_200_OK,
         )
     raise HTTPNotesListEmpty()
 
 
+@router.post("/bulk", response_description="Notes data added into the database")
+async def create_notes_bulk(
+    req: NotesBulkCreateSchema, current_user: CurrentActiveUser
+):
+    """
+    Create many new notes in the database with a single write.
+    Return the status of every note in the request order.
+    If current user is administrator, then raise HTTPNoteAccessDenied.
+    """
+    if await is_user_admin(current_user):
+        raise HTTPNoteAccessDenied()
+
+    db_notes = [
+        jsonable_encoder(await get_note_db_schema_object(current_user, note))
+        for note in req.notes
+    ]
+    new_notes = await add_notes_in_db(db_notes)
+    return FastJSONResponse(
+        [
+            (
+                bulk_item_ok(note["_id"], status.HTTP_201_CREATED)
+                if note
+                else bulk_item_error(
+                    None,
+                    HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR),
+                )
+            )
+            for note in new_notes
+        ],
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+@router.patch("/bulk", response_description="Notes updated")
+async def update_notes_bulk(
+    req: NotesBulkUpdateSchema, current_user: CurrentActiveUser
+):
+    """
+    Update (patch) many notes by ID with a single ownership check and a single write.
+    Return the status of every note in the request order.
+    If current user is administrator, then raise HTTPNoteAccessDenied.
+    """
+    if await is_user_admin(current_user):
+        raise HTTPNoteAccessDenied()
+
+    owner_id = await get_user_id_from_current_user(current_user)
+    valid_ids = [item.id for item in req.notes if ObjectId.is_valid(item.id)]
+    notes = await retrieve_notes_by_ids(valid_ids, fields=["owner"])
+
+    results = []
+    updates = {}
+    for item in req.notes:
+        data = item.model_dump(exclude={"id"}, exclude_none=True)
+        if not ObjectId.is_valid(item.id):
+            results.append(bulk_item_error(item.id, HTTPInvalidNoteId(item.id)))
+        elif not data:
+            results.append(bulk_item_error(item.id, HTTPNoteDataEmpty()))
+        elif item.id not in notes:
+            results.append(bulk_item_error(item.id, HTTPNoteNoExists()))
+        elif notes[item.id]["owner"] != owner_id:
+            results.append(bulk_item_error(item.id, HTTPNoteAccessDenied()))
+        else:
+            updates.setdefault(item.id, {}).update(data)
+            results.append(bulk_item_ok(item.id, status.HTTP_200_OK))
+
+    if updates:
+        updated = set(await update_notes(owner_id, updates))
+        # Notes deleted after the ownership check were not updated
+        results = [
+            (
+                bulk_item_error(result["id"], HTTPNoteNoExists())
+                if result["status"] == status.HTTP_200_OK
+                and result["id"] not in updated
+                else result
+            )
+            for result in results
+        ]
+    return FastJSONResponse(results, status_code=status.HTTP_200_OK)
+
+
+@router.delete("/bulk", response_description="Notes deleted")
+async def delete_notes_bulk(
+    req: NotesBulkDeleteSchema, current_user: CurrentActiveUser
+):
+    """
+    Delete many notes by ID with a single ownership check.
+    Return the status of every note in the request order.
+    If current user is administrator, then raise HTTPNoteAccessDenied.
+    """
+    if await is_user_admin(current_user):
+        raise HTTPNoteAccessDenied()
+
+    owner_id = await get_user_id_from_current_user(current_user)
+    valid_ids = [note_id for note_id in req.ids if ObjectId.is_valid(note_id)]
+    notes = await retrieve_notes_by_ids(valid_ids, fields=["owner"])
+
+    results = []
+    removed = []
+    for note_id in req.ids:
+        if not ObjectId.is_valid(note_id):
+            results.append(bulk_item_error(note_id, HTTPInvalidNoteId(note_id)))
+        elif note_id not in notes:
+            results.append(bulk_item_error(note_id, HTTPNoteNoExists()))
+        elif notes[note_id]["owner"] != owner_id:
+            results.append(bulk_item_error(note_id, HTTPNoteAccessDenied()))
+        else:
+            removed.append(note_id)
+            results.append(bulk_item_ok(note_id, status.HTTP_204_NO_CONTENT))
+
+    if removed:
+        audit = get_audit_record(
+            "notes.delete", current_user["email"], note_ids=removed
+        )
+        await delete_notes(owner_id, removed, audit)
+    return FastJSONResponse(results, status_code=status.HTTP_200_OK)
+
+
 @router.get("/{note_id}", response_description="Note retrieved")
-async def get_note(note_id: str, current_user: CurrentActiveUser):
+async def get_note(
+    note_id: str,
+    current_user: CurrentActiveUser,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
     """
     Retrieve a note by ID.
     If note owner is not current user or current user not is administrator, then raise HTTPNoteAccessDenied.
     If note not exists, then raise HTTPNoteNoExists.
+    If If-None-Match header matches ETag of the note, then return 304 Not Modified.
+    The note is served from the response cache when possible.
+    If note ID is invalid, then raise HTTPInvalidNoteId.
     """
-    note = await retrieve_note(note_id)
-    if note:
-        if not await is_user_admin(current_user):
-            owner_id = await get_user_id_from_current_user(current_user)
-            if note["owner"] != owner_id:
-                raise HTTPNoteAccessDenied()
+    check_note_id(note_id)
+    response_cache = get_response_cache()
+    cache_key = ResponseCache.note_key(note_id)
+    cached = await response_cache.get(cache_key)
+    if cached is None:
+        generation = response_cache.generation
+        note = await retrieve_note(note_id)
+        if not note:
+            raise HTTPNoteNoExists()
+        response = FastJSONResponse(note, status_code=status.HTTP_200_OK)
+        cached = CachedResponse(note["owner"], get_note_etag(note), response.body)
+        await response_cache.set(cache_key, cached, generation)
 
-        return JSONResponse(
-            dict_fields_to_str_converter(note),
-            status_code=status.HTTP_200_OK,
-        )
-    raise HTTPNoteNoExists()
+    if not await is_user_admin(current_user):
+        owner_id = await get_user_id_from_current_user(current_user)
+        if cached.owner != owner_id:
+            raise HTTPNoteAccessDenied()
+    return get_cached_response(cached, if_none_match)
 
 
 @router.put("/{note_id}", response_description="Note updated")
@@ -112,56 +534,81 @@ async def update_student_data(
     note_id: str,
     req: NoteUpdateSchema,
     current_user: CurrentActiveUser,
+    if_match: Annotated[str | None, Header()] = None,
 ):
     """
     Update (put) a note by ID.
     If note owner is not current user or current user is administrator, then raise HTTPNoteAccessDenied.
     If note not exists, then raise HTTPNoteNoExists.
+    If If-Match header does not match ETag of the note, then raise HTTPNotePreconditionFailed.
+    If note ID is invalid, then raise HTTPInvalidNoteId.
     """
+    check_note_id(note_id)
     if await is_user_admin(current_user):
         raise HTTPNoteAccessDenied()
 
     owner_id = await get_user_id_from_current_user(current_user)
-    return await update_note_data_internal(note_id, owner_id, req)
+    return await update_note_data_internal(note_id, owner_id, req, if_match)
 
 
 @router.patch("/{note_id}", response_description="Note updated")
 async def update_note_partially(
-    note_id: str, req: NoteUpdateSchema, current_user: CurrentActiveUser
+    note_id: str,
+    req: NoteUpdateSchema,
+    current_user: CurrentActiveUser,
+    if_match: Annotated[str | None, Header()] = None,
 ):
     """
     Update (patch) a note by ID.
     If note owner is not current user or current user is administrator, then raise HTTPNoteAccessDenied.
     If note not exists, then raise HTTPNoteNoExists.
+    If If-Match header does not match ETag of the note, then raise HTTPNotePreconditionFailed.
+    If note ID is invalid, then raise HTTPInvalidNoteId.
     """
+    check_note_id(note_id)
     if await is_user_admin(current_user):
         raise HTTPNoteAccessDenied()
 
     owner_id = await get_user_id_from_current_user(current_user)
-    return await update_note_data_internal(note_id, owner_id, req)
+    return await update_note_data_internal(note_id, owner_id, req, if_match)
 
 
 async def update_note_data_internal(
-    note_id: str, owner_id: str, data: NoteUpdateSchema
+    note_id: str, owner_id: str, data: NoteUpdateSchema, if_match: str | None = None
 ):
     data = {k: v for k, v in data.dict().items() if v is not None}
     if len(data) < 1:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
 
-    note = await retrieve_note(note_id)
-    if note:
-        if note["owner"] != owner_id:
-            raise HTTPNoteAccessDenied()
+    versions = None
+    if if_match is not None:
+        versions = get_if_match_versions(note_id, if_match)
+        if versions == []:
+            raise HTTPNotePreconditionFailed()
+
+    # The version check is a part of the update filter, so it is atomic
+    updated_note = await update_note(note_id, data, owner_id, versions)
+    if updated_note:
+        return FastJSONResponse(
+            updated_note,
+            status_code=status.HTTP_200_OK,
+            headers={"ETag": get_note_etag(updated_note)},
+        )
 
-        updated_note = await update_note(note_id, data)
-        if updated_note:
-            return JSONResponse(
-                dict_fields_to_str_converter(updated_note),
-                status_code=status.HTTP_200_OK,
-            )
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    raise await get_note_not_matched_exception(note_id, owner_id)
 
-    raise HTTPNoteNoExists()
+
+async def get_note_not_matched_exception(note_id: str, owner_id: str) -> HTTPException:
+    """
+    Find out why a note filtered by ID, owner and version did not match.
+    Only called on the error path, so the happy path keeps a single round-trip.
+    """
+    note = await retrieve_note(note_id)
+    if not note:
+        return HTTPNoteNoExists()
+    if note["owner"] != owner_id:
+        return HTTPNoteAccessDenied()
+    return HTTPNotePreconditionFailed()
 
 
 @router.delete("/{note_id}", response_description="Note deleted")
@@ -170,22 +617,19 @@ async def delete_note_data(note_id: str, current_user: CurrentActiveUser):
     Delete a note by ID.
     If note owner is not current user or current user is administrator, then raise HTTPNoteAccessDenied.
     If note not exists, then raise HTTPNoteNoExists.
+    If note ID is invalid, then raise HTTPInvalidNoteId.
     """
+    check_note_id(note_id)
     if await is_user_admin(current_user):
         raise HTTPNoteAccessDenied()
 
-    note = await retrieve_note(note_id)
+    owner_id = await get_user_id_from_current_user(current_user)
+    audit = get_audit_record("notes.delete", current_user["email"], note_ids=[note_id])
+    note = await delete_note(note_id, owner_id, audit)
     if note:
-        owner_id = await get_user_id_from_current_user(current_user)
-        if note["owner"] != owner_id:
-            raise HTTPNoteAccessDenied()
-
-        await add_note_in_removed_db(note)
-        await delete_note(note_id)
-
         raise HTTPNoteDeleted()
 
-    raise HTTPNoteNoExists()
+    raise await get_note_not_matched_exception(note_id, owner_id)
 
 
 @router.get("/restore/{note_id}", response_description="Note restored")
@@ -194,19 +638,18 @@ async def restore_note_data(note_id: str, current_user: CurrentActiveUser):
     Restore note by ID.
     If current user is not administrator, then raise HTTPNoteAccessDenied.
     If note not was deleted before, then raise HTTPNoteNoExists.
+    If note ID is invalid, then raise HTTPInvalidNoteId.
     """
+    check_note_id(note_id)
     if not await is_user_admin(current_user):
         raise HTTPNoteAccessDenied()
 
-    note = await pop_note_from_removed_db(note_id)
+    audit = get_audit_record("notes.restore", current_user["email"], note_ids=[note_id])
+    note = await restore_note(note_id, audit)
     if note:
-        new_note = await add_note_in_db(note)
-        if new_note:
-            return JSONResponse(
-                dict_fields_to_str_converter(new_note),
-                status_code=status.HTTP_201_CREATED,
-            )
-        else:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return FastJSONResponse(
+            note,
+            status_code=status.HTTP_201_CREATED,
+        )
 
     raise HTTPNoteNoExists()
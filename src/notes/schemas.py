@@ -1,8 +1,10 @@
+from enum import Enum
 from typing import Optional
 
 from pydantic import BaseModel, Field
 
-from src.service import dict_fields_to_str_converter
+from src.database import AUDIT_PENDING
+from src.serializers import serialize_document
 
 
 class NoteBaseSchema(BaseModel):
@@ -16,3 +18,44 @@ class NoteUpdateSchema(NoteBaseSchema):
 
 class NoteDBSchema(NoteBaseSchema):
     owner: str = Field(...)
+
+
+BULK_MAX_NOTES = 1000
+
+# Fields of a note which can be selected with "fields", "_id" is always returned
+NOTE_FIELDS = ("title", "body", "owner", "version", "updated_at")
+# Fields of a note stored for internal use only, they are never returned
+INTERNAL_NOTE_FIELDS = ("body_size", AUDIT_PENDING)
+
+
+def serialize_note(note: dict) -> dict:
+    """
+    Serialize a note document without its internal fields.
+    """
+    note = serialize_document(note)
+    for field in INTERNAL_NOTE_FIELDS:
+        note.pop(field, None)
+    return note
+
+
+class NotesBulkCreateSchema(BaseModel):
+    notes: list[NoteBaseSchema] = Field(..., min_length=1, max_length=BULK_MAX_NOTES)
+
+
+class NoteBulkUpdateSchema(NoteUpdateSchema):
+    id: str = Field(...)
+
+
+class NotesBulkUpdateSchema(BaseModel):
+    notes: list[NoteBulkUpdateSchema] = Field(
+        ..., min_length=1, max_length=BULK_MAX_NOTES
+    )
+
+
+class NotesBulkDeleteSchema(BaseModel):
+    ids: list[str] = Field(..., min_length=1, max_length=BULK_MAX_NOTES)
+
+
+class NotesStreamFormat(str, Enum):
+    ndjson = "ndjson"
+    json = "json"
@@ -0,0 +1,180 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+from bson import ObjectId
+
+from src.database import get_note_collection, is_mock
+from src.notes.schemas import serialize_note
+from src.settings import get_settings
+
+# Same weights are used by the text index of the notes collection
+SEARCH_WEIGHTS = {"title": 5, "body": 1}
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str | None) -> list[str]:
+    """
+    Split text into lowercase word tokens.
+    """
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class NotesSearchBackend:
+    """
+    Full-text search over notes.
+    index_note and remove_note are called by the database layer after every write.
+    """
+
+    async def search(
+        self, query: str, owner_id: str | None, offset: int, limit: int
+    ) -> list[dict]:
+        """
+        Return notes matching the query ordered by relevance, with a "score" field.
+        If owner_id is None, then search among the notes of all owners.
+        """
+        raise NotImplementedError
+
+    def index_note(self, note_id: str, owner_id: str | None, fields: dict) -> None:
+        """
+        Index the searchable fields of a note, fields missing in fields are kept.
+        """
+
+    def remove_note(self, note_id: str) -> None:
+        """
+        Remove a note from the index.
+        """
+
+    def clear(self) -> None:
+        """
+        Remove all notes from the index.
+        """
+
+    async def rebuild(self) -> int:
+        """
+        Index all notes which are not deleted, return the number of indexed notes.
+        """
+        return 0
+
+
+class MongoTextSearchBackend(NotesSearchBackend):
+    """
+    Search backed by the text index of the notes collection.
+    Mongo keeps the index up to date itself, so the write hooks do nothing.
+    """
+
+    async def search(
+        self, query: str, owner_id: str | None, offset: int, limit: int
+    ) -> list[dict]:
+        mongo_query = {"$text": {"$search": query}, "deleted_at": None}
+        if owner_id:
+            mongo_query["owner"] = owner_id
+        score = {"score": {"$meta": "textScore"}}
+        cursor = (
+            get_note_collection()
+            .find(mongo_query, score)
+            .sort([("score", {"$meta": "textScore"})])
+            .skip(offset)
+            .limit(limit)
+        )
+        return [serialize_note(note) async for note in cursor]
+
+
+class InvertedIndexSearchBackend(NotesSearchBackend):
+    """
+    In-process inverted index for the mock database which has no $text support.
+    Search only walks the postings of the query tokens, not all notes.
+    The index is rebuilt from the notes collection at startup.
+    """
+
+    def __init__(self):
+        # token -> note ID -> weighted term frequency
+        self._postings: dict[str, dict[str, int]] = defaultdict(dict)
+        # note ID -> field -> tokens
+        self._fields: dict[str, dict[str, list[str]]] = {}
+        self._owners: dict[str, str | None] = {}
+
+    def index_note(self, note_id: str, owner_id: str | None, fields: dict) -> None:
+        fields = {
+            field: tokenize(fields[field])
+            for field in SEARCH_WEIGHTS
+            if field in fields
+        }
+        if not fields and note_id not in self._fields:
+            return
+        note_fields = {**self._fields.get(note_id, {}), **fields}
+        owner_id = owner_id or self._owners.get(note_id)
+        self.remove_note(note_id)
+
+        frequencies = defaultdict(int)
+        for field, tokens in note_fields.items():
+            for token in tokens:
+                frequencies[token] += SEARCH_WEIGHTS[field]
+        for token, frequency in frequencies.items():
+            self._postings[token][note_id] = frequency
+        self._fields[note_id] = note_fields
+        self._owners[note_id] = owner_id
+
+    def remove_note(self, note_id: str) -> None:
+        note_fields = self._fields.pop(note_id, None)
+        self._owners.pop(note_id, None)
+        if note_fields is None:
+            return
+        for tokens in note_fields.values():
+            for token in tokens:
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(note_id, None)
+                    if not postings:
+                        del self._postings[token]
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._fields.clear()
+        self._owners.clear()
+
+    async def rebuild(self) -> int:
+        self.clear()
+        cursor = get_note_collection().find(
+            {"deleted_at": None}, {"owner": 1, **dict.fromkeys(SEARCH_WEIGHTS, 1)}
+        )
+        async for note in cursor:
+            self.index_note(str(note["_id"]), note.get("owner"), note)
+        return len(self._fields)
+
+    async def search(
+        self, query: str, owner_id: str | None, offset: int, limit: int
+    ) -> list[dict]:
+        scores = defaultdict(int)
+        for token in set(tokenize(query)):
+            for note_id, frequency in self._postings.get(token, {}).items():
+                if owner_id is None or self._owners[note_id] == owner_id:
+                    scores[note_id] += frequency
+
+        ranked = sorted(scores, key=lambda note_id: (-scores[note_id], note_id))
+        note_ids = ranked[offset : offset + limit]
+        if not note_ids:
+            return []
+
+        cursor = get_note_collection().find(
+            {"_id": {"$in": [ObjectId(note_id) for note_id in note_ids]}}
+        )
+        notes = {str(note["_id"]): note async for note in cursor}
+        return [
+            {**serialize_note(notes[note_id]), "score": scores[note_id]}
+            for note_id in note_ids
+            if note_id in notes
+        ]
+
+
+@lru_cache
+def get_search_backend() -> NotesSearchBackend:
+    """
+    Return the search backend from settings, by default the in-process index
+    for the mock database and the Mongo text index otherwise.
+    """
+    backend = get_settings().notes_search_backend
+    if backend == "memory" or (not backend and is_mock()):
+        return InvertedIndexSearchBackend()
+    return MongoTextSearchBackend()
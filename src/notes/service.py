@@ -1,4 +1,29 @@
-from src.notes.schemas import NoteBaseSchema, NoteDBSchema
+import asyncio
+import base64
+import hashlib
+from datetime import datetime, timezone
+from typing import AsyncGenerator, AsyncIterator
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from src.notes.events import OVERFLOW, NoteEventBus, NoteEventSubscription
+from src.notes.exceptions import (
+    HTTPInvalidNoteFields,
+    HTTPInvalidNoteId,
+    HTTPInvalidSyncToken,
+)
+from src.notes.schemas import NOTE_FIELDS, NoteBaseSchema, NoteDBSchema
+from src.serializers import dumps
+
+
+def check_note_id(note_id: str) -> None:
+    """
+    Check a note ID from the path before it is used in a query.
+    If it is not a valid ObjectId, then raise HTTPInvalidNoteId.
+    """
+    if not ObjectId.is_valid(note_id):
+        raise HTTPInvalidNoteId(note_id)
 
 
 async def get_user_id_from_current_user(current_user) -> str:
@@ -21,3 +46,182 @@ async def get_note_db_schema_object(current_user, note: NoteBaseSchema) -> NoteD
     """
     user_id = await get_user_id_from_current_user(current_user)
     return NoteDBSchema(title=note.title, body=note.body, owner=user_id)
+
+
+def get_note_fields(fields: str | None) -> list[str] | None:
+    """
+    Parse a comma separated list of note fields, None means all fields.
+    If a field is unknown, then raise HTTPInvalidNoteFields.
+    """
+    if not fields:
+        return None
+    result = []
+    for field in fields.split(","):
+        field = field.strip()
+        if field == "_id":
+            continue
+        if field not in NOTE_FIELDS:
+            raise HTTPInvalidNoteFields(field)
+        if field not in result:
+            result.append(field)
+    return result or None
+
+
+def get_note_etag(note: dict) -> str:
+    """
+    Return a strong ETag of a note built from its ID and version.
+    """
+    return f'"{note["_id"]}-{note.get("version", 0)}"'
+
+
+def get_notes_etag(notes: list[dict], *extra) -> str:
+    """
+    Return a strong ETag of a list of notes built from their IDs and versions.
+    extra values (e.g. the next page cursor) are part of the ETag too.
+    """
+    digest = hashlib.sha1()
+    for note in notes:
+        digest.update(f'{note["_id"]}-{note.get("version", 0)};'.encode())
+    for value in extra:
+        digest.update(f"{value};".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def is_etag_matched(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check if the If-None-Match header matches the ETag (weak comparison).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in tags
+
+
+def get_if_match_versions(note_id: str, if_match: str) -> list[int] | None:
+    """
+    Return note versions allowed by the If-Match header (strong comparison).
+    None means any version ("*"), an empty list means that no ETag is of this note.
+    """
+    if if_match.strip() == "*":
+        return None
+    versions = []
+    prefix = f'"{note_id}-'
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith(prefix) and tag.endswith('"'):
+            version = tag[len(prefix) : -1]
+            if version.isdigit():
+                versions.append(int(version))
+    return versions
+
+
+def bulk_item_ok(note_id: str, status_code: int) -> dict:
+    """
+    Create a result of a successful item of a bulk operation.
+    """
+    return {"id": note_id, "status": status_code}
+
+
+def bulk_item_error(note_id: str | None, error: HTTPException) -> dict:
+    """
+    Create a result of a failed item of a bulk operation from the HTTP exception.
+    """
+    return {"id": note_id, "status": error.status_code, "detail": error.detail}
+
+
+async def stream_notes_ndjson(
+    first_note: dict, notes: AsyncIterator[dict]
+) -> AsyncIterator[bytes]:
+    """
+    Serialize notes into newline-delimited JSON, one note per chunk.
+    """
+    yield dumps(first_note) + b"\n"
+    async for note in notes:
+        yield dumps(note) + b"\n"
+
+
+async def stream_notes_json_array(
+    first_note: dict, notes: AsyncIterator[dict]
+) -> AsyncIterator[bytes]:
+    """
+    Serialize notes into a JSON array, one note per chunk.
+    """
+    yield b"[" + dumps(first_note)
+    async for note in notes:
+        yield b"," + dumps(note)
+    yield b"]"
+
+
+async def iterate_note_events(
+    bus: NoteEventBus, subscription: NoteEventSubscription, keepalive: float
+) -> AsyncGenerator[dict | None, None]:
+    """
+    Yield note events of a subscription and None after keepalive seconds without events.
+    Stop after the overflow event, the subscription is cancelled at the end.
+    """
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), keepalive)
+            except TimeoutError:
+                yield None
+                continue
+            yield event
+            if event["type"] == OVERFLOW:
+                return
+    finally:
+        bus.unsubscribe(subscription)
+
+
+async def stream_note_events_sse(
+    events: AsyncGenerator[dict | None, None],
+) -> AsyncIterator[bytes]:
+    """
+    Serialize note events into Server-Sent Events named by the event type.
+    A comment is sent instead of a missing event to keep the connection open.
+    """
+    try:
+        async for event in events:
+            if event is None:
+                yield b": keepalive\n\n"
+            else:
+                yield b"event: %s\ndata: %s\n\n" % (
+                    event["type"].encode(),
+                    dumps(event),
+                )
+    finally:
+        # Cancel the subscription as soon as the client is gone
+        await events.aclose()
+
+
+# The smallest note ID, the position before all notes changed at the same time
+MIN_NOTE_ID = "0" * 24
+
+
+def encode_sync_token(updated_at: datetime | str, note_id: str) -> str:
+    """
+    Encode the position of the last seen change into an opaque sync token.
+    """
+    if isinstance(updated_at, datetime):
+        updated_at = updated_at.isoformat()
+    return base64.urlsafe_b64encode(f"{updated_at}|{note_id}".encode()).decode()
+
+
+def decode_sync_token(token: str) -> tuple[datetime, str]:
+    """
+    Decode a sync token into "updated_at" and "_id" of the last seen change.
+    If the token is malformed, then raise HTTPInvalidSyncToken.
+    """
+    try:
+        updated_at, note_id = base64.urlsafe_b64decode(token).decode().split("|")
+        updated_at = datetime.fromisoformat(updated_at)
+    except ValueError:
+        raise HTTPInvalidSyncToken(token)
+    if not ObjectId.is_valid(note_id):
+        raise HTTPInvalidSyncToken(token)
+    # Mongo returns naive datetimes in UTC
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at, note_id
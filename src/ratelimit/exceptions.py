@@ -0,0 +1,13 @@
+import math
+
+from fastapi import HTTPException
+from starlette import status
+
+
+class HTTPTooManyRequests(HTTPException):
+    def __init__(self, retry_after: float = 1):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
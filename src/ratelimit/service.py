@@ -0,0 +1,251 @@
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.auth.service import decode_access_token
+from src.ratelimit.exceptions import HTTPTooManyRequests
+from src.settings import Settings, get_settings
+
+try:
+    from redis import asyncio as redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """
+    Token bucket which holds up to capacity tokens and refills them
+    at capacity / period tokens per second, every request takes a token.
+    """
+
+    name: str
+    capacity: int
+    period: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, name: str, value: str) -> "RateLimit":
+        """
+        Parse a limit like "10/60", ten requests per sixty seconds.
+        """
+        capacity, _, period = value.partition("/")
+        return cls(name, int(capacity), float(period or 1))
+
+
+class RateLimitBackend:
+    """
+    Storage of token buckets.
+    """
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        """
+        Take a token from the bucket, return 0 if it was taken,
+        otherwise the number of seconds until the next token.
+        """
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets of this process. The least recently used buckets above
+    max_keys are dropped, a dropped bucket starts full again.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = limit.capacity
+        else:
+            tokens, updated_at = bucket
+            tokens = min(
+                limit.capacity, tokens + (now - updated_at) * limit.refill_rate
+            )
+            self._buckets.move_to_end(key)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / limit.refill_rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def clear(self) -> None:
+        self._buckets.clear()
+
+
+# Takes a token atomically, time comes from the Redis server, so all workers share one clock
+REDIS_ACQUIRE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated_at) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated_at", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets shared by all worker processes, requires the redis package.
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("Install redis package to use the redis rate limit")
+        self._client = redis.from_url(url)
+        self._acquire = self._client.register_script(REDIS_ACQUIRE_SCRIPT)
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        retry_after = await self._acquire(
+            keys=[f"ratelimit:{key}"], args=[limit.capacity, limit.refill_rate]
+        )
+        return float(retry_after)
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter(match="ratelimit:*"):
+            await self._client.delete(key)
+
+
+def compile_route(route: str) -> tuple[str, re.Pattern]:
+    """
+    Split a rule like "GET /notes/{note_id}" into the method and a path pattern.
+    """
+    method, _, path = route.partition(" ")
+    pattern = re.sub(r"\\{[^/]+?\\}", "[^/]+", re.escape(path))
+    return method.upper(), re.compile(f"^{pattern}$")
+
+
+@lru_cache
+def get_rate_limit_backend() -> RateLimitBackend:
+    """
+    Return the token bucket backend from settings.
+    """
+    settings = get_settings()
+    if settings.rate_limit_backend == "redis":
+        return RedisRateLimitBackend(settings.rate_limit_redis_url)
+    return MemoryRateLimitBackend(settings.rate_limit_max_keys)
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware which limits requests with token buckets per route rule,
+    keyed by the user of the access token or by the client IP without one.
+    Routes without a rule use the rate_limit_default limit, if it is set.
+    It also caps concurrent requests of one user in this process.
+    Limited requests get 429 Too Many Requests with the Retry-After header.
+    """
+
+    def __init__(self, app: ASGIApp, settings: Settings | None = None):
+        settings = settings or get_settings()
+        self.app = app
+        self.rules = [
+            (*compile_route(route), RateLimit.parse(route, value))
+            for route, value in settings.rate_limits.items()
+        ]
+        self.default = (
+            RateLimit.parse("*", settings.rate_limit_default)
+            if settings.rate_limit_default
+            else None
+        )
+        self.max_concurrent = settings.rate_limit_max_concurrent_per_user
+        self.backend = get_rate_limit_backend()
+        self.in_flight: dict[str, int] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.get_limit(scope["method"], scope["path"])
+        if limit is None and not self.max_concurrent:
+            await self.app(scope, receive, send)
+            return
+
+        key = self.get_key(scope)
+        if limit is not None:
+            retry_after = await self.backend.acquire(f"{limit.name}:{key}", limit)
+            if retry_after:
+                await self.reject(scope, receive, send, retry_after)
+                return
+
+        if not self.max_concurrent:
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight.get(key, 0) >= self.max_concurrent:
+            await self.reject(scope, receive, send, 1)
+            return
+        self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[key] -= 1
+            if not self.in_flight[key]:
+                del self.in_flight[key]
+
+    def get_limit(self, method: str, path: str) -> RateLimit | None:
+        for rule_method, pattern, limit in self.rules:
+            if rule_method in (method, "*") and pattern.match(path):
+                return limit
+        return self.default
+
+    @staticmethod
+    def get_key(scope: Scope) -> str:
+        """
+        Return "user:<email>" for a valid access token, otherwise "ip:<address>".
+        Verified tokens are cached, so this does not verify the signature again.
+        """
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    try:
+                        return f"user:{decode_access_token(token)['sub']}"
+                    except HTTPException:
+                        pass
+                break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else None}"
+
+    @staticmethod
+    async def reject(
+        scope: Scope, receive: Receive, send: Send, retry_after: float
+    ) -> None:
+        # Middlewares run outside of the exception handlers, so the response is sent here
+        exc = HTTPTooManyRequests(retry_after)
+        response = JSONResponse(
+            {"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers
+        )
+        await response(scope, receive, send)
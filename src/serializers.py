@@ -0,0 +1,73 @@
+import json
+from datetime import datetime
+from typing import Any, Callable
+
+from bson import ObjectId
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _keep(value):
+    return value
+
+
+def _serialize_list(value: list) -> list:
+    return [_serialize_value(item) for item in value]
+
+
+def _serialize_value(value):
+    converter = _CONVERTERS.get(type(value))
+    if converter is None:
+        return str(value)
+    return converter(value)
+
+
+def serialize_document(document: dict) -> dict:
+    """
+    Convert a BSON document into a JSON-compatible dict in a single pass.
+    ObjectId becomes a string, datetime becomes an ISO 8601 string,
+    bool/int/float/str are kept, other values are converted with str().
+    """
+    return {key: _serialize_value(value) for key, value in document.items()}
+
+
+# Dispatch on the exact type instead of isinstance chains
+_CONVERTERS: dict[type, Callable[[Any], Any]] = {
+    str: _keep,
+    bool: _keep,
+    int: _keep,
+    float: _keep,
+    ObjectId: str,
+    datetime: datetime.isoformat,
+    dict: serialize_document,
+    list: _serialize_list,
+}
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode already serialized content into compact JSON bytes.
+    Uses orjson if it is installed, otherwise the standard json module.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for content produced by serialize_document.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
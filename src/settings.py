@@ -11,11 +11,110 @@ class Settings(BaseSettings):
     mongo_db_note_coll: str
     mongo_db_removed_note_coll: str
     mongo_db_auth_coll: str
+    mongo_db_job_coll: str = "jobs"
+    mongo_db_audit_coll: str = "audit"
+
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_wait_queue_timeout_ms: int | None = None
+    mongo_compressors: str = ""
+    mongo_read_preference: str = "primary"
+
+    notes_deleted_ttl_seconds: int = 30 * 24 * 60 * 60
+    # "mongo", "memory" or empty to pick by the database
+    notes_search_backend: str = ""
+    # "memory", "redis" or "none"
+    notes_cache_backend: str = "memory"
+    notes_cache_max_size: int = 10000
+    notes_cache_ttl_seconds: float = 300
+    notes_cache_redis_url: str = "redis://localhost:6379/0"
+    # "change_stream" (needs a replica set), "memory" or empty to pick by the database,
+    # a change stream is then used only if MongoDB is a replica set
+    notes_events_backend: str = ""
+    # Events queued for a client which does not keep up, then it is asked to resync
+    notes_events_queue_size: int = 100
+    notes_events_keepalive_seconds: float = 15
+    # Notes changed more recently are left for the next sync, so writes in flight are not missed
+    notes_sync_settle_seconds: float = 1
 
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
 
+    user_cache_max_size: int = 1024
+    user_cache_ttl_seconds: float = 60
+    token_cache_max_size: int = 4096
+
+    password_hash_workers: int = 4
+    password_hash_queue_limit: int = 64
+
+    log_dir: str = "logs/"
+    # Write app.<pid>.log instead of app.log, needed by several worker processes
+    log_file_per_process: bool = False
+    log_file_max_bytes: int = 10 * 1024 * 1024
+    log_file_backup_count: int = 5
+    log_headers: str = "user-agent,content-type,content-length"
+    log_sample_rate_2xx: float = 1.0
+
+    # Directory shared by worker processes to sum their metrics, empty for a single process
+    metrics_dir: str = ""
+    metrics_flush_interval_seconds: float = 5
+
+    # Store a sampled profile of requests slower than this, 0 disables it
+    profile_slow_request_seconds: float = 0
+    profile_sample_interval_seconds: float = 0.005
+    profile_max_files: int = 100
+
+    # Token buckets by route as {"METHOD /route": "requests/seconds"}, keyed by user or IP
+    rate_limits: dict[str, str] = {
+        "POST /auth/token": "10/60",
+        "POST /auth/register": "5/60",
+        "GET /notes/": "20/1",
+    }
+    # Limit of routes without a rule, empty for no limit
+    rate_limit_default: str = ""
+    # "memory" or "redis"
+    rate_limit_backend: str = "memory"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_max_keys: int = 100_000
+    # Concurrent requests of one user in a worker process, 0 for no limit
+    rate_limit_max_concurrent_per_user: int = 0
+
+    # Responses smaller than this are not compressed
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    admin_stats_limit: int = 100
+    admin_stats_active_hours: float = 24
+    # Refresh snapshots of admin stats in the background, 0 computes them on every request
+    admin_stats_refresh_seconds: float = 0
+    # Audit records are stored along with the changed documents and moved
+    # into the audit collection this often
+    audit_relay_interval_seconds: float = 1
+
+    # Background jobs run by this many tasks of every worker process
+    jobs_workers: int = 4
+    # Jobs beyond the queue size wait in the outbox collection until polled
+    jobs_queue_max_size: int = 1000
+    jobs_max_attempts: int = 5
+    # Delay before the first retry, doubled on every next one
+    jobs_retry_delay_seconds: float = 1
+    # A running job not finished in this time is taken over by another worker
+    jobs_lease_seconds: float = 60
+    jobs_poll_interval_seconds: float = 5
+
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    # 0 starts one worker process per available CPU. Caches, rate limit buckets and
+    # token revocations live in the process, so several workers need shared backends
+    server_workers: int = 1
+    server_reload: bool = False
+    server_keep_alive_seconds: int = 5
+    server_backlog: int = 2048
+    server_limit_concurrency: int | None = None
+    server_graceful_shutdown_seconds: int = 30
+
     testing: bool
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
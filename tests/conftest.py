@@ -1,21 +1,118 @@
 import asyncio
+from collections import Counter
 
 import pytest
-
+from fastapi.testclient import TestClient
+
+import src.admin.database
+import src.auth.database
+import src.jobs.database
+import src.notes.database
+from src.admin.service import stats_snapshots
+from src.app import app
+from src.auth.cache import get_token_cache, get_user_cache
 from src.auth.database import add_user_in_db, get_user_id_by_email
 from src.auth.service import get_password_hash
-from src.database import drop_collections, is_mock
+from src.database import drop_collections, ensure_indexes, is_mock
+from src.jobs.service import get_job_queue
+from src.notes.cache import get_response_cache
 from src.notes.database import add_note_in_db
+from src.notes.events import get_note_event_bus
+from src.notes.search import get_search_backend
+from src.ratelimit.service import get_rate_limit_backend
+from src.settings import get_settings
+
+
+@pytest.fixture(scope="session", autouse=True)
+def log_dir(tmp_path_factory):
+    """
+    Write log files of applications started by tests to a temporary directory.
+    """
+    get_settings().log_dir = str(tmp_path_factory.mktemp("logs"))
 
 
 @pytest.fixture(scope="function")
 def drop_mock_db():
-    if is_mock:
+    if is_mock():
         asyncio.run(drop_collections())
+        asyncio.run(ensure_indexes())
+        get_user_cache().clear()
+        get_token_cache().clear()
+        get_search_backend().clear()
+        asyncio.run(get_response_cache().clear())
+        asyncio.run(get_rate_limit_backend().clear())
+        stats_snapshots.clear()
+        get_job_queue().clear()
+        get_note_event_bus().clear()
     else:
         raise NotImplementedError("This test only applies to mock DB")
 
 
+# Collection methods which make a round trip to the database
+DB_ROUND_TRIPS = {
+    "aggregate",
+    "bulk_write",
+    "count_documents",
+    "delete_many",
+    "delete_one",
+    "find",
+    "find_one",
+    "find_one_and_delete",
+    "find_one_and_update",
+    "insert_many",
+    "insert_one",
+    "update_many",
+    "update_one",
+}
+
+
+class CountingCollection:
+    """
+    Collection proxy which counts database round trips as "<collection>.<method>".
+    """
+
+    def __init__(self, collection, name: str, calls: Counter):
+        self.collection = collection
+        self.name = name
+        self.calls = calls
+
+    def __getattr__(self, attr):
+        value = getattr(self.collection, attr)
+        if attr not in DB_ROUND_TRIPS:
+            return value
+
+        def counted(*args, **kwargs):
+            self.calls[f"{self.name}.{attr}"] += 1
+            return value(*args, **kwargs)
+
+        return counted
+
+
+@pytest.fixture(scope="function")
+def db_calls(monkeypatch):
+    """
+    Count database round trips by collection and method, e.g. {"note.find_one": 1}.
+    """
+    calls = Counter()
+
+    def counting(name, get_collection):
+        def wrapper():
+            return CountingCollection(get_collection(), name, calls)
+
+        return wrapper
+
+    for module, getter in (
+        (src.notes.database, "get_note_collection"),
+        (src.notes.database, "get_removed_note_collection"),
+        (src.auth.database, "get_auth_collection"),
+        (src.jobs.database, "get_job_collection"),
+        (src.admin.database, "get_audit_collection"),
+    ):
+        name = getter.removeprefix("get_").removesuffix("_collection")
+        monkeypatch.setattr(module, getter, counting(name, getattr(module, getter)))
+    return calls
+
+
 @pytest.fixture(scope="function")
 def add_simple_user():
     asyncio.run(
@@ -89,6 +186,21 @@ def add_3_simple_notes():
     asyncio.run(add_notes())
 
 
+@pytest.fixture(scope="function")
+def get_headers():
+    """
+    Return a function which logs in a user with the password "password"
+    and returns the Authorization header with the access token.
+    """
+    client = TestClient(app)
+
+    def get_user_headers(email: str) -> dict:
+        bearer = get_token(client, email, "password")
+        return {"Authorization": f"Bearer {bearer}"}
+
+    return get_user_headers
+
+
 def get_token(client, email, password):
     data = {"email": email, "password": password}
     response = client.post("/auth/token", json=data)
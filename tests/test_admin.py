@@ -0,0 +1,71 @@
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.admin.service import relay_audit_records
+from src.app import app
+from src.notes.database import get_note_id_by_title
+from tests.conftest import get_token
+
+client = TestClient(app)
+
+
+async def test_lifespan_startup_and_shutdown(drop_mock_db):
+    with TestClient(app) as lifespan_client:
+        response = lifespan_client.get("/")
+        assert response.status_code == status.HTTP_200_OK
+
+
+async def test_db_pool_stats_as_admin(drop_mock_db, add_3_simple_users):
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/admin/db/pool", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    resp_data = response.json()
+    assert resp_data["mock"] is True
+    assert "checked_out" in resp_data
+    assert "wait_queue" in resp_data
+
+
+async def test_db_pool_stats_as_simple_user(drop_mock_db, add_3_simple_users):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/admin/db/pool", headers=headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_audit_records(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    data = {"email": "new@example.com", "password": "password"}
+    response = client.post("/auth/register", json=data)
+    assert "audit_pending" not in response.json()
+
+    note_ids = [
+        await get_note_id_by_title("title 1"),
+        await get_note_id_by_title("title 2"),
+    ]
+    headers = get_headers("email1@example.com")
+    response = client.request(
+        "DELETE", "/notes/bulk", headers=headers, json={"ids": note_ids}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(
+        f"/notes/restore/{note_ids[0]}", headers=get_headers("admin@example.com")
+    )
+    assert "audit_pending" not in response.json()
+    note_id = await get_note_id_by_title("title 3")
+    client.delete(f"/notes/{note_id}", headers=get_headers("email2@example.com"))
+
+    # The bulk delete record is stored along with both notes and moved once
+    assert await relay_audit_records() == 4
+    assert await relay_audit_records() == 0
+    response = client.get("/admin/audit", headers=get_headers("admin@example.com"))
+    assert [
+        (record["action"], record["actor"], record.get("note_ids"))
+        for record in response.json()
+    ] == [
+        ("notes.delete", "email2@example.com", [note_id]),
+        ("notes.restore", "admin@example.com", note_ids[:1]),
+        ("notes.delete", "email1@example.com", note_ids),
+        ("auth.register", "new@example.com", None),
+    ]
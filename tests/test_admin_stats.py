@@ -0,0 +1,125 @@
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.admin.service import stats_snapshots
+from src.app import app
+from src.auth.database import get_user_id_by_email
+from src.notes.database import get_note_id_by_title
+
+client = TestClient(app)
+
+
+async def test_owners_stats(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    response = client.get(
+        "/admin/stats/owners", headers=get_headers("admin@example.com")
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert "computed_at" in response.json()
+    assert response.json()["items"] == [
+        {
+            "owner": await get_user_id_by_email("email1@example.com"),
+            "notes": 2,
+            "body_bytes": 12,
+        },
+        {
+            "owner": await get_user_id_by_email("email2@example.com"),
+            "notes": 1,
+            "body_bytes": 6,
+        },
+    ]
+
+    response = client.get(
+        "/admin/stats/owners",
+        params={"limit": 1},
+        headers=get_headers("admin@example.com"),
+    )
+    assert len(response.json()["items"]) == 1
+
+
+async def test_owners_stats_body_size_updated(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    headers = get_headers("email2@example.com")
+    note_id = await get_note_id_by_title("title 3")
+    response = client.patch(f"/notes/{note_id}", json={"body": "тело"}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.get(
+        "/admin/stats/owners", headers=get_headers("admin@example.com")
+    )
+    assert response.json()["items"][1]["body_bytes"] == len("тело".encode())
+
+
+async def test_body_size_not_returned(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    headers = get_headers("email1@example.com")
+    response = client.post(
+        "/notes/", json={"title": "new", "body": "body"}, headers=headers
+    )
+    assert "body_size" not in response.json()
+    note_id = response.json()["_id"]
+
+    response = client.patch(f"/notes/{note_id}", json={"body": "тело"}, headers=headers)
+    assert "body_size" not in response.json()
+    response = client.get(f"/notes/{note_id}", headers=headers)
+    assert "body_size" not in response.json()
+    response = client.get("/notes/", headers=headers)
+    assert all("body_size" not in note for note in response.json())
+    response = client.get("/notes/sync", headers=headers)
+    assert all("body_size" not in note for note in response.json()["notes"])
+
+    response = client.get("/notes/?fields=body_size", headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+async def test_active_and_deleted_stats(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    headers = get_headers("email1@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    response = client.delete(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    headers = get_headers("admin@example.com")
+    owner = await get_user_id_by_email("email1@example.com")
+    response = client.get("/admin/stats/deleted", headers=headers)
+    assert response.json()["items"] == [{"owner": owner, "deleted_notes": 1}]
+
+    response = client.get("/admin/stats/owners", headers=headers)
+    assert response.json()["items"][0]["notes"] == 1
+
+    response = client.get("/admin/stats/active", headers=headers)
+    items = response.json()["items"]
+    assert [item["owner"] for item in items][0] == owner
+    assert sum(item["changed_notes"] for item in items) == 3
+
+
+async def test_stats_snapshot(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    await stats_snapshots.refresh()
+    computed_at = stats_snapshots.get("owners")["computed_at"]
+
+    headers = get_headers("email1@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    client.delete(f"/notes/{note_id}", headers=headers)
+
+    headers = get_headers("admin@example.com")
+    response = client.get("/admin/stats/owners", headers=headers)
+    assert response.json()["computed_at"] == computed_at.isoformat()
+    assert response.json()["items"][0]["notes"] == 2
+
+    response = client.get(
+        "/admin/stats/owners", params={"fresh": True}, headers=headers
+    )
+    assert response.json()["items"][0]["notes"] == 1
+
+
+def test_stats_access_denied(drop_mock_db, add_simple_user, get_headers):
+    headers = get_headers("email@example.com")
+    for name in ("owners", "active", "deleted"):
+        response = client.get(f"/admin/stats/{name}", headers=headers)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
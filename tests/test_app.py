@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import create_app
+from src.logger import setup_logging, stop_logging
+from src.settings import get_settings
+
+IMPORT_CHECK = """
+import logging, sys
+import src.app
+from src.auth.service import get_password_context, get_password_executor
+from src.database import _client
+from src.settings import get_settings
+assert get_settings.cache_info().currsize == 0
+assert not logging.getLogger().handlers
+assert get_password_context.cache_info().currsize == 0
+assert get_password_executor.cache_info().currsize == 0
+assert _client is None
+assert "passlib.context" not in sys.modules
+"""
+
+
+def test_import_has_no_side_effects(tmp_path):
+    # No environment and no .env, so reading settings at import would fail
+    subprocess.run(
+        [sys.executable, "-c", IMPORT_CHECK],
+        check=True,
+        cwd=tmp_path,
+        env={"PATH": os.environ["PATH"], "PYTHONPATH": os.getcwd()},
+    )
+    assert not os.listdir(tmp_path)
+
+
+async def test_create_app_sets_up_logging_at_startup(drop_mock_db, tmp_path):
+    settings = get_settings().model_copy(update={"log_dir": str(tmp_path)})
+    app = create_app(settings)
+    assert not os.listdir(tmp_path)
+
+    with TestClient(app) as client:
+        response = client.get("/")
+        assert response.status_code == status.HTTP_200_OK
+    assert os.listdir(tmp_path) == ["app.log"]
+
+
+async def test_create_app_middlewares_use_settings(drop_mock_db):
+    settings = get_settings().model_copy(update={"rate_limits": {"GET /": "1/60"}})
+    client = TestClient(create_app(settings))
+    assert client.get("/").status_code == status.HTTP_200_OK
+    assert client.get("/").status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    # The default application keeps the limits of get_settings()
+    client = TestClient(create_app())
+    assert client.get("/").status_code == status.HTTP_200_OK
+    assert client.get("/").status_code == status.HTTP_200_OK
+
+
+def test_setup_logging_file_per_process(tmp_path):
+    settings = get_settings().model_copy(
+        update={"log_dir": str(tmp_path), "log_file_per_process": True}
+    )
+    setup_logging(settings)
+    stop_logging()
+    assert os.listdir(tmp_path) == [f"app.{os.getpid()}.log"]
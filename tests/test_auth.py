@@ -2,6 +2,7 @@ from fastapi.testclient import TestClient
 from starlette import status
 
 from src.app import app
+from src.settings import get_settings
 from tests.conftest import get_token
 
 client = TestClient(app)
@@ -71,3 +72,90 @@ async def test_access_without_authorization(drop_mock_db, add_simple_user):
     headers = {}
     response = client.get("/auth/user", headers=headers)
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_current_user_cached(drop_mock_db, add_3_simple_users):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    client.get("/auth/user", headers=headers)
+    client.get("/auth/user", headers=headers)
+
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/auth/cache", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    resp_data = response.json()
+    assert resp_data["size"] == 2
+    assert resp_data["hits"] == 1
+    assert resp_data["misses"] == 2
+
+
+async def test_clear_user_cache_as_admin(drop_mock_db, add_3_simple_users):
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.delete("/auth/cache", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["size"] == 0
+
+
+async def test_clear_user_cache_as_simple_user(drop_mock_db, add_3_simple_users):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.delete("/auth/cache", headers=headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_token_password_pool_saturated(
+    drop_mock_db, add_simple_user, monkeypatch
+):
+    monkeypatch.setattr(get_settings(), "password_hash_queue_limit", 0)
+    data = {"email": "email@example.com", "password": "password"}
+    response = client.post("/auth/token", json=data)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
+async def test_logout_revokes_token(drop_mock_db, add_simple_user):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.post("/auth/logout", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.get("/auth/user", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_verified_token_cached(drop_mock_db, add_3_simple_users):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    client.get("/auth/user", headers=headers)
+    client.get("/auth/user", headers=headers)
+
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/auth/tokens/cache", headers=headers)
+    resp_data = response.json()
+    assert resp_data["size"] == 2
+    assert resp_data["hits"] == 1
+
+
+async def test_revoke_user_tokens_as_admin(drop_mock_db, add_3_simple_users):
+    user_bearer = get_token(client, "email1@example.com", "password")
+    user_headers = {"Authorization": f"Bearer {user_bearer}"}
+    assert client.get("/auth/user", headers=user_headers).status_code == 200
+
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    params = {"email": "email1@example.com"}
+    response = client.delete("/auth/tokens", headers=headers, params=params)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["revoked_users"] == 1
+
+    response = client.get("/auth/user", headers=user_headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.get("/auth/user", headers=headers).status_code == 200
+
+    # A token issued after the revocation, even within the same second, is valid
+    user_bearer = get_token(client, "email1@example.com", "password")
+    user_headers = {"Authorization": f"Bearer {user_bearer}"}
+    assert client.get("/auth/user", headers=user_headers).status_code == 200
@@ -0,0 +1,129 @@
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+
+from src.compression import (
+    CompressionMiddleware,
+    add_etag_encoding,
+    parse_accept_encoding,
+    remove_etag_encodings,
+)
+from src.settings import get_settings
+
+BODY = "note body " * 1000
+ETAG = '"note-1"'
+
+
+def get_compressed_client(**settings) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("small")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield BODY
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/etag")
+    async def etag(request: Request):
+        if request.headers.get("If-None-Match") == ETAG:
+            return Response(status_code=304, headers={"ETag": ETAG})
+        headers = {"ETag": ETAG, "X-If-Match": request.headers.get("If-Match", "")}
+        return PlainTextResponse(BODY, headers=headers)
+
+    @app.get("/events")
+    async def events():
+        return StreamingResponse(iter([BODY]), media_type="text/event-stream")
+
+    app.add_middleware(
+        CompressionMiddleware, settings=get_settings().model_copy(update=settings)
+    )
+    return TestClient(app)
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, br;q=0.5, identity;q=0") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "identity": 0.0,
+    }
+
+
+def test_gzip_compression():
+    client = get_compressed_client(compression_min_size=100)
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) < len(BODY)
+    assert response.text == BODY
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.text == "small"
+
+
+def test_no_compression_without_accept_encoding():
+    client = get_compressed_client(compression_min_size=100)
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.text == BODY
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streaming_compression():
+    client = get_compressed_client(compression_min_size=100, compression_gzip_level=1)
+    with client.stream(
+        "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Content-Length" not in response.headers
+        raw = b"".join(response.iter_raw())
+        assert gzip.decompress(raw) == (BODY * 3).encode()
+
+    response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_etag_encoding():
+    assert add_etag_encoding('"note-1"', "gzip") == '"note-1-gzip"'
+    assert add_etag_encoding('W/"note-1"', "br") == 'W/"note-1-br"'
+    assert remove_etag_encodings('"note-1-gzip", W/"note-2-br", "note-3"') == (
+        '"note-1", W/"note-2", "note-3"',
+        "br",
+    )
+    assert remove_etag_encodings("*") == ("*", None)
+
+
+def test_compressed_etag():
+    client = get_compressed_client(compression_min_size=100)
+    response = client.get("/etag", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["ETag"] == '"note-1-gzip"'
+
+    response = client.get("/etag", headers={"Accept-Encoding": "identity"})
+    assert response.headers["ETag"] == '"note-1"'
+
+    # The application sees its own ETags in conditional headers
+    response = client.get(
+        "/etag",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": '"note-1-gzip"'},
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"note-1-gzip"'
+
+    response = client.get(
+        "/etag", headers={"Accept-Encoding": "gzip", "If-Match": '"note-1-gzip"'}
+    )
+    assert response.headers["X-If-Match"] == '"note-1"'
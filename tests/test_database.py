@@ -0,0 +1,43 @@
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from src.auth.database import add_user_in_db
+from src.database import (
+    ensure_indexes,
+    get_auth_collection,
+    get_note_collection,
+    get_removed_note_collection,
+)
+from src.notes.database import migrate_removed_notes, restore_note, retrieve_note
+
+
+async def test_ensure_indexes_idempotent(drop_mock_db):
+    assert await ensure_indexes() == []
+    assert "email_1" in await get_auth_collection().index_information()
+    note_indexes = await get_note_collection().index_information()
+    assert {"owner_1", "owner_1__id_1", "title_1", "deleted_at_1"} <= set(note_indexes)
+    assert note_indexes["deleted_at_1"]["expireAfterSeconds"] > 0
+
+
+async def test_unique_user_email(drop_mock_db, add_simple_user):
+    with pytest.raises(DuplicateKeyError):
+        await add_user_in_db(
+            {"email": "email@example.com", "password": "hash", "is_admin": False}
+        )
+
+
+async def test_migrate_removed_notes(drop_mock_db):
+    note = {"_id": ObjectId(), "title": "title 1", "body": "body 1", "owner": "1"}
+    await get_removed_note_collection().insert_one(note)
+
+    assert await migrate_removed_notes() == 1
+    assert await migrate_removed_notes() == 0
+    assert await get_removed_note_collection().count_documents({}) == 0
+    assert await retrieve_note(str(note["_id"])) is None
+    moved_note = await get_note_collection().find_one({"_id": note["_id"]})
+    assert moved_note["updated_at"] == moved_note["deleted_at"]
+
+    restored_note = await restore_note(str(note["_id"]))
+    assert restored_note["title"] == "title 1"
+    assert "deleted_at" not in restored_note
@@ -0,0 +1,127 @@
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from src.jobs.database import claim_job, count_jobs_by_status
+from src.jobs.service import JobQueue, get_job_queue, job
+from src.notes.database import get_note_id_by_title
+
+client = TestClient(app)
+
+calls = []
+
+
+@job("test.record")
+async def record_call(value: int) -> None:
+    calls.append(value)
+
+
+@job("test.fail")
+async def fail_call() -> None:
+    raise ValueError("failed")
+
+
+def get_queue(**options) -> JobQueue:
+    return JobQueue(
+        **{
+            "workers": 1,
+            "max_size": 10,
+            "max_attempts": 2,
+            "retry_delay": 0,
+            "lease_seconds": 60,
+            "poll_interval": 1,
+            **options,
+        }
+    )
+
+
+async def test_job_completed(drop_mock_db):
+    calls.clear()
+    queue = get_queue()
+    await queue.enqueue("test.record", value=1)
+    assert (await count_jobs_by_status())["pending"] == 1
+
+    assert await queue.run_pending() == 1
+    assert calls == [1]
+    # Finished jobs are removed from the outbox
+    assert await count_jobs_by_status() == {"pending": 0, "running": 0, "failed": 0}
+
+
+async def test_job_retried_then_failed(drop_mock_db):
+    queue = get_queue()
+    job_id = await queue.enqueue("test.fail")
+
+    await queue.run_pending()
+    assert (await count_jobs_by_status())["pending"] == 1
+
+    # The retry is queued again by the poller
+    assert await queue.poll() == 1
+    await queue.run_pending()
+    assert (await count_jobs_by_status())["failed"] == 1
+    assert await claim_job(job_id, 60) is None
+
+
+async def test_job_deferred_when_queue_full(drop_mock_db):
+    calls.clear()
+    queue = get_queue(max_size=1)
+    await queue.enqueue("test.record", value=1)
+    await queue.enqueue("test.record", value=2)
+    assert queue.stats()["queued"] == 1
+
+    await queue.run_pending()
+    assert await queue.poll() == 1
+    await queue.run_pending()
+    assert calls == [1, 2]
+
+
+async def test_job_claimed_once(drop_mock_db):
+    calls.clear()
+    queue = get_queue()
+    job_id = await queue.enqueue("test.record", value=1)
+    assert await claim_job(job_id, 60)
+
+    # Another worker has the job, so it is not run twice
+    await queue.run_pending()
+    assert calls == []
+    assert await queue.poll() == 0
+
+
+async def test_job_lease_expired(drop_mock_db):
+    calls.clear()
+    queue = get_queue()
+    job_id = await queue.enqueue("test.record", value=1)
+    assert await claim_job(job_id, -1)
+
+    await queue.run_pending()
+    assert calls == [1]
+
+
+async def test_retry_failed_job(
+    drop_mock_db, add_3_simple_users, monkeypatch, get_headers
+):
+    queue = get_job_queue()
+    monkeypatch.setattr(queue, "retry_delay", 0)
+    job_id = await queue.enqueue("test.fail")
+    for _ in range(queue.max_attempts):
+        await queue.poll()
+        await queue.run_pending()
+
+    headers = get_headers("admin@example.com")
+    response = client.get("/admin/jobs", headers=headers)
+    failed = response.json()["failed"]
+    assert [item["_id"] for item in failed] == [job_id]
+    assert failed[0]["last_error"] == "ValueError: failed"
+
+    response = client.post(f"/admin/jobs/{job_id}/retry", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["attempts"] == 0
+    assert (await count_jobs_by_status())["pending"] == 1
+
+    response = client.post(f"/admin/jobs/{job_id}/retry", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_jobs_access_denied(drop_mock_db, add_simple_user, get_headers):
+    headers = get_headers("email@example.com")
+    response = client.get("/admin/jobs", headers=headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,60 @@
+import logging
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.logger import LogMiddleware
+from src.settings import get_settings
+
+
+def get_logging_client(
+    monkeypatch, sample_rate_2xx: float, headers: str = "user-agent"
+) -> TestClient:
+    monkeypatch.setattr(get_settings(), "log_sample_rate_2xx", sample_rate_2xx)
+    monkeypatch.setattr(get_settings(), "log_headers", headers)
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok():
+        return {}
+
+    @app.get("/missing")
+    async def missing():
+        raise HTTPException(status_code=404)
+
+    app.add_middleware(LogMiddleware)
+    return TestClient(app)
+
+
+def get_request_records(caplog) -> list[logging.LogRecord]:
+    return [record for record in caplog.records if hasattr(record, "request_method")]
+
+
+def test_log_request(monkeypatch, caplog):
+    client = get_logging_client(monkeypatch, sample_rate_2xx=1.0)
+    with caplog.at_level(logging.INFO):
+        client.get("/ok?a=1", headers={"User-Agent": "test", "Authorization": "x"})
+    [record] = get_request_records(caplog)
+    assert record.request_url == "/ok?a=1"
+    assert record.response_status_code == 200
+    assert record.request_headers == {"user-agent": "test"}
+
+
+def test_log_request_redacts_credentials(monkeypatch, caplog):
+    client = get_logging_client(monkeypatch, 1.0, headers="user-agent,authorization")
+    with caplog.at_level(logging.INFO):
+        client.get("/ok", headers={"User-Agent": "test", "Authorization": "Bearer x"})
+    [record] = get_request_records(caplog)
+    assert record.request_headers == {
+        "user-agent": "test",
+        "authorization": "[redacted]",
+    }
+
+
+def test_log_sampling_skips_only_successful_requests(monkeypatch, caplog):
+    client = get_logging_client(monkeypatch, sample_rate_2xx=0.0)
+    with caplog.at_level(logging.INFO):
+        client.get("/ok")
+        client.get("/missing")
+    [record] = get_request_records(caplog)
+    assert record.response_status_code == 404
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from src.main import get_uvicorn_config, get_worker_count
+from src.settings import get_settings
+
+
+def use_shared_state(monkeypatch, settings):
+    monkeypatch.setattr(settings, "notes_cache_backend", "redis")
+    monkeypatch.setattr(settings, "notes_search_backend", "mongo")
+    monkeypatch.setattr(settings, "rate_limit_backend", "redis")
+    monkeypatch.setattr(settings, "log_file_per_process", True)
+
+
+def test_worker_count(monkeypatch):
+    settings = get_settings()
+    assert get_worker_count(settings) == 1
+
+    use_shared_state(monkeypatch, settings)
+    monkeypatch.setattr(settings, "server_workers", 0)
+    assert get_worker_count(settings) == len(os.sched_getaffinity(0))
+
+    monkeypatch.setattr(settings, "server_workers", 3)
+    assert get_worker_count(settings) == 3
+
+    # Reload works only with a single process
+    monkeypatch.setattr(settings, "server_reload", True)
+    assert get_worker_count(settings) == 1
+
+
+def test_worker_count_process_local_state(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "server_workers", 2)
+    for name, value in [
+        ("notes_cache_backend", "memory"),
+        ("notes_search_backend", "memory"),
+        ("rate_limit_backend", "memory"),
+        ("log_file_per_process", False),
+    ]:
+        use_shared_state(monkeypatch, settings)
+        monkeypatch.setattr(settings, name, value)
+        with pytest.raises(ValueError, match=name.upper()):
+            get_worker_count(settings)
+
+    # Without rate limits the buckets are not used
+    use_shared_state(monkeypatch, settings)
+    monkeypatch.setattr(settings, "rate_limit_backend", "memory")
+    monkeypatch.setattr(settings, "rate_limits", {})
+    assert get_worker_count(settings) == 2
+
+
+def test_uvicorn_config(monkeypatch):
+    settings = get_settings()
+    use_shared_state(monkeypatch, settings)
+    monkeypatch.setattr(settings, "server_workers", 2)
+    monkeypatch.setattr(settings, "server_limit_concurrency", 100)
+    config = get_uvicorn_config(settings)
+    assert config["workers"] == 2
+    assert config["limit_concurrency"] == 100
+    assert config["loop"] in ("uvloop", "asyncio")
+    assert config["http"] in ("httptools", "h11")
+    assert config["timeout_graceful_shutdown"] == 30
@@ -0,0 +1,133 @@
+import json
+import os
+
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from src.metrics.registry import Counter, Gauge, Histogram, Registry
+from src.metrics.service import (
+    db_operation_duration_seconds,
+    get_metrics_path,
+    http_requests_total,
+    registry,
+    remove_metrics_snapshot,
+    remove_stale_metrics_snapshots,
+    write_metrics_snapshot,
+)
+from src.notes.database import get_note_id_by_title
+from src.settings import get_settings
+from tests.conftest import get_token
+
+client = TestClient(app)
+
+
+def test_registry_render():
+    test_registry = Registry()
+    counter = test_registry.register(Counter("test_total", "Test.", ("name",)))
+    gauge = test_registry.register(Gauge("test_gauge", "Test."))
+    histogram = test_registry.register(
+        Histogram("test_seconds", "Test.", buckets=(0.1, 1))
+    )
+    counter.inc('a"b')
+    counter.inc('a"b', amount=2)
+    gauge.inc()
+    gauge.dec()
+    histogram.observe(value=0.1)
+    histogram.observe(value=5)
+
+    assert test_registry.render().splitlines() == [
+        "# HELP test_total Test.",
+        "# TYPE test_total counter",
+        'test_total{name="a\\"b"} 3',
+        "# HELP test_gauge Test.",
+        "# TYPE test_gauge gauge",
+        "test_gauge 0",
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1"} 1',
+        'test_seconds_bucket{le="+Inf"} 2',
+        "test_seconds_sum 5.1",
+        "test_seconds_count 2",
+    ]
+
+
+def test_registry_render_merged_snapshots():
+    test_registry = Registry()
+    counter = test_registry.register(Counter("test_total", "Test.", ("name",)))
+    counter.inc("a")
+    snapshot = json.loads(json.dumps(test_registry.snapshot()))
+
+    text = test_registry.render([snapshot, snapshot, {}])
+    assert 'test_total{name="a"} 2' in text
+
+
+def get_histogram_count(labels: tuple[str, ...]) -> int:
+    # The histogram value is bucket counts followed by the sum
+    return sum(db_operation_duration_seconds.values.get(labels, [0])[:-1])
+
+
+async def test_metrics_routes_and_db_operations(
+    drop_mock_db, add_simple_user, add_simple_note
+):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    note_id = await get_note_id_by_title("title 1")
+    requests = http_requests_total.values.get(("GET", "/notes/{note_id}", "200"), 0)
+    retrieves = get_histogram_count(("notes", "retrieve_note"))
+
+    client.get(f"/notes/{note_id}", headers=headers)
+    client.get(f"/notes/{note_id}/missing", headers=headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert (
+        http_requests_total.values[("GET", "/notes/{note_id}", "200")] == requests + 1
+    )
+    assert get_histogram_count(("notes", "retrieve_note")) == retrieves + 1
+    assert 'route="<unmatched>"' in response.text
+    assert "http_requests_in_flight 1" in response.text
+
+
+def test_metrics_multiprocess(monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings(), "metrics_dir", str(tmp_path))
+    other = {name: metric.snapshot() for name, metric in registry.metrics.items()}
+    other["http_requests_total"] = [[["GET", "/other", "200"], 5]]
+    with open(get_metrics_path(str(tmp_path), pid=1), "w") as f:
+        json.dump(other, f)
+
+    response = client.get("/metrics")
+    assert 'http_requests_total{method="GET",route="/other",status="200"} 5' in (
+        response.text
+    )
+    assert os.path.exists(get_metrics_path(str(tmp_path)))
+
+
+async def test_db_operations_measured_once(
+    drop_mock_db, add_simple_user, add_simple_note
+):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    iterations = get_histogram_count(("notes", "iterate_notes"))
+
+    client.get("/notes/", headers=headers, params={"limit": 10})
+    # retrieve_notes_page and retrieve_notes only call iterate_notes
+    assert get_histogram_count(("notes", "iterate_notes")) == iterations + 1
+    assert ("notes", "retrieve_notes_page") not in db_operation_duration_seconds.values
+    assert ("notes", "retrieve_notes") not in db_operation_duration_seconds.values
+
+
+def test_metrics_stale_snapshots_removed(monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings(), "metrics_dir", str(tmp_path))
+    write_metrics_snapshot()
+    dead_pid = 2**22 + 1
+    with open(get_metrics_path(str(tmp_path), pid=dead_pid), "w") as f:
+        json.dump({}, f)
+
+    assert remove_stale_metrics_snapshots() == [f"{dead_pid}.json"]
+    assert os.listdir(tmp_path) == [f"{os.getpid()}.json"]
+
+    remove_metrics_snapshot()
+    assert os.listdir(tmp_path) == []
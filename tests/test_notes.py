@@ -150,3 +150,23 @@ async def test_authorized_delete_no_exists_note(drop_mock_db, add_simple_user):
     headers = {"Authorization": f"Bearer {bearer}"}
     response = client.delete(f"/notes/111111111111111111111111", headers=headers)
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_authorized_invalid_note_id(drop_mock_db, add_simple_user):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    data = {"title": "title 2", "body": "body 2"}
+    for method, url in (
+        ("GET", "/notes/xyz"),
+        ("PUT", "/notes/xyz"),
+        ("PATCH", "/notes/xyz"),
+        ("DELETE", "/notes/xyz"),
+    ):
+        response = client.request(
+            method,
+            url,
+            headers=headers,
+            json=None if method in ("GET", "DELETE") else data,
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid note id xyz"
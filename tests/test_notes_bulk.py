@@ -0,0 +1,118 @@
+from fastapi.testclient import TestClient
+from starlette import status
+
+import src.notes.router
+from src.app import app
+from src.auth.database import get_user_id_by_email
+from src.notes.database import (
+    delete_note,
+    get_note_id_by_title,
+    retrieve_note,
+    retrieve_notes,
+    retrieve_notes_by_ids,
+)
+from tests.conftest import get_token
+
+client = TestClient(app)
+
+
+async def test_authorized_create_notes_bulk(drop_mock_db, add_simple_user):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    data = {"notes": [{"title": f"title {i}", "body": f"body {i}"} for i in range(5)]}
+    response = client.post("/notes/bulk", headers=headers, json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+    resp_data = response.json()
+    assert [item["status"] for item in resp_data] == [status.HTTP_201_CREATED] * 5
+
+    owner_id = await get_user_id_by_email("email@example.com")
+    notes = await retrieve_notes(owner_id)
+    assert [note["_id"] for note in notes] == [item["id"] for item in resp_data]
+
+
+async def test_authorized_as_admin_create_notes_bulk(drop_mock_db, add_3_simple_users):
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    data = {"notes": [{"title": "title 1", "body": "body 1"}]}
+    response = client.post("/notes/bulk", headers=headers, json=data)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_authorized_update_notes_bulk(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    own_note_id = await get_note_id_by_title("title 1")
+    other_note_id = await get_note_id_by_title("title 3")
+    data = {
+        "notes": [
+            {"id": own_note_id, "body": "body 11"},
+            {"id": other_note_id, "body": "body 33"},
+            {"id": "111111111111111111111111", "body": "body"},
+            {"id": "12345", "body": "body"},
+            {"id": own_note_id},
+        ]
+    }
+    response = client.patch("/notes/bulk", headers=headers, json=data)
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in response.json()] == [
+        status.HTTP_200_OK,
+        status.HTTP_403_FORBIDDEN,
+        status.HTTP_404_NOT_FOUND,
+        status.HTTP_400_BAD_REQUEST,
+        status.HTTP_400_BAD_REQUEST,
+    ]
+    assert (await retrieve_note(own_note_id))["body"] == "body 11"
+    assert (await retrieve_note(other_note_id))["body"] == "body 3"
+
+
+async def test_authorized_delete_notes_bulk(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    own_note_id = await get_note_id_by_title("title 1")
+    other_note_id = await get_note_id_by_title("title 3")
+    data = {"ids": [own_note_id, other_note_id]}
+    response = client.request("DELETE", "/notes/bulk", headers=headers, json=data)
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in response.json()] == [
+        status.HTTP_204_NO_CONTENT,
+        status.HTTP_403_FORBIDDEN,
+    ]
+    assert await retrieve_note(own_note_id) is None
+    assert await retrieve_note(other_note_id) is not None
+
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get(f"/notes/restore/{own_note_id}", headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+async def test_update_notes_bulk_deleted_concurrently(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, monkeypatch
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    note_ids = [
+        await get_note_id_by_title("title 1"),
+        await get_note_id_by_title("title 2"),
+    ]
+    notes = await retrieve_notes_by_ids(note_ids, fields=["owner"])
+
+    async def retrieve_before_delete(*args, **kwargs):
+        # The note is deleted after the ownership check of the request
+        await delete_note(note_ids[1])
+        return notes
+
+    monkeypatch.setattr(
+        src.notes.router, "retrieve_notes_by_ids", retrieve_before_delete
+    )
+    data = {"notes": [{"id": note_id, "body": "changed"} for note_id in note_ids]}
+    response = client.patch("/notes/bulk", headers=headers, json=data)
+    assert [item["status"] for item in response.json()] == [
+        status.HTTP_200_OK,
+        status.HTTP_404_NOT_FOUND,
+    ]
+    assert (await retrieve_note(note_ids[0]))["body"] == "changed"
@@ -0,0 +1,123 @@
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from src.notes.cache import (
+    CachedResponse,
+    MemoryResponseCacheBackend,
+    ResponseCache,
+    get_response_cache,
+)
+from src.notes.database import get_note_id_by_title
+
+client = TestClient(app)
+
+
+async def test_get_note_cached(
+    drop_mock_db, add_simple_user, add_simple_note, db_calls, get_headers
+):
+    headers = get_headers("email@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    first = client.get(f"/notes/{note_id}", headers=headers)
+
+    db_calls.clear()
+    response = client.get(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == first.json()
+    assert response.headers["ETag"] == first.headers["ETag"]
+    assert not db_calls
+
+    headers["If-None-Match"] = first.headers["ETag"]
+    response = client.get(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert get_response_cache().stats()["hits"] == 2
+
+
+async def test_get_note_cached_access_denied(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    note_id = await get_note_id_by_title("title 1")
+    response = client.get(
+        f"/notes/{note_id}", headers=get_headers("email1@example.com")
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    # The cached note is still checked for the owner
+    response = client.get(
+        f"/notes/{note_id}", headers=get_headers("email2@example.com")
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_get_note_cache_invalidated(
+    drop_mock_db, add_simple_user, add_simple_note, get_headers
+):
+    headers = get_headers("email@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    client.get(f"/notes/{note_id}", headers=headers)
+    client.get("/notes/", headers=headers)
+
+    response = client.patch(f"/notes/{note_id}", headers=headers, json={"body": "2"})
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get(f"/notes/{note_id}", headers=headers).json()["body"] == "2"
+    assert client.get("/notes/", headers=headers).json()[0]["body"] == "2"
+
+    client.post("/notes/", headers=headers, json={"title": "title 2", "body": "3"})
+    assert len(client.get("/notes/", headers=headers).json()) == 2
+
+    client.delete(f"/notes/{note_id}", headers=headers)
+    response = client.get(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert len(client.get("/notes/", headers=headers).json()) == 1
+
+
+async def test_get_notes_cache_invalidated_for_admin(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    admin_headers = get_headers("admin@example.com")
+    assert len(client.get("/notes/", headers=admin_headers).json()) == 3
+
+    headers = get_headers("email1@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    client.request("DELETE", "/notes/bulk", headers=headers, json={"ids": [note_id]})
+    assert len(client.get("/notes/", headers=admin_headers).json()) == 2
+
+    client.get(f"/notes/restore/{note_id}", headers=admin_headers)
+    assert len(client.get("/notes/", headers=admin_headers).json()) == 3
+
+
+async def test_notes_cache_stats(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    headers = get_headers("email1@example.com")
+    client.get("/notes/", headers=headers)
+    client.get("/notes/", headers=headers)
+
+    admin_headers = get_headers("admin@example.com")
+    response = client.get("/admin/cache/notes", headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["hits"] == 1
+    assert response.json()["misses"] == 1
+    assert response.json()["hit_ratio"] == 0.5
+
+    response = client.delete("/admin/cache/notes", headers=admin_headers)
+    assert response.json()["hits"] == 0
+
+    response = client.get("/admin/cache/notes", headers=headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_response_cache_skips_stale_set():
+    cache = ResponseCache(MemoryResponseCacheBackend(max_size=1, ttl=60))
+    response = CachedResponse("owner", '"1-1"', b"{}")
+    generation = cache.generation
+    await cache.invalidate_notes("owner", ["1"])
+    await cache.set(cache.note_key("1"), response, generation)
+    assert await cache.get(cache.note_key("1")) is None
+
+    await cache.set(cache.note_key("1"), response, cache.generation)
+    assert await cache.get(cache.note_key("1")) == response
+
+    # The least recently used entry is evicted
+    await cache.set(cache.note_key("2"), response, cache.generation)
+    assert await cache.get(cache.note_key("1")) is None
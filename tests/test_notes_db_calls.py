@@ -0,0 +1,93 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from src.notes.database import get_note_id_by_title
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="function")
+def get_headers(get_headers):
+    def get_warm_headers(email: str) -> dict:
+        headers = get_headers(email)
+        # Warm up the user cache, so only notes operations are counted
+        client.get("/auth/user", headers=headers)
+        return headers
+
+    return get_warm_headers
+
+
+async def test_create_note_db_calls(
+    drop_mock_db, add_simple_user, db_calls, get_headers
+):
+    headers = get_headers("email@example.com")
+    db_calls.clear()
+    data = {"title": "title 1", "body": "body 1"}
+    response = client.post("/notes/", headers=headers, json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert db_calls == {"note.insert_one": 1}
+
+
+async def test_get_note_db_calls(
+    drop_mock_db, add_simple_user, add_simple_note, db_calls, get_headers
+):
+    headers = get_headers("email@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    db_calls.clear()
+    response = client.get(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert db_calls == {"note.find_one": 1}
+
+
+async def test_update_note_db_calls(
+    drop_mock_db, add_simple_user, add_simple_note, db_calls, get_headers
+):
+    headers = get_headers("email@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    db_calls.clear()
+    data = {"body": "body 2"}
+    response = client.patch(f"/notes/{note_id}", headers=headers, json=data)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["body"] == "body 2"
+    assert db_calls == {"note.find_one_and_update": 1}
+
+
+async def test_delete_note_db_calls(
+    drop_mock_db, add_simple_user, add_simple_note, db_calls, get_headers
+):
+    headers = get_headers("email@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    db_calls.clear()
+    response = client.delete(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    # The audit record is stored along with the note by the same write
+    assert db_calls == {"note.find_one_and_update": 1}
+
+
+async def test_restore_note_db_calls(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, db_calls, get_headers
+):
+    headers = get_headers("email1@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    client.delete(f"/notes/{note_id}", headers=headers)
+
+    headers = get_headers("admin@example.com")
+    db_calls.clear()
+    response = client.get(f"/notes/restore/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert db_calls == {"note.find_one_and_update": 1}
+
+
+async def test_update_notes_bulk_db_calls(
+    drop_mock_db, add_simple_user, add_simple_note, db_calls, get_headers
+):
+    headers = get_headers("email@example.com")
+    note_id = await get_note_id_by_title("title 1")
+    db_calls.clear()
+    data = {"notes": [{"id": note_id, "body": "body 2"}]}
+    response = client.patch("/notes/bulk", headers=headers, json=data)
+    assert response.status_code == status.HTTP_200_OK
+    # One read for the ownership check and one write for all notes
+    assert db_calls == {"note.find": 1, "note.bulk_write": 1}
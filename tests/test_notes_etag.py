@@ -0,0 +1,128 @@
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from src.auth.database import get_user_id_by_email
+from src.database import get_note_collection
+from src.notes.database import get_note_id_by_title
+from tests.conftest import get_token
+
+client = TestClient(app)
+
+
+async def test_authorized_get_note_not_modified(
+    drop_mock_db, add_simple_user, add_simple_note
+):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    note_id = await get_note_id_by_title("title 1")
+    response = client.get(f"/notes/{note_id}", headers=headers)
+    etag = response.headers["ETag"]
+    assert etag == f'"{note_id}-1"'
+
+    headers["If-None-Match"] = etag
+    response = client.get(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+
+async def test_authorized_get_notes_modified_after_update(
+    drop_mock_db, add_simple_user, add_simple_note
+):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    etag = client.get("/notes/", headers=headers).headers["ETag"]
+    response = client.get("/notes/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    note_id = await get_note_id_by_title("title 1")
+    response = client.patch(f"/notes/{note_id}", headers=headers, json={"body": "2"})
+    assert response.json()["version"] == 2
+
+    response = client.get("/notes/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+
+async def test_authorized_patch_note_if_match(
+    drop_mock_db, add_simple_user, add_simple_note
+):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    note_id = await get_note_id_by_title("title 1")
+    etag = client.get(f"/notes/{note_id}", headers=headers).headers["ETag"]
+
+    data = {"body": "body 2"}
+    response = client.patch(
+        f"/notes/{note_id}", headers={**headers, "If-Match": etag}, json=data
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] == f'"{note_id}-2"'
+
+    # The note was modified since the client has read it
+    response = client.put(
+        f"/notes/{note_id}", headers={**headers, "If-Match": etag}, json=data
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+
+async def test_authorized_patch_not_owner_note_if_match(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email2@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}", "If-Match": "*"}
+    note_id = await get_note_id_by_title("title 1")
+    response = client.patch(f"/notes/{note_id}", headers=headers, json={"body": "2"})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_authorized_patch_legacy_note_if_match(drop_mock_db, add_simple_user):
+    # A note written before versioning has no "version"
+    owner_id = await get_user_id_by_email("email@example.com")
+    result = await get_note_collection().insert_one(
+        {"title": "legacy", "body": "body", "owner": owner_id}
+    )
+    note_id = str(result.inserted_id)
+
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    etag = client.get(f"/notes/{note_id}", headers=headers).headers["ETag"]
+    assert etag == f'"{note_id}-0"'
+
+    response = client.patch(
+        f"/notes/{note_id}", headers={**headers, "If-Match": etag}, json={"body": "2"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] == f'"{note_id}-1"'
+
+    response = client.patch(
+        f"/notes/{note_id}", headers={**headers, "If-Match": etag}, json={"body": "3"}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+
+async def test_authorized_compressed_note_etag(drop_mock_db, add_simple_user):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}", "Accept-Encoding": "gzip"}
+    response = client.post(
+        "/notes/", headers=headers, json={"title": "large", "body": "body " * 1000}
+    )
+    note_id = response.json()["_id"]
+
+    # The compressed representation has its own ETag
+    response = client.get(f"/notes/{note_id}", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    etag = response.headers["ETag"]
+    assert etag == f'"{note_id}-1-gzip"'
+
+    response = client.get(
+        f"/notes/{note_id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+
+    response = client.patch(
+        f"/notes/{note_id}", headers={**headers, "If-Match": etag}, json={"body": "2"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] == f'"{note_id}-2"'
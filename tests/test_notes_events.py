@@ -0,0 +1,203 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette import status
+from starlette.websockets import WebSocketDisconnect
+
+import src.notes.events as events
+from src.app import app
+from src.auth.database import get_user_id_by_email
+from src.notes.database import add_note_in_db, get_note_id_by_title
+from src.notes.events import ChangeStreamNoteEventBus, NoteEventBus, get_note_event_bus
+from src.notes.service import iterate_note_events, stream_note_events_sse
+from tests.conftest import get_token
+
+client = TestClient(app)
+
+
+async def test_events_scoped_to_owner():
+    bus = NoteEventBus(queue_size=10)
+    owner = bus.subscribe("owner")
+    other = bus.subscribe("other")
+    admin = bus.subscribe(None)
+
+    bus.notify("create", "owner", ["1", "2"])
+    assert owner.queue.qsize() == 2
+    assert other.queue.qsize() == 0
+    assert admin.queue.qsize() == 2
+    assert await owner.get() == {"type": "create", "_id": "1", "owner": "owner"}
+
+    bus.unsubscribe(owner)
+    bus.unsubscribe(other)
+    bus.unsubscribe(admin)
+    assert bus.stats()["subscriptions"] == 0
+
+
+async def test_events_overflow():
+    bus = NoteEventBus(queue_size=2)
+    subscription = bus.subscribe("owner")
+    bus.notify("update", "owner", ["1", "2", "3", "4"])
+
+    events = iterate_note_events(bus, subscription, keepalive=1)
+    chunks = [chunk async for chunk in stream_note_events_sse(events)]
+    assert chunks == [b'event: overflow\ndata: {"type":"overflow"}\n\n']
+    assert bus.stats()["subscriptions"] == 0
+
+
+async def test_events_keepalive():
+    bus = NoteEventBus(queue_size=2)
+    events = stream_note_events_sse(
+        iterate_note_events(bus, bus.subscribe("owner"), keepalive=0.01)
+    )
+    assert await anext(events) == b": keepalive\n\n"
+    await events.aclose()
+    assert bus.stats()["subscriptions"] == 0
+
+
+def test_change_stream_event_type():
+    get_event_type = ChangeStreamNoteEventBus.get_event_type
+    note = {"owner": "owner"}
+    assert get_event_type({"operationType": "insert", "fullDocument": note}) == "create"
+    assert (
+        get_event_type(
+            {
+                "operationType": "update",
+                "fullDocument": {**note, "deleted_at": 1},
+                "updateDescription": {"updatedFields": {"deleted_at": 1}},
+            }
+        )
+        == "delete"
+    )
+    assert (
+        get_event_type(
+            {
+                "operationType": "update",
+                "fullDocument": note,
+                "updateDescription": {"removedFields": ["deleted_at"]},
+            }
+        )
+        == "restore"
+    )
+    assert (
+        get_event_type(
+            {
+                "operationType": "update",
+                "fullDocument": note,
+                "updateDescription": {"updatedFields": {"title": "t"}},
+            }
+        )
+        == "update"
+    )
+    assert get_event_type({"operationType": "update", "fullDocument": None}) is None
+    # Audit records moved out of the note are not a change of the note
+    assert (
+        get_event_type(
+            {
+                "operationType": "update",
+                "fullDocument": note,
+                "updateDescription": {"updatedFields": {"audit_pending": []}},
+            }
+        )
+        is None
+    )
+
+
+async def test_change_stream_fallback(monkeypatch):
+    async def is_replica_set():
+        return False
+
+    monkeypatch.setattr(events, "is_replica_set", is_replica_set)
+    bus = ChangeStreamNoteEventBus(10, fallback=True)
+    subscription = bus.subscribe("owner")
+    # Without a replica set the writes of this process are published
+    await bus.run()
+    bus.notify("create", "owner", ["1"])
+    assert await subscription.get() == {"type": "create", "_id": "1", "owner": "owner"}
+    assert bus.stats()["in_process"]
+
+
+async def test_change_stream_replica_set(monkeypatch):
+    async def is_replica_set():
+        return True
+
+    async def watch():
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(events, "is_replica_set", is_replica_set)
+    bus = ChangeStreamNoteEventBus(10, fallback=True)
+    bus.watch = watch
+    subscription = bus.subscribe("owner")
+    with pytest.raises(asyncio.CancelledError):
+        await bus.run()
+    # Writes are published by the change stream only
+    bus.notify("create", "owner", ["1"])
+    assert subscription.queue.empty()
+    assert not bus.stats()["in_process"]
+
+
+def test_sse_events(drop_mock_db, add_simple_user, monkeypatch, get_headers):
+    bus = get_note_event_bus()
+    monkeypatch.setattr(bus, "queue_size", 1)
+    headers = get_headers("email@example.com")
+    result = {}
+
+    def request():
+        result["response"] = client.get("/notes/events", headers=headers)
+
+    thread = threading.Thread(target=request)
+    thread.start()
+    for _ in range(100):
+        if bus.subscriptions:
+            break
+        time.sleep(0.05)
+    [subscription] = [item for items in bus.subscriptions.values() for item in items]
+
+    # Both events are queued in the loop of the request at once, so the client overflows
+    subscription.loop.call_soon_threadsafe(
+        bus.notify, "create", subscription.owner_id, ["1", "2"]
+    )
+    thread.join(5)
+
+    response = result["response"]
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "event: overflow" in response.text
+    assert not bus.subscriptions
+
+
+async def test_websocket_events(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    token = get_token(client, "email1@example.com", "password")
+    with client.websocket_connect(f"/notes/events/ws?token={token}") as websocket:
+        note_id = await get_note_id_by_title("title 1")
+        response = client.delete(
+            f"/notes/{note_id}", headers=get_headers("email1@example.com")
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        owner_id = await get_user_id_by_email("email1@example.com")
+        assert websocket.receive_json() == {
+            "type": "delete",
+            "_id": note_id,
+            "owner": owner_id,
+        }
+
+        # Notes of other users are not sent
+        other_id = await get_user_id_by_email("email2@example.com")
+        await add_note_in_db({"title": "other", "body": "body", "owner": other_id})
+        note = await add_note_in_db({"title": "own", "body": "body", "owner": owner_id})
+        assert websocket.receive_json()["_id"] == note["_id"]
+
+
+def test_websocket_events_unauthorized(drop_mock_db):
+    try:
+        with client.websocket_connect("/notes/events/ws?token=invalid"):
+            pass
+    except WebSocketDisconnect as e:
+        assert e.code == status.WS_1008_POLICY_VIOLATION
+    else:
+        raise AssertionError("WebSocket was accepted")
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from src.notes.database import retrieve_notes
+
+client = TestClient(app)
+
+
+async def test_retrieve_notes_projection(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    notes = await retrieve_notes(fields=["title"])
+    assert len(notes) == 3
+    assert all(set(note) == {"_id", "title", "version"} for note in notes)
+
+
+async def test_get_notes_fields(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    headers = get_headers("email1@example.com")
+    response = client.get("/notes/?fields=title", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [note["title"] for note in response.json()] == ["title 1", "title 2"]
+    assert all("body" not in note for note in response.json())
+    full_etag = client.get("/notes/", headers=headers).headers["ETag"]
+    assert response.headers["ETag"] != full_etag
+
+    response = client.get("/notes/?fields=title,owner&limit=1", headers=headers)
+    assert set(response.json()["notes"][0]) == {"_id", "title", "owner", "version"}
+    assert response.json()["next_cursor"]
+
+    response = client.get("/notes/?fields=body&stream=ndjson", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert '"title"' not in response.text
+
+
+async def test_get_notes_invalid_fields(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    headers = get_headers("email1@example.com")
+    response = client.get("/notes/?fields=title,password", headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Invalid note field password"
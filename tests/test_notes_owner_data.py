@@ -110,3 +110,20 @@ async def test_authorized_delete_not_owner_note(
     note_id = await get_note_id_by_title("title 1")
     response = client.delete(f"/notes/{note_id}", headers=headers)
     assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_authorized_get_deleted_owner_note(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    note_id = await get_note_id_by_title("title 1")
+    response = client.delete(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = client.get(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.get("/notes/", headers=headers)
+    assert len(response.json()) == 1
+    response = client.delete(f"/notes/{note_id}", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,80 @@
+import json
+
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from tests.conftest import get_token
+
+client = TestClient(app)
+
+
+async def test_authorized_get_notes_first_page(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/notes/", headers=headers, params={"limit": 1})
+    assert response.status_code == status.HTTP_200_OK
+    resp_data = response.json()
+    assert len(resp_data["notes"]) == 1
+    assert resp_data["notes"][0]["title"] == "title 1"
+    assert resp_data["next_cursor"] == resp_data["notes"][0]["_id"]
+
+
+async def test_authorized_get_notes_last_page(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/notes/", headers=headers, params={"limit": 1})
+    next_cursor = response.json()["next_cursor"]
+
+    params = {"limit": 1, "after": next_cursor}
+    response = client.get("/notes/", headers=headers, params=params)
+    assert response.status_code == status.HTTP_200_OK
+    resp_data = response.json()
+    assert len(resp_data["notes"]) == 1
+    assert resp_data["notes"][0]["title"] == "title 2"
+    assert resp_data["next_cursor"] is None
+
+
+async def test_authorized_get_notes_invalid_cursor(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    params = {"limit": 1, "after": "12345"}
+    response = client.get("/notes/", headers=headers, params=params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+async def test_authorized_as_admin_stream_notes_ndjson(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/notes/", headers=headers, params={"stream": "ndjson"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    notes = [json.loads(line) for line in response.text.splitlines()]
+    assert [note["title"] for note in notes] == ["title 1", "title 2", "title 3"]
+
+
+async def test_authorized_as_admin_stream_notes_json(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/notes/", headers=headers, params={"stream": "json"})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 3
+
+
+async def test_authorized_stream_notes_empty(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email3@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/notes/", headers=headers, params={"stream": "ndjson"})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from src.notes.database import get_note_id_by_title
+from src.notes.search import get_search_backend
+from tests.conftest import get_token
+
+client = TestClient(app)
+
+
+async def test_authorized_search_notes(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/notes/search", headers=headers, params={"q": "Body"})
+    assert response.status_code == status.HTTP_200_OK
+    resp_data = response.json()
+    assert {note["title"] for note in resp_data["notes"]} == {"title 1", "title 2"}
+    assert resp_data["next_offset"] is None
+
+
+async def test_authorized_search_notes_ranked_and_paginated(
+    drop_mock_db, add_simple_user
+):
+    bearer = get_token(client, "email@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    client.post("/notes/", headers=headers, json={"title": "other", "body": "apple"})
+    client.post("/notes/", headers=headers, json={"title": "apple", "body": "pie"})
+
+    params = {"q": "apple", "limit": 1}
+    response = client.get("/notes/search", headers=headers, params=params)
+    resp_data = response.json()
+    assert [note["title"] for note in resp_data["notes"]] == ["apple"]
+    assert resp_data["next_offset"] == 1
+
+    params["offset"] = resp_data["next_offset"]
+    response = client.get("/notes/search", headers=headers, params=params)
+    resp_data = response.json()
+    assert [note["title"] for note in resp_data["notes"]] == ["other"]
+    assert resp_data["next_offset"] is None
+
+
+async def test_authorized_search_updated_and_deleted_notes(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    note_id = await get_note_id_by_title("title 1")
+    client.patch(f"/notes/{note_id}", headers=headers, json={"body": "banana"})
+    response = client.get("/notes/search", headers=headers, params={"q": "banana"})
+    assert [note["_id"] for note in response.json()["notes"]] == [note_id]
+
+    client.delete(f"/notes/{note_id}", headers=headers)
+    response = client.get("/notes/search", headers=headers, params={"q": "banana"})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+async def test_authorized_search_notes_another_owner(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email3@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/notes/search", headers=headers, params={"q": "body"})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+async def test_search_index_rebuilt(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    note_id = await get_note_id_by_title("title 2")
+    client.delete(f"/notes/{note_id}", headers=headers)
+
+    # The index of a restarted process is empty until it is rebuilt
+    search_backend = get_search_backend()
+    search_backend.clear()
+    assert await search_backend.rebuild() == 2
+    response = client.get("/notes/search", headers=headers, params={"q": "body"})
+    assert [note["title"] for note in response.json()["notes"]] == ["title 1"]
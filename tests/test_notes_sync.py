@@ -0,0 +1,131 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from src.auth.database import get_user_id_by_email
+from src.database import get_note_collection
+from src.notes.database import backfill_updated_at, get_note_id_by_title
+from src.notes.service import MIN_NOTE_ID, decode_sync_token, encode_sync_token
+from src.settings import get_settings
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def no_settle(monkeypatch):
+    monkeypatch.setattr(get_settings(), "notes_sync_settle_seconds", 0)
+
+
+def sync(headers: dict, **params) -> dict:
+    response = client.get("/notes/sync", params=params, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+
+async def test_sync_changes(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    headers = get_headers("email1@example.com")
+    data = sync(headers)
+    assert [note["title"] for note in data["notes"]] == ["title 1", "title 2"]
+    assert data["deleted"] == []
+    assert data["has_more"] is False
+
+    # Nothing changed since the token, the token still moves forward
+    token = data["next_token"]
+    data = sync(headers, since=token)
+    assert data == {
+        "notes": [],
+        "deleted": [],
+        "next_token": data["next_token"],
+        "has_more": False,
+    }
+    assert decode_sync_token(data["next_token"]) > decode_sync_token(token)
+    token = data["next_token"]
+
+    note_id = await get_note_id_by_title("title 1")
+    client.patch(f"/notes/{note_id}", json={"title": "changed"}, headers=headers)
+    data = sync(headers, since=token)
+    assert [(note["_id"], note["title"]) for note in data["notes"]] == [
+        (note_id, "changed")
+    ]
+
+    token = data["next_token"]
+    client.delete(f"/notes/{note_id}", headers=headers)
+    data = sync(headers, since=token)
+    assert data["notes"] == []
+    assert data["deleted"] == [note_id]
+
+    token = data["next_token"]
+    client.get(f"/notes/restore/{note_id}", headers=get_headers("admin@example.com"))
+    data = sync(headers, since=token)
+    assert [note["_id"] for note in data["notes"]] == [note_id]
+
+
+def test_sync_pages(drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers):
+    headers = get_headers("admin@example.com")
+    titles = []
+    data = sync(headers, limit=2)
+    titles += [note["title"] for note in data["notes"]]
+    assert data["has_more"] is True
+
+    data = sync(headers, limit=2, since=data["next_token"])
+    titles += [note["title"] for note in data["notes"]]
+    assert data["has_more"] is False
+    assert titles == ["title 1", "title 2", "title 3"]
+
+
+def test_sync_settle(
+    drop_mock_db, add_simple_user, add_simple_note, monkeypatch, get_headers
+):
+    monkeypatch.setattr(get_settings(), "notes_sync_settle_seconds", 60)
+    headers = get_headers("email@example.com")
+    data = sync(headers)
+    assert data["notes"] == []
+
+    # The note changed within the settle time is returned by the next sync
+    monkeypatch.setattr(get_settings(), "notes_sync_settle_seconds", 0)
+    data = sync(headers, since=data["next_token"])
+    assert [note["title"] for note in data["notes"]] == ["title 1"]
+
+
+def test_sync_invalid_token(drop_mock_db, add_simple_user, get_headers):
+    headers = get_headers("email@example.com")
+    for token in ("invalid", encode_sync_token("2024-01-01T00:00:00", "invalid")):
+        response = client.get("/notes/sync", params={"since": token}, headers=headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    token = encode_sync_token("2000-01-01T00:00:00", MIN_NOTE_ID)
+    response = client.get("/notes/sync", params={"since": token}, headers=headers)
+    assert response.status_code == status.HTTP_410_GONE
+
+
+def test_sync_access_denied(drop_mock_db, add_3_simple_users, get_headers):
+    response = client.get(
+        "/notes/sync",
+        params={"notes_user_id": "other"},
+        headers=get_headers("email1@example.com"),
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_sync_legacy_notes(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, get_headers
+):
+    headers = get_headers("email1@example.com")
+    token = sync(headers)["next_token"]
+
+    # A note written before the update time was introduced
+    owner_id = await get_user_id_by_email("email1@example.com")
+    result = await get_note_collection().insert_one(
+        {"title": "legacy", "body": "body", "owner": owner_id, "version": 1}
+    )
+    assert await backfill_updated_at() == 1
+    assert await backfill_updated_at() == 0
+
+    # Returned by the first sync and by the next sync of a client which synced before
+    notes = sync(headers)["notes"]
+    assert [note["title"] for note in notes] == ["title 1", "title 2", "legacy"]
+    data = sync(headers, since=token)
+    assert [note["_id"] for note in data["notes"]] == [str(result.inserted_id)]
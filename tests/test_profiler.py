@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette import status
+from starlette.responses import StreamingResponse
+
+from src.app import app
+from src.metrics.profiler import ProfilerMiddleware, list_profiles
+from src.settings import get_settings
+from tests.conftest import get_token
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="function")
+def profile_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings(), "log_dir", str(tmp_path))
+    return tmp_path / "profiles"
+
+
+async def test_admin_profile_request(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, profile_dir
+):
+    bearer = get_token(client, "admin@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/notes/", headers={**headers, "X-Profile": "1"})
+    assert response.status_code == status.HTTP_200_OK
+    name = response.headers["X-Profile"]
+    assert list_profiles() == [name]
+
+    response = client.get(f"/admin/profiles/{name}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert "function calls" in response.text
+    assert "get_notes" in response.text
+
+    response = client.get("/admin/profiles/missing", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_user_profile_request_ignored(
+    drop_mock_db, add_3_simple_users, add_3_simple_notes, profile_dir
+):
+    bearer = get_token(client, "email1@example.com", "password")
+    headers = {"Authorization": f"Bearer {bearer}"}
+    response = client.get("/notes/?profile=1", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert "X-Profile" not in response.headers
+    assert list_profiles() == []
+
+    response = client.get("/admin/profiles", headers=headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_slow_request_sampled(monkeypatch, profile_dir):
+    monkeypatch.setattr(get_settings(), "profile_slow_request_seconds", 0.05)
+    monkeypatch.setattr(get_settings(), "profile_sample_interval_seconds", 0.001)
+    test_app = FastAPI()
+
+    @test_app.get("/slow")
+    async def slow_endpoint():
+        # Block the event loop, so the sampler sees this frame
+        time.sleep(0.1)
+        return {}
+
+    @test_app.get("/fast")
+    async def fast_endpoint():
+        return {}
+
+    test_app.add_middleware(ProfilerMiddleware)
+    test_client = TestClient(test_app)
+    test_client.get("/fast")
+    assert list_profiles() == []
+
+    test_client.get("/slow")
+    [name] = list_profiles()
+    assert name.endswith("-GET-slow-samples.folded")
+    assert "slow_endpoint" in (profile_dir / name).read_text()
+
+
+def test_event_stream_not_sampled(monkeypatch, profile_dir):
+    monkeypatch.setattr(get_settings(), "profile_slow_request_seconds", 0.05)
+    monkeypatch.setattr(get_settings(), "profile_sample_interval_seconds", 0.001)
+    test_app = FastAPI()
+
+    @test_app.get("/events")
+    async def events_endpoint():
+        async def events():
+            yield b"event: a\n\n"
+            await asyncio.sleep(0.1)
+            yield b"event: b\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    test_app.add_middleware(ProfilerMiddleware)
+    response = TestClient(test_app).get("/events")
+    assert response.status_code == status.HTTP_200_OK
+    assert list_profiles() == []
+
+
+async def test_concurrent_profile_requests():
+    middleware = ProfilerMiddleware(app)
+    scope = {"type": "http", "headers": [], "query_string": b""}
+    profiled = []
+
+    async def is_profile_requested(scope):
+        # A cold user lookup suspends the request
+        await asyncio.sleep(0)
+        return True
+
+    async def profile_request(scope, receive, send):
+        profiled.append(middleware.profiling)
+        middleware.profiling = True
+        await asyncio.sleep(0.01)
+        middleware.profiling = False
+
+    async def plain_request(scope, receive, send):
+        pass
+
+    middleware.is_profile_requested = is_profile_requested
+    middleware.profile_request = profile_request
+    middleware.app = plain_request
+    await asyncio.gather(middleware(scope, None, None), middleware(scope, None, None))
+    # Only one request is profiled at a time
+    assert profiled == [False]
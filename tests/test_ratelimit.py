@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette import status
+
+from src.app import app
+from src.ratelimit.service import MemoryRateLimitBackend, RateLimit, RateLimitMiddleware
+from src.settings import get_settings
+from tests.conftest import get_token
+
+client = TestClient(app)
+
+
+def get_limited_app(**settings) -> FastAPI:
+    limited_app = FastAPI()
+
+    @limited_app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {}
+
+    @limited_app.get("/other")
+    async def other():
+        return {}
+
+    limited_app.add_middleware(
+        RateLimitMiddleware, settings=get_settings().model_copy(update=settings)
+    )
+    return limited_app
+
+
+async def test_memory_backend_token_bucket():
+    backend = MemoryRateLimitBackend(max_keys=10)
+    limit = RateLimit.parse("test", "2/60")
+    assert await backend.acquire("key", limit) == 0
+    assert await backend.acquire("key", limit) == 0
+    assert 29 < await backend.acquire("key", limit) <= 30
+    assert await backend.acquire("other key", limit) == 0
+
+
+async def test_token_rate_limited_by_ip(drop_mock_db):
+    data = {"email": "missing@example.com", "password": "password"}
+    for _ in range(10):
+        response = client.post("/auth/token", json=data)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = client.post("/auth/token", json=data)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+async def test_rate_limited_by_user(drop_mock_db, add_3_simple_users):
+    limited_client = TestClient(
+        get_limited_app(rate_limits={"GET /items/{item_id}": "2/60"})
+    )
+    headers_1 = {
+        "Authorization": f"Bearer {get_token(client, 'email1@example.com', 'password')}"
+    }
+    headers_2 = {
+        "Authorization": f"Bearer {get_token(client, 'email2@example.com', 'password')}"
+    }
+    assert limited_client.get("/items/1", headers=headers_1).status_code == 200
+    assert limited_client.get("/items/2", headers=headers_1).status_code == 200
+    response = limited_client.get("/items/3", headers=headers_1)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.json() == {"detail": "Too many requests"}
+
+    # Other users and routes without a rule are not limited
+    assert limited_client.get("/items/1", headers=headers_2).status_code == 200
+    assert limited_client.get("/other", headers=headers_1).status_code == 200
+
+
+async def test_concurrent_requests_limited(drop_mock_db):
+    limited_app = get_limited_app(rate_limits={}, rate_limit_max_concurrent_per_user=1)
+    release = asyncio.Event()
+
+    @limited_app.get("/slow")
+    async def slow():
+        await release.wait()
+        return {}
+
+    transport = httpx.ASGITransport(app=limited_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        first = asyncio.create_task(c.get("/slow"))
+        await asyncio.sleep(0.05)
+        response = await c.get("/other")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        release.set()
+        assert (await first).status_code == status.HTTP_200_OK
+        assert (await c.get("/other")).status_code == status.HTTP_200_OK
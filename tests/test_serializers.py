@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from src.serializers import FastJSONResponse, serialize_document
+
+
+def test_serialize_document():
+    note_id = ObjectId()
+    created = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    document = {
+        "_id": note_id,
+        "title": "title 1",
+        "pinned": True,
+        "views": 3,
+        "meta": {"created": created, "tags": ["a", ObjectId(str(note_id))]},
+    }
+    assert serialize_document(document) == {
+        "_id": str(note_id),
+        "title": "title 1",
+        "pinned": True,
+        "views": 3,
+        "meta": {"created": "2024-01-02T03:04:05+00:00", "tags": ["a", str(note_id)]},
+    }
+
+
+def test_fast_json_response_body():
+    response = FastJSONResponse({"title": "заметка", "body": None})
+    assert response.body == '{"title":"заметка","body":null}'.encode("utf-8")